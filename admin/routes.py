@@ -1,9 +1,19 @@
-from flask import render_template, redirect, url_for, flash, request
+from flask import render_template, redirect, url_for, flash, request, Response, stream_with_context
 from flask_login import login_required, current_user
 from admin import bp
 from app1 import db
-from models import Product, Category, Order, User
-from forms import ProductForm, CategoryForm
+from models import Product, Category, Order, DailyStock
+from forms import ProductForm, CategoryForm, RestockForm
+from loaders import load_profile
+from pagination import keyset_paginate
+from sales import sales_summary, store_counters
+from catalog import get_categories
+from exports import export_rows, iter_export, EXPORT_FORMATS
+from invoices import get_invoice_cache, lazy_rendering
+from invoices.bulk import iter_invoice_zip
+from routing import primary
+from stock import restock, today
+from datetime import datetime
 from functools import wraps
 
 def admin_required(f):
@@ -19,26 +29,73 @@ def admin_required(f):
 @login_required
 @admin_required
 def dashboard():
-    total_products = Product.query.count()
-    total_categories = Category.query.count()
-    total_orders = Order.query.count()
-    total_users = User.query.count()
+    counters = store_counters()
     
-    recent_orders = Order.query.order_by(Order.created_at.desc()).limit(5).all()
+    recent_orders = (Order.query.options(*load_profile('admin_orders'))
+                     .order_by(Order.created_at.desc()).limit(5).all())
+    sales = sales_summary(days=30)
+    invoice_cache = get_invoice_cache().snapshot() if lazy_rendering() else None
     
     return render_template('admin/dashboard.html',
-                         total_products=total_products,
-                         total_categories=total_categories,
-                         total_orders=total_orders,
-                         total_users=total_users,
-                         recent_orders=recent_orders)
+                         total_products=counters['products'],
+                         total_categories=counters['categories'],
+                         total_orders=counters['orders'],
+                         total_users=counters['users'],
+                         recent_orders=recent_orders,
+                         sales=sales,
+                         invoice_cache=invoice_cache,
+                         categories=get_categories())
+
+def _parse_date(name):
+    try:
+        return datetime.strptime(request.args.get(name, ''), '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+@bp.route('/orders/export')
+@login_required
+@admin_required
+def export_orders():
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        fmt = 'csv'
+    
+    rows = export_rows(start=_parse_date('start'),
+                       end=_parse_date('end'),
+                       status=request.args.get('status') or None,
+                       category_id=request.args.get('category', type=int))
+    try:
+        chunks = iter_export(fmt, rows)
+    except RuntimeError as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('admin.dashboard'))
+    
+    filename = f"pedidos_{datetime.now().strftime('%Y%m%d')}.{fmt}"
+    return Response(stream_with_context(chunks),
+                    mimetype=EXPORT_FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+@bp.route('/invoices/export')
+@login_required
+@admin_required
+def export_invoices():
+    start, end = _parse_date('start'), _parse_date('end')
+    chunks = iter_invoice_zip(start=start, end=end)
+    
+    filename = f"facturas_{start or 'inicio'}_{end or datetime.now().date()}.zip"
+    return Response(stream_with_context(chunks),
+                    mimetype='application/zip',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
 
 @bp.route('/products')
 @login_required
 @admin_required
 def products():
-    page = request.args.get('page', 1, type=int)
-    products = Product.query.paginate(page=page, per_page=10, error_out=False)
+    products = keyset_paginate(Product.query.options(*load_profile('catalog')),
+                               (Product.created_at, Product.id),
+                               cursor=request.args.get('cursor'),
+                               per_page=10,
+                               descending=True)
     return render_template('admin/products.html', products=products)
 
 @bp.route('/products/add', methods=['GET', 'POST'])
@@ -81,6 +138,7 @@ def edit_product(id):
 @bp.route('/products/delete/<int:id>')
 @login_required
 @admin_required
+@primary
 def delete_product(id):
     product = Product.query.get_or_404(id)
     db.session.delete(product)
@@ -88,6 +146,31 @@ def delete_product(id):
     flash('Product deleted successfully!', 'success')
     return redirect(url_for('admin.products'))
 
+@bp.route('/stock', methods=['GET', 'POST'])
+@login_required
+@admin_required
+@primary
+def stock():
+    form = RestockForm()
+    day = today()
+    if form.validate_on_submit():
+        quantities = {}
+        for key, value in request.form.items():
+            if key.startswith('add-') and value.strip():
+                try:
+                    quantities[int(key[4:])] = int(value)
+                except ValueError:
+                    continue
+        restock({product_id: n for product_id, n in quantities.items() if n > 0}, day=day)
+        db.session.commit()
+        flash('Inventario del día actualizado.', 'success')
+        return redirect(url_for('admin.stock'))
+    
+    products = (Product.query.options(*load_profile('catalog'))
+                .filter_by(active=True).order_by(Product.category_id, Product.name).all())
+    stock = {row.product_id: row for row in DailyStock.query.filter_by(day=day)}
+    return render_template('admin/stock.html', form=form, products=products, stock=stock, day=day)
+
 @bp.route('/categories')
 @login_required
 @admin_required
@@ -130,6 +213,7 @@ def edit_category(id):
 @bp.route('/categories/delete/<int:id>')
 @login_required
 @admin_required
+@primary
 def delete_category(id):
     category = Category.query.get_or_404(id)
     if category.products:
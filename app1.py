@@ -6,46 +6,210 @@ from flask_login import LoginManager
 from flask_migrate import Migrate
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
-from fpdf  import FPDF  
 
+from routing import RoutingSession, init_routing, replica_binds
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 
 class Base(DeclarativeBase):
     pass
 
-db = SQLAlchemy(model_class=Base)
+# RoutingSession manda las lecturas a las réplicas, si las hay (ver routing.py)
+db = SQLAlchemy(model_class=Base, session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 migrate = Migrate()
 
+def _engine_options(database_uri):
+    options = {
+        "pool_recycle": 300,
+        "pool_pre_ping": True,
+    }
+    # Tamaño del pool por proceso; con gunicorn, DB_POOL_SIZE toma por
+    # defecto el número de hilos de cada worker (ver gunicorn.conf.py).
+    # SQLite no usa un pool de conexiones de red.
+    if not database_uri.startswith("sqlite"):
+        options.update(
+            pool_size=int(os.environ.get("DB_POOL_SIZE", 5)),
+            max_overflow=int(os.environ.get("DB_MAX_OVERFLOW", 10)),
+            pool_timeout=int(os.environ.get("DB_POOL_TIMEOUT", 30)),
+        )
+    return options
+
 def create_app():
     app = Flask(__name__)
+    
+    # Logging por entorno: DEBUG en desarrollo, INFO en producción
+    app.config["APP_ENV"] = os.environ.get("APP_ENV", "development")
+    default_level = "DEBUG" if app.config["APP_ENV"] == "development" else "INFO"
+    app.config["LOG_LEVEL"] = os.environ.get("LOG_LEVEL", default_level).upper()
+    logging.basicConfig(level=app.config["LOG_LEVEL"],
+                        format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    
+    # Instrumentación por petición (ver profiling.py); desactivada por defecto
+    app.config["PROFILING"] = os.environ.get("PROFILING") == "1"
+    app.config["SLOW_REQUEST_MS"] = int(os.environ.get("SLOW_REQUEST_MS", 500))
+    app.config["PROFILE_ROUTES"] = [r for r in os.environ.get("PROFILE_ROUTES", "").split(",") if r]
+    app.config["PROFILE_SAMPLE_RATE"] = float(os.environ.get("PROFILE_SAMPLE_RATE", 0.05))
+    app.config["PROFILE_DIR"] = os.environ.get("PROFILE_DIR")
+    app.config["METRICS_TOKEN"] = os.environ.get("METRICS_TOKEN")
+    
     app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key")
     app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
     
     # Database configuration
     app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///bakery.db")
-    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-        "pool_recycle": 300,
-        "pool_pre_ping": True,
-    }
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = _engine_options(app.config["SQLALCHEMY_DATABASE_URI"])
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     
+    # Réplicas de lectura, separadas por comas; el primario es DATABASE_URL
+    replica_urls = [u for u in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if u]
+    app.config["SQLALCHEMY_BINDS"] = replica_binds(replica_urls, _engine_options)
+    app.config["DATABASE_REPLICA_BINDS"] = list(app.config["SQLALCHEMY_BINDS"])
+    # Retraso máximo esperado de las réplicas: durante ese tiempo tras escribir se lee del primario
+    app.config["DATABASE_REPLICA_STICKY_SECONDS"] = float(os.environ.get("DATABASE_REPLICA_STICKY_SECONDS", 5))
+    
+    # Facturas: el PDF se genera en segundo plano después del checkout
+    app.config["INVOICE_WORKERS"] = int(os.environ.get("INVOICE_WORKERS", 2))
+    app.config["INVOICE_QUEUE_SYNC"] = os.environ.get("INVOICE_QUEUE_SYNC") == "1"
+    # La confirmación recarga cada INVOICE_POLL_SECONDS, como mucho INVOICE_POLL_LIMIT veces
+    app.config["INVOICE_POLL_SECONDS"] = int(os.environ.get("INVOICE_POLL_SECONDS", 3))
+    app.config["INVOICE_POLL_LIMIT"] = int(os.environ.get("INVOICE_POLL_LIMIT", 10))
+    # Un render 'pending' más antiguo se da por perdido y se reencola al arrancar
+    app.config["INVOICE_STUCK_SECONDS"] = int(os.environ.get("INVOICE_STUCK_SECONDS", 120))
+    # Almacenamiento de los PDF: 'local' (directorio repartido) o 's3'
+    app.config["INVOICE_STORAGE"] = os.environ.get("INVOICE_STORAGE", "local")
+    app.config["INVOICE_STORAGE_PATH"] = os.environ.get("INVOICE_STORAGE_PATH")
+    app.config["INVOICE_S3_BUCKET"] = os.environ.get("INVOICE_S3_BUCKET")
+    app.config["INVOICE_S3_PREFIX"] = os.environ.get("INVOICE_S3_PREFIX", "invoices")
+    app.config["INVOICE_S3_ENDPOINT_URL"] = os.environ.get("INVOICE_S3_ENDPOINT_URL")
+    # Textos fijos de la factura
+    app.config["INVOICE_TITLE"] = os.environ.get("INVOICE_TITLE", "Panadería Delicias")
+    app.config["INVOICE_SUBTITLE"] = os.environ.get("INVOICE_SUBTITLE", "Calidad y Sabor en Cada Bocado")
+    app.config["INVOICE_THANKS"] = os.environ.get("INVOICE_THANKS", "¡Gracias por su compra! Vuelva pronto.")
+    app.config["INVOICE_CONTACT"] = os.environ.get("INVOICE_CONTACT", "Para reclamos o consultas: contacto@panaderiadelicias.com")
+    app.config["INVOICE_NAME_MAX_LENGTH"] = int(os.environ.get("INVOICE_NAME_MAX_LENGTH", 25))
+    # 'eager' genera el PDF tras el checkout; 'lazy' lo genera en la primera descarga
+    app.config["INVOICE_RENDER_MODE"] = os.environ.get("INVOICE_RENDER_MODE", "eager")
+    app.config["INVOICE_CACHE_BYTES"] = int(os.environ.get("INVOICE_CACHE_BYTES", 32 * 1024 * 1024))
+    app.config["INVOICE_CACHE_DIR"] = os.environ.get("INVOICE_CACHE_DIR")
+    app.config["INVOICE_CACHE_SPILL_BYTES"] = int(os.environ.get("INVOICE_CACHE_SPILL_BYTES", 512 * 1024 * 1024))
+    
+    # Carrito: 'session' (cookie firmada, sin escrituras en la BD) o 'db' (CartItem)
+    app.config["CART_BACKEND"] = os.environ.get("CART_BACKEND", "session")
+    
+    # Caché del catálogo (categorías y destacados)
+    app.config["CATALOG_CACHE_TTL"] = int(os.environ.get("CATALOG_CACHE_TTL", 300))
+    app.config["CATALOG_CACHE_SIZE"] = int(os.environ.get("CATALOG_CACHE_SIZE", 256))
+    app.config["CATALOG_CACHE_BACKEND"] = os.environ.get("CATALOG_CACHE_BACKEND")
+    
+    # Parámetros del hash de contraseñas (formato de werkzeug) y cuántos se calculan a la vez
+    app.config["PASSWORD_HASH_METHOD"] = os.environ.get("PASSWORD_HASH_METHOD", "scrypt")
+    app.config["PASSWORD_HASH_WORKERS"] = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))
+    
+    # Inventario diario: segundos que se cachean las unidades que quedan en los listados
+    app.config["STOCK_CACHE_TTL"] = int(os.environ.get("STOCK_CACHE_TTL", 5))
+    
+    # Segundos que se cachean los totales del panel de administración (COUNT(*))
+    app.config["DASHBOARD_COUNTS_TTL"] = int(os.environ.get("DASHBOARD_COUNTS_TTL", 60))
+    
+    # Caché de la identidad del usuario con sesión (ver identity.py)
+    app.config["USER_CACHE_TTL"] = int(os.environ.get("USER_CACHE_TTL", 60))
+    app.config["USER_CACHE_SIZE"] = int(os.environ.get("USER_CACHE_SIZE", 1024))
+    app.config["USER_CACHE_BACKEND"] = os.environ.get("USER_CACHE_BACKEND")
+    # Fragmentos de plantilla del catálogo ya renderizados, en la misma caché
+    app.config["CATALOG_FRAGMENT_CACHE"] = os.environ.get("CATALOG_FRAGMENT_CACHE", "1") == "1"
+    
+    # Estáticos con huella de contenido y compresión de las respuestas dinámicas
+    app.config["STATIC_FINGERPRINT"] = os.environ.get("STATIC_FINGERPRINT", "1") == "1"
+    app.config["COMPRESSION"] = os.environ.get("COMPRESSION", "1") == "1"
+    app.config["COMPRESSION_MIN_SIZE"] = int(os.environ.get("COMPRESSION_MIN_SIZE", 500))
+    app.config["COMPRESSION_BROTLI_QUALITY"] = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", 5))
+    app.config["COMPRESSION_GZIP_LEVEL"] = int(os.environ.get("COMPRESSION_GZIP_LEVEL", 6))
+    
     # Initialize extensions
     db.init_app(app)
     login_manager.init_app(app)
     migrate.init_app(app, db)
+    init_routing(app)
     
     # Login manager configuration
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
     login_manager.login_message_category = 'info'
     
+    from passwords import init_password_hasher
+    init_password_hasher(app)
+    
+    from identity import init_user_cache, load_cached_user
+    init_user_cache(app)
+    
     @login_manager.user_loader
     def load_user(user_id):
-        from models import User
-        return User.query.get(int(user_id))
+        return load_cached_user(int(user_id))
+    
+    from catalog import init_catalog_cache
+    init_catalog_cache(app)
+    
+    from stock import init_stock_cache
+    init_stock_cache(app)
+    
+    from sales import init_counter_cache
+    init_counter_cache(app)
+    
+    from fragments import FragmentCacheExtension, catalog_conditional
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    
+    from invoices.storage import init_invoice_storage
+    init_invoice_storage(app)
+    
+    from invoices.pdf import init_invoice_renderer
+    init_invoice_renderer(app)
+    
+    from invoices.render import init_invoice_cache
+    init_invoice_cache(app)
+    
+    from assets import init_assets
+    init_assets(app)
+    
+    from compression import init_compression
+    init_compression(app)
+    
+    from profiling import init_profiling
+    init_profiling(app)
+    
+    from bootstrap import bootstrap_benchmark_command, bootstrap_command, seed_command
+    app.cli.add_command(bootstrap_command)
+    app.cli.add_command(bootstrap_benchmark_command)
+    app.cli.add_command(seed_command)
+    
+    from search import search_cli
+    app.cli.add_command(search_cli)
+    
+    from sales import sales_cli
+    app.cli.add_command(sales_cli)
+    
+    from exports import orders_cli
+    app.cli.add_command(orders_cli)
+    
+    from invoices.cli import invoices_cli
+    app.cli.add_command(invoices_cli)
+    
+    from assets import assets_cli
+    app.cli.add_command(assets_cli)
+    
+    from passwords import passwords_cli
+    app.cli.add_command(passwords_cli)
+    
+    from stock import stock_cli
+    app.cli.add_command(stock_cli)
+    
+    from pagination import pagination_cli
+    app.cli.add_command(pagination_cli)
+    
+    from cart.cli import cart_cli
+    app.cli.add_command(cart_cli)
+    
+    from loadtest import load_cli
+    app.cli.add_command(load_cli)
     
     # Register blueprints
     from auth import bp as auth_bp
@@ -62,12 +226,13 @@ def create_app():
     
     # Main routes
     @app.route('/')
+    @catalog_conditional
     def index():
         from flask import render_template
-        from models import Product, Category
+        from catalog import get_featured_products, get_categories
         
-        featured_products = Product.query.filter_by(featured=True).limit(6).all()
-        categories = Category.query.all()
+        featured_products = get_featured_products()
+        categories = get_categories()
         
         return render_template('index.html', 
                              featured_products=featured_products,
@@ -75,80 +240,14 @@ def create_app():
     
     @app.route('/orders')
     def order_history():
-        from flask import render_template
-        from flask_login import login_required, current_user
-        from models import Order
+        from flask import render_template, request
+        from flask_login import current_user
+        from history import order_history_page
         
         if not current_user.is_authenticated:
             return login_manager.unauthorized()
             
-        orders = Order.query.filter_by(user_id=current_user.id).order_by(Order.created_at.desc()).all()
-        return render_template('orders/history.html', orders=orders)
-    
-    with app.app_context():
-        import models
-        db.create_all()
-        
-        # Create default admin user and sample data
-        from werkzeug.security import generate_password_hash
-        from models import User, Category, Product
-        
-        if not User.query.filter_by(email='admin@bakery.com').first():
-            admin_user = User(
-                username='admin',
-                email='admin@bakery.com',
-                password_hash=generate_password_hash('admin123'),
-                is_admin=True
-            )
-            db.session.add(admin_user)
-            
-        # Create default categories
-        if not Category.query.first():
-            categories = [
-                Category(name='Pan', description='Pan fresco recién horneado'),
-                Category(name='Pasteles', description='Deliciosos pasteles para toda ocasión'),
-                Category(name='Pastelería', description='Dulces y salados artesanales'),
-                Category(name='Galletas', description='Galletas caseras tradicionales')
-            ]
-            for category in categories:
-                db.session.add(category)
-            
-            db.session.commit()
-            
-            # Add sample products
-            sample_products = [
-                Product(name='Pan de Masa Madre', description='Pan artesanal tradicional con corteza crujiente y miga esponjosa', 
-                       price=5.99, category_id=1, featured=True, active=True),
-                Product(name='Croissant de Chocolate', description='Hojaldrado mantecoso relleno de chocolate belga', 
-                       price=3.50, category_id=3, featured=True, active=True),
-                Product(name='Pastel de Vainilla', description='Clásico pastel de vainilla con crema de mantequilla', 
-                       price=25.00, category_id=2, featured=True, active=True),
-                Product(name='Galletas Chispas Chocolate', description='Galletas recién horneadas con chispas de chocolate premium', 
-                       price=2.99, category_id=4, featured=False, active=True),
-                Product(name='Pan Integral', description='Pan saludable de trigo integral con semillas', 
-                       price=4.99, category_id=1, featured=False, active=True),
-                Product(name='Tarta de Fresa', description='Fresas frescas sobre crema pastelera de vainilla', 
-                       price=4.75, category_id=3, featured=True, active=True),
-                Product(name='Pastel Red Velvet', description='Delicioso pastel red velvet con frosting de queso crema', 
-                       price=28.00, category_id=2, featured=False, active=True),
-                Product(name='Galletas de Avena', description='Galletas saludables de avena con pasas', 
-                       price=2.75, category_id=4, featured=False, active=True),
-                Product(name='Baguette Francesa', description='Auténtica baguette crujiente estilo francés', 
-                       price=3.25, category_id=1, featured=False, active=True),
-                Product(name='Éclair de Chocolate', description='Hojaldre relleno de crema y cubierto de chocolate', 
-                       price=4.50, category_id=3, featured=False, active=True),
-                Product(name='Pastel de Zanahoria', description='Húmedo pastel de zanahoria con frosting de queso', 
-                       price=26.00, category_id=2, featured=True, active=True),
-                Product(name='Alfajores', description='Deliciosos alfajores rellenos de dulce de leche', 
-                       price=3.99, category_id=4, featured=True, active=True)
-            ]
-            
-            for product in sample_products:
-                db.session.add(product)
-                
-        db.session.commit()
+        page = order_history_page(current_user.id, cursor=request.args.get('cursor'))
+        return render_template('orders/history.html', page=page)
     
     return app
-
-# Create app instance
-app = create_app()
@@ -0,0 +1,166 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+
+import click
+from flask import current_app, url_for
+from flask.cli import AppGroup
+from markupsafe import Markup, escape
+
+# Recursos estáticos con huella de contenido: url_for('static', ...) genera
+# /static/css/custom.<hash>.css y esa URL se sirve con caché de un año e
+# `immutable`, porque si el archivo cambia cambia también la URL. No hay
+# paso de build: el hash se calcula al pedir la URL por primera vez y el
+# archivo sigue en su ruta original (sin huella también se sirve, con la
+# caché por defecto).
+
+HASH_LENGTH = 12
+ONE_YEAR = 365 * 24 * 3600
+_HASHED = re.compile(rf'^(?P<stem>.+)\.(?P<hash>[0-9a-f]{{{HASH_LENGTH}}})(?P<ext>\.[^./]+)$')
+
+# Variantes WebP que genera `flask assets build` para las imágenes de static/img
+IMAGE_WIDTHS = (120, 240)
+IMAGE_SOURCES = ('.jpeg', '.jpg', '.png')
+
+
+class AssetManifest:
+    """Hashes de los archivos estáticos, calculados bajo demanda."""
+
+    def __init__(self, static_folder, auto_reload=False):
+        self.static_folder = static_folder
+        # En desarrollo se vuelve a calcular el hash si cambia la fecha del archivo
+        self.auto_reload = auto_reload
+        self._hashes = {}
+        self._variants = {}
+        self._lock = threading.Lock()
+
+    def _path(self, filename):
+        return os.path.join(self.static_folder, *filename.split('/'))
+
+    def file_hash(self, filename):
+        """Hash del contenido de `filename`, o None si no existe."""
+        path = self._path(filename)
+        entry = self._hashes.get(filename)
+        if entry is not None and not self.auto_reload:
+            return entry[1]
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+        if entry is not None and entry[0] == mtime:
+            return entry[1]
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:HASH_LENGTH]
+        with self._lock:
+            self._hashes[filename] = (mtime, digest)
+        return digest
+
+    def hashed(self, filename):
+        digest = self.file_hash(filename)
+        if digest is None:
+            return filename
+        stem, ext = os.path.splitext(filename)
+        return f'{stem}.{digest}{ext}'
+
+    def resolve(self, filename):
+        """(archivo original, huella vigente) de una ruta pedida."""
+        match = _HASHED.match(filename)
+        if match:
+            original = match['stem'] + match['ext']
+            digest = self.file_hash(original)
+            if digest is not None:
+                return original, digest == match['hash']
+        return filename, False
+
+    def image_variants(self, filename):
+        """[(archivo, ancho)] de las variantes WebP existentes de una imagen."""
+        variants = self._variants.get(filename)
+        if variants is None or self.auto_reload:
+            stem = os.path.splitext(filename)[0]
+            variants = [(f'{stem}-{width}w.webp', width) for width in IMAGE_WIDTHS
+                        if os.path.exists(self._path(f'{stem}-{width}w.webp'))]
+            self._variants[filename] = variants
+        return variants
+
+
+def init_assets(app):
+    manifest = AssetManifest(app.static_folder, auto_reload=app.debug)
+    app.extensions['asset_manifest'] = manifest
+    app.jinja_env.globals['picture'] = picture
+    if not app.config['STATIC_FINGERPRINT']:
+        return
+
+    @app.url_defaults
+    def fingerprint_static(endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = manifest.hashed(values['filename'])
+
+    def static(filename):
+        original, fingerprinted = manifest.resolve(filename)
+        response = app.send_static_file(original)
+        if fingerprinted:
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = ONE_YEAR
+            response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = static
+
+
+def get_asset_manifest(app=None):
+    return (app or current_app).extensions['asset_manifest']
+
+
+def picture(filename, alt, width, height=None, **attrs):
+    """<picture> con las variantes WebP de una imagen y el original como respaldo."""
+    img_attrs = ''.join(f' {name.replace("_", "-")}="{escape(value)}"' for name, value in attrs.items())
+    size = f' width="{width}"' + (f' height="{height}"' if height else '')
+    img = (f'<img src="{escape(url_for("static", filename=filename))}" alt="{escape(alt)}"'
+           f'{size} loading="lazy"{img_attrs}>')
+    variants = get_asset_manifest().image_variants(filename)
+    if not variants:
+        return Markup(img)
+    srcset = ', '.join(f'{url_for("static", filename=name)} {w}w' for name, w in variants)
+    return Markup(f'<picture><source type="image/webp" srcset="{escape(srcset)}" '
+                  f'sizes="{width}px">{img}</picture>')
+
+
+def build_image_variants(static_folder, widths=IMAGE_WIDTHS, quality=80):
+    """Genera en static/img las variantes WebP redimensionadas de cada imagen."""
+    # Pillow solo hace falta para generar las variantes, no para servirlas
+    from PIL import Image
+
+    # En DEBUG Pillow registra cada plugin que importa
+    logging.getLogger('PIL').setLevel(logging.INFO)
+
+    img_dir = os.path.join(static_folder, 'img')
+    written = []
+    for name in sorted(os.listdir(img_dir)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() not in IMAGE_SOURCES:
+            continue
+        with Image.open(os.path.join(img_dir, name)) as source:
+            source = source.convert('RGB')
+            for width in widths:
+                # Sin agrandar: los anchos mayores que la original se omiten
+                if width > source.width:
+                    continue
+                height = round(source.height * width / source.width)
+                path = os.path.join(img_dir, f'{stem}-{width}w.webp')
+                source.resize((width, height), Image.LANCZOS).save(path, 'WEBP', quality=quality, method=6)
+                written.append((path, os.path.getsize(path)))
+    return written
+
+
+assets_cli = AppGroup('assets', help='Recursos estáticos.')
+
+
+@assets_cli.command('build')
+@click.option('--quality', default=80, show_default=True, help='Calidad WebP (0-100).')
+def build_command(quality):
+    """Genera las variantes WebP de las imágenes de static/img."""
+    for path, size in build_image_variants(current_app.static_folder, quality=quality):
+        click.echo(f'{os.path.relpath(path, current_app.static_folder)}: {size / 1024:.1f} KiB')
@@ -1,9 +1,13 @@
 from flask import render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, current_user
+from sqlalchemy.exc import IntegrityError
 from auth import bp
 from app1 import db
 from models import User
 from forms import LoginForm, RegistrationForm
+from cart.storage import merge_cart_on_login, save_cart_on_logout
+from identity import cache_user, invalidate_user
+from routing import primary
 
 @bp.route('/login', methods=['GET', 'POST'])
 def login():
@@ -14,7 +18,14 @@ def login():
     if form.validate_on_submit():
         user = User.query.filter_by(email=form.email.data).first()
         if user and user.check_password(form.password.data):
+            if user.password_needs_rehash():
+                # Cambiaron los parámetros del hash: se aprovecha que se conoce la contraseña
+                user.set_password(form.password.data)
+                db.session.commit()
             login_user(user)
+            # Copia fresca de la identidad para las peticiones siguientes
+            cache_user(user)
+            merge_cart_on_login(user.id)
             next_page = request.args.get('next')
             flash('Has iniciado sesión exitosamente')
             return redirect(next_page) if next_page else redirect(url_for('index'))
@@ -32,14 +43,24 @@ def register():
         user = User(username=form.username.data, email=form.email.data)
         user.set_password(form.password.data)
         db.session.add(user)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Otro registro con el mismo nombre o correo entró entre la comprobación y el commit
+            db.session.rollback()
+            flash('El nombre de usuario o el correo ya están registrados.', 'danger')
+            return render_template('auth/register.html', form=form)
         flash('Registro exitoso! Ahora puedes iniciar sesión.')
         return redirect(url_for('auth.login'))
     
     return render_template('auth/register.html', form=form)
 
 @bp.route('/logout')
+@primary
 def logout():
+    if current_user.is_authenticated:
+        save_cart_on_logout(current_user.id)
+        invalidate_user(current_user.id)
     logout_user()
     flash('Has cerrado sesión.', 'info')
     return redirect(url_for('index'))
@@ -0,0 +1,232 @@
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+import click
+import sqlalchemy as sa
+from flask.cli import with_appcontext
+from flask_migrate import stamp, upgrade
+
+from app1 import create_app, db
+from models import User, Category, Product
+from search import ensure_search_index
+
+# Preparación de la base de datos, fuera del arranque de la app: los
+# workers ya no crean tablas ni siembran datos, eso se hace una vez por
+# despliegue con `flask bootstrap` (o `flask seed` para solo los datos).
+
+# Revisión que corresponde a las bases creadas con db.create_all()
+INITIAL_REVISION = '5027f38bb965'
+
+# Tablas y columnas que crea esa revisión, las mismas que dejaba db.create_all()
+INITIAL_SCHEMA = {
+    'user': {'id', 'username', 'email', 'password_hash', 'is_admin', 'created_at'},
+    'category': {'id', 'name', 'description', 'created_at'},
+    'product': {'id', 'name', 'description', 'price', 'image_url', 'featured', 'active',
+                'created_at', 'category_id'},
+    'cart_item': {'id', 'quantity', 'created_at', 'user_id', 'product_id'},
+    'order': {'id', 'total_amount', 'status', 'created_at', 'user_id'},
+    'order_item': {'id', 'quantity', 'price', 'order_id', 'product_id'},
+    'invoice': {'id', 'invoice_number', 'order_id', 'pdf_file_path', 'created_at'},
+}
+
+
+def schema_differences(inspector):
+    """Diferencias entre la base y INITIAL_SCHEMA, como texto; vacío si coinciden."""
+    tables = set(inspector.get_table_names())
+    differences = [f'tabla de más: {t}' for t in sorted(tables - set(INITIAL_SCHEMA))]
+    differences += [f'falta la tabla: {t}' for t in sorted(set(INITIAL_SCHEMA) - tables)]
+    for table in sorted(tables & set(INITIAL_SCHEMA)):
+        columns = {c['name'] for c in inspector.get_columns(table)}
+        differences += [f'columna de más: {table}.{c}' for c in sorted(columns - INITIAL_SCHEMA[table])]
+        differences += [f'falta la columna: {table}.{c}' for c in sorted(INITIAL_SCHEMA[table] - columns)]
+    return differences
+
+
+def migrate_schema():
+    """Lleva el esquema a la última migración.
+
+    Una base creada antes de las migraciones (tablas sin `alembic_version`)
+    se marca primero con la revisión inicial, pero solo si sus tablas son
+    exactamente las de esa revisión: si no, las migraciones siguientes no
+    llegarían a crear lo que le falta y es mejor parar.
+    """
+    inspector = sa.inspect(db.engine)
+    tables = inspector.get_table_names()
+    if tables and 'alembic_version' not in tables:
+        differences = schema_differences(inspector)
+        if differences:
+            raise click.ClickException(
+                'La base no tiene migraciones y su esquema no es el de la revisión inicial '
+                f'{INITIAL_REVISION} ({"; ".join(differences)}). Márcala a mano con '
+                '`flask db stamp <revisión>` y vuelve a ejecutar `flask bootstrap`.'
+            )
+        stamp(revision=INITIAL_REVISION)
+    upgrade()
+
+
+def seed_data():
+    """Crea el usuario administrador y el catálogo de ejemplo si no existen."""
+    if not User.query.filter_by(email='admin@bakery.com').first():
+        admin_user = User(
+            username='admin',
+            email='admin@bakery.com',
+            is_admin=True
+        )
+        admin_user.set_password('admin123')
+        db.session.add(admin_user)
+
+    # Create default categories
+    if not Category.query.first():
+        categories = [
+            Category(name='Pan', description='Pan fresco recién horneado'),
+            Category(name='Pasteles', description='Deliciosos pasteles para toda ocasión'),
+            Category(name='Pastelería', description='Dulces y salados artesanales'),
+            Category(name='Galletas', description='Galletas caseras tradicionales')
+        ]
+        for category in categories:
+            db.session.add(category)
+
+        db.session.commit()
+
+        # Add sample products
+        sample_products = [
+            Product(name='Pan de Masa Madre', description='Pan artesanal tradicional con corteza crujiente y miga esponjosa', 
+                   price=5.99, category_id=1, featured=True, active=True),
+            Product(name='Croissant de Chocolate', description='Hojaldrado mantecoso relleno de chocolate belga', 
+                   price=3.50, category_id=3, featured=True, active=True),
+            Product(name='Pastel de Vainilla', description='Clásico pastel de vainilla con crema de mantequilla', 
+                   price=25.00, category_id=2, featured=True, active=True),
+            Product(name='Galletas Chispas Chocolate', description='Galletas recién horneadas con chispas de chocolate premium', 
+                   price=2.99, category_id=4, featured=False, active=True),
+            Product(name='Pan Integral', description='Pan saludable de trigo integral con semillas', 
+                   price=4.99, category_id=1, featured=False, active=True),
+            Product(name='Tarta de Fresa', description='Fresas frescas sobre crema pastelera de vainilla', 
+                   price=4.75, category_id=3, featured=True, active=True),
+            Product(name='Pastel Red Velvet', description='Delicioso pastel red velvet con frosting de queso crema', 
+                   price=28.00, category_id=2, featured=False, active=True),
+            Product(name='Galletas de Avena', description='Galletas saludables de avena con pasas', 
+                   price=2.75, category_id=4, featured=False, active=True),
+            Product(name='Baguette Francesa', description='Auténtica baguette crujiente estilo francés', 
+                   price=3.25, category_id=1, featured=False, active=True),
+            Product(name='Éclair de Chocolate', description='Hojaldre relleno de crema y cubierto de chocolate', 
+                   price=4.50, category_id=3, featured=False, active=True),
+            Product(name='Pastel de Zanahoria', description='Húmedo pastel de zanahoria con frosting de queso', 
+                   price=26.00, category_id=2, featured=True, active=True),
+            Product(name='Alfajores', description='Deliciosos alfajores rellenos de dulce de leche', 
+                   price=3.99, category_id=4, featured=True, active=True)
+        ]
+
+        for product in sample_products:
+            db.session.add(product)
+
+    db.session.commit()
+
+
+def _create_scratch_app(tmp, env):
+    """App sobre una base SQLite vacía en `tmp`; `env` sustituye al entorno al crearla."""
+    env = {
+        'DATABASE_URL': f'sqlite:///{os.path.join(tmp, "bakery.db")}',
+        'DATABASE_REPLICA_URLS': '',
+        'INVOICE_STORAGE_PATH': os.path.join(tmp, 'invoices'),
+        'INVOICE_CACHE_DIR': os.path.join(tmp, 'invoice-cache'),
+        **env,
+    }
+    saved = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+    try:
+        app = create_app()
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+    app.config['WTF_CSRF_ENABLED'] = False
+    return app
+
+
+def _dispose(app):
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@contextmanager
+def scratch_app(**env):
+    """App con una base SQLite temporal ya preparada, para los benchmarks.
+
+    Las variables de `env` sustituyen a las del entorno al crear la app; la
+    base configurada no se toca.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        app = _create_scratch_app(tmp, env)
+        with app.app_context():
+            migrate_schema()
+            ensure_search_index()
+            seed_data()
+        try:
+            yield app
+        finally:
+            _dispose(app)
+
+
+@click.command('bootstrap')
+@click.option('--no-seed', is_flag=True, help='No crear los datos iniciales.')
+@with_appcontext
+def bootstrap_command(no_seed):
+    """Migra el esquema, crea el índice de búsqueda y siembra los datos iniciales."""
+    migrate_schema()
+    ensure_search_index()
+    if not no_seed:
+        seed_data()
+    click.echo('Base de datos lista.')
+
+
+@click.command('seed')
+@with_appcontext
+def seed_command():
+    """Crea el usuario administrador y el catálogo de ejemplo si no existen."""
+    seed_data()
+    click.echo('Datos iniciales creados.')
+
+
+@click.command('bootstrap-benchmark')
+@click.option('--repeat', default=3, show_default=True, help='Arranques a medir.')
+def bootstrap_benchmark_command(repeat):
+    """Mide create_app y cada paso de `flask bootstrap` sobre bases SQLite temporales.
+
+    Cada repetición crea una app nueva con su propia base vacía y la
+    prepara dos veces: la primera crea todo y la segunda es la de un
+    despliegue sin cambios. La base configurada no se toca.
+    """
+    steps = [('create_app', None), ('migrate_schema', migrate_schema),
+             ('ensure_search_index', ensure_search_index), ('seed_data', seed_data)]
+    timings = {(name, again): [] for name, _ in steps for again in (False, True)}
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            app = _create_scratch_app(tmp, {})
+            timings['create_app', False].append(time.perf_counter() - start)
+            try:
+                with app.app_context():
+                    for again in (False, True):
+                        for name, step in steps[1:]:
+                            start = time.perf_counter()
+                            step()
+                            timings[name, again].append(time.perf_counter() - start)
+            finally:
+                _dispose(app)
+
+    def median(values):
+        return sorted(values)[len(values) // 2] * 1000
+
+    for name, _ in steps:
+        line = f'{name}: {median(timings[name, False]):.1f} ms'
+        if timings[name, True]:
+            line += f' (base ya preparada: {median(timings[name, True]):.1f} ms)'
+        click.echo(line)
+    total = sum(median(timings[name, False]) for name, _ in steps)
+    click.echo(f'Total en base vacía: {total:.1f} ms (mediana de {repeat})')
@@ -2,4 +2,4 @@ from flask import Blueprint
 
 bp = Blueprint('cart', __name__)
 
-from cart import routes
+from cart import routes, api
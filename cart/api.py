@@ -0,0 +1,99 @@
+from decimal import Decimal
+
+from flask import jsonify, request
+
+from cart import bp
+from app1 import db
+from models import Product
+from cart.storage import get_cart, cart_total
+
+# API JSON del carrito: static/js/cart.js la usa para actualizar la página
+# sin recargarla. Las rutas con formulario de cart.routes siguen funcionando
+# como respaldo cuando no hay JavaScript.
+
+TAX_RATE = Decimal('0.08')
+
+
+def _money(value):
+    return f'{value:.2f}'
+
+
+def _line_json(item):
+    unit_price = item.product.price
+    return {
+        'product_id': item.product_id,
+        'name': item.product.name,
+        'quantity': item.quantity,
+        'unit_price': _money(unit_price),
+        'total': _money(Decimal(item.quantity) * unit_price),
+    }
+
+
+def _cart_json(items):
+    subtotal = cart_total(items)
+    tax = subtotal * TAX_RATE
+    return {
+        'lines': len(items),
+        'count': sum(item.quantity for item in items),
+        'subtotal': _money(subtotal),
+        'tax': _money(tax),
+        'total': _money(subtotal + tax),
+    }
+
+
+def _response(cart, line=None, removed_product_id=None):
+    payload = {'cart': _cart_json(cart.lines())}
+    if line is not None:
+        payload['line'] = _line_json(line)
+    if removed_product_id is not None:
+        payload['removed'] = removed_product_id
+    return jsonify(payload)
+
+
+def _quantity(default=1):
+    data = request.get_json(silent=True) or request.form
+    try:
+        return int(data.get('quantity', default))
+    except (TypeError, ValueError):
+        return None
+
+
+@bp.route('/api', methods=['GET'])
+def api_summary():
+    items = get_cart().lines()
+    return jsonify(cart=_cart_json(items), items=[_line_json(item) for item in items])
+
+
+@bp.route('/api/items/<int:product_id>', methods=['POST'])
+def api_add_item(product_id):
+    quantity = _quantity()
+    if quantity is None or quantity < 1:
+        return jsonify(error='Cantidad inválida.'), 400
+    product = db.session.get(Product, product_id)
+    if product is None or not product.active:
+        return jsonify(error='Producto no encontrado.'), 404
+
+    cart = get_cart()
+    return _response(cart, line=cart.add(product, quantity))
+
+
+@bp.route('/api/items/<int:product_id>', methods=['PUT', 'PATCH'])
+def api_update_item(product_id):
+    quantity = _quantity(default=None)
+    if quantity is None:
+        return jsonify(error='Cantidad inválida.'), 400
+
+    cart = get_cart()
+    if not cart.set(product_id, quantity):
+        return jsonify(error='El producto no está en tu carrito.'), 404
+    if quantity > 0:
+        return _response(cart, line=cart.get(product_id))
+    return _response(cart, removed_product_id=product_id)
+
+
+@bp.route('/api/items/<int:product_id>', methods=['DELETE'])
+def api_remove_item(product_id):
+    cart = get_cart()
+    if not cart.remove(product_id):
+        return jsonify(error='El producto no está en tu carrito.'), 404
+    return _response(cart, removed_product_id=product_id)
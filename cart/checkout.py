@@ -0,0 +1,117 @@
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy.exc import IntegrityError
+
+from app1 import db
+from models import CartItem, Order, OrderItem, Invoice
+from loaders import load_profile
+from sales import record_sales
+from stock import OutOfStock, reserve_stock
+from cart.storage import write_cart_items
+from invoices.jobs import PENDING
+from invoices.render import lazy_rendering
+
+
+class CheckoutError(Exception):
+    """El carrito no se pudo convertir en pedido; el mensaje es apto para mostrar."""
+
+
+def find_order_by_key(user_id, idempotency_key):
+    if not idempotency_key:
+        return None
+    return Order.query.filter_by(user_id=user_id, idempotency_key=idempotency_key).first()
+
+
+def place_order(user_id, idempotency_key=None, cart_quantities=None):
+    """Convierte el carrito del usuario en un pedido dentro de una sola transacción.
+
+    Bloquea las filas del carrito (SELECT ... FOR UPDATE donde el motor lo
+    soporta), calcula el total en Decimal, crea pedido, líneas y factura,
+    vacía el carrito, descuenta el inventario del día y confirma una única
+    vez. Reintentos con la misma `idempotency_key` devuelven el pedido ya
+    creado.
+
+    `cart_quantities` ({product_id: cantidad}) viene del carrito de sesión y
+    reemplaza las filas CartItem del usuario dentro de la misma transacción.
+    """
+    existing = find_order_by_key(user_id, idempotency_key)
+    if existing:
+        return existing
+
+    try:
+        # Dentro del bloque protegido: un doble envío paralelo puede chocar
+        # aquí con las filas CartItem que está escribiendo la otra petición
+        if cart_quantities is not None:
+            write_cart_items(user_id, cart_quantities)
+
+        cart_items = (CartItem.query.options(*load_profile('cart'))
+                      .filter_by(user_id=user_id)
+                      .with_for_update(of=CartItem)
+                      .all())
+        if not cart_items:
+            db.session.rollback()
+            # Puede que un envío paralelo con la misma clave acabe de vaciarlo
+            existing = find_order_by_key(user_id, idempotency_key)
+            if existing:
+                return existing
+            raise CheckoutError('Your cart is empty!')
+
+        names = {item.product_id: item.product.name for item in cart_items}
+        order = _create_order(user_id, idempotency_key, cart_items)
+        # Lo último antes del commit: así las filas de inventario de los
+        # productos más pedidos quedan bloqueadas el menor tiempo posible
+        reserve_stock({item.product_id: item.quantity for item in cart_items},
+                      day=order.created_at.date())
+        db.session.commit()
+    except OutOfStock as exc:
+        db.session.rollback()
+        raise CheckoutError(f'No quedan suficientes unidades de {names[exc.product_id]} por hoy '
+                            f'(quedan {exc.remaining}). Ajusta tu carrito e inténtalo de nuevo.')
+    except IntegrityError:
+        # Doble envío concurrente con la misma clave: ganó la otra petición
+        db.session.rollback()
+        existing = find_order_by_key(user_id, idempotency_key)
+        if existing:
+            return existing
+        raise
+    return order
+
+
+def _create_order(user_id, idempotency_key, cart_items):
+    total = sum((Decimal(item.quantity) * item.product.price for item in cart_items), Decimal('0'))
+
+    order = Order(user_id=user_id, total_amount=total, idempotency_key=idempotency_key)
+    db.session.add(order)
+    db.session.flush()  # Get the order ID
+
+    db.session.add_all([
+        OrderItem(order_id=order.id, product_id=item.product_id,
+                  quantity=item.quantity, price=item.product.price)
+        for item in cart_items
+    ])
+
+    # Vaciar el carrito; si otra petición ya lo consumió, el conteo no cuadra
+    cart_ids = [item.id for item in cart_items]
+    deleted = (CartItem.query.filter(CartItem.id.in_(cart_ids))
+               .delete(synchronize_session=False))
+    if deleted != len(cart_ids):
+        db.session.rollback()
+        raise CheckoutError('Tu carrito cambió mientras se procesaba el pedido. Revísalo e inténtalo de nuevo.')
+
+    # Registrar la factura; el PDF lo genera un worker en segundo plano
+    invoice_number = f"INV-{order.id}-{datetime.now().strftime('%Y%m%d')}"
+    invoice = Invoice(invoice_number=invoice_number, order_id=order.id)
+    if not lazy_rendering():
+        # La ruta de checkout lo encola tras el commit
+        invoice.render_status = PENDING
+        invoice.render_requested_at = datetime.utcnow()
+    db.session.add(invoice)
+
+    # El rollup también es una fila por producto y día: va al final, como el inventario
+    record_sales(order.created_at.date(), [
+        (item.product_id, item.product.category_id, item.quantity,
+         Decimal(item.quantity) * item.product.price)
+        for item in cart_items
+    ])
+    return order
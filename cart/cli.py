@@ -0,0 +1,74 @@
+import time
+from collections import Counter
+
+import click
+import sqlalchemy as sa
+from flask.cli import AppGroup
+from sqlalchemy import event
+
+from app1 import db
+from models import Product
+from bootstrap import scratch_app
+
+cart_cli = AppGroup('cart', help='Carrito de compras.')
+
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def _interactions(product_ids, count):
+    """(método, url, datos) de una sesión de compra típica: agregar, cambiar, ver y quitar."""
+    steps = []
+    for i in range(count):
+        product_id = product_ids[(i // 4) % len(product_ids)]
+        steps.append((
+            ('POST', f'/cart/add/{product_id}', {'quantity': 1}),
+            ('POST', f'/cart/update/{product_id}', {'quantity': 3}),
+            ('GET', '/cart/', None),
+            ('GET', f'/cart/remove/{product_id}', None),
+        )[i % 4])
+    return steps
+
+
+@cart_cli.command('benchmark')
+@click.option('--interactions', default=1000, show_default=True, help='Interacciones con el carrito por backend.')
+@click.option('--products', default=6, show_default=True, help='Productos distintos que se agregan.')
+def benchmark_command(interactions, products):
+    """Cuenta las escrituras en la BD por cada 1.000 interacciones con el carrito, por backend.
+
+    Cada backend usa una base SQLite temporal; la configurada no se toca.
+    """
+    for backend in ('db', 'session'):
+        with scratch_app(CART_BACKEND=backend, LOG_LEVEL='WARNING') as app:
+            client = app.test_client()
+            client.post('/auth/login', data={'email': 'admin@bakery.com', 'password': 'admin123'})
+            with app.app_context():
+                product_ids = db.session.execute(
+                    sa.select(Product.id).where(Product.active.is_(True)).order_by(Product.id).limit(products)
+                ).scalars().all()
+                engines = list(db.engines.values())
+            steps = _interactions(product_ids, interactions)
+
+            statements = Counter()
+
+            def count(conn, cursor, statement, parameters, context, executemany):
+                statements[statement.lstrip().split(None, 1)[0].upper()] += 1
+
+            for engine in engines:
+                event.listen(engine, 'before_cursor_execute', count)
+            cookie = 0
+            started = time.perf_counter()
+            for method, url, data in steps:
+                response = client.open(url, method=method, data=data)
+                for header in response.headers.getlist('Set-Cookie'):
+                    if header.startswith('session='):
+                        cookie = max(cookie, len(header))
+            elapsed = time.perf_counter() - started
+            for engine in engines:
+                event.remove(engine, 'before_cursor_execute', count)
+
+        per_thousand = 1000 / interactions
+        writes = sum(statements[verb] for verb in WRITES)
+        click.echo(f'{backend}: {writes * per_thousand:.0f} escrituras y '
+                   f'{sum(statements.values()) * per_thousand:.0f} sentencias por 1.000 interacciones '
+                   f'({", ".join(f"{verb} {statements[verb]}" for verb in WRITES)}), '
+                   f'{interactions / elapsed:.0f} interacciones/s, cookie de hasta {cookie} bytes.')
@@ -1,208 +1,83 @@
 from flask import (
     render_template, redirect, url_for, flash, request, jsonify,
-    send_file, abort, current_app
+    abort, current_app
 )
+from werkzeug.wsgi import wrap_file
 from flask_login import login_required, current_user
 from cart import bp
 from app1 import db
-from models import Product, CartItem, Order, OrderItem, Invoice
+from models import Product, Order
 from forms import CartItemForm
-import os
-from datetime import datetime
-from fpdf import FPDF
+from invoices import (
+    enqueue_invoice, retry_invoice_render, open_invoice_file, lazy_rendering, open_rendered_invoice
+)
+from invoices.jobs import PENDING, FAILED
+from loaders import load_profile
+from cart.checkout import place_order, CheckoutError
+from cart.storage import get_cart, uses_session_cart
+from routing import primary
+import uuid
 
 
 @bp.route('/')
-@login_required
 def index():
-    cart_items = CartItem.query.filter_by(user_id=current_user.id).all()
+    cart_items = get_cart().lines()
     total = sum(item.total_price for item in cart_items)
-    return render_template('cart/index.html', cart_items=cart_items, total=total)
+    # Clave de idempotencia del formulario de pago: un doble envío no duplica el pedido
+    checkout_key = uuid.uuid4().hex
+    return render_template('cart/index.html', cart_items=cart_items, total=total,
+                           checkout_key=checkout_key)
 
 @bp.route('/add/<int:product_id>', methods=['POST'])
-@login_required
 def add_to_cart(product_id):
     product = Product.query.get_or_404(product_id)
     quantity = request.form.get('quantity', 1, type=int)
     
-    cart_item = CartItem.query.filter_by(user_id=current_user.id, product_id=product_id).first()
-    
-    if cart_item:
-        cart_item.quantity += quantity
-    else:
-        cart_item = CartItem(user_id=current_user.id, product_id=product_id, quantity=quantity)
-        db.session.add(cart_item)
-    
-    db.session.commit()
+    get_cart().add(product, quantity)
     flash(f'{product.name} added to cart!', 'success')
     return redirect(request.referrer or url_for('products.index'))
 
-@bp.route('/update/<int:item_id>', methods=['POST'])
-@login_required
-def update_cart_item(item_id):
-    cart_item = CartItem.query.filter_by(id=item_id, user_id=current_user.id).first_or_404()
+@bp.route('/update/<int:product_id>', methods=['POST'])
+def update_cart_item(product_id):
     quantity = request.form.get('quantity', 1, type=int)
     
+    if not get_cart().set(product_id, quantity):
+        abort(404)
     if quantity > 0:
-        cart_item.quantity = quantity
-        db.session.commit()
         flash('Cart updated!', 'success')
     else:
-        db.session.delete(cart_item)
-        db.session.commit()
         flash('Item removed from cart!', 'info')
     
     return redirect(url_for('cart.index'))
 
-@bp.route('/remove/<int:item_id>')
-@login_required
-def remove_from_cart(item_id):
-    cart_item = CartItem.query.filter_by(id=item_id, user_id=current_user.id).first_or_404()
-    db.session.delete(cart_item)
-    db.session.commit()
+@bp.route('/remove/<int:product_id>')
+@primary
+def remove_from_cart(product_id):
+    if not get_cart().remove(product_id):
+        abort(404)
     flash('Item removed from cart!', 'info')
     return redirect(url_for('cart.index'))
 
 @bp.route('/checkout', methods=['POST'])
 @login_required
 def checkout():
-    cart_items = CartItem.query.filter_by(user_id=current_user.id).all()
-    
-    if not cart_items:
-        flash('Your cart is empty!', 'warning')
-        return redirect(url_for('cart.index'))
-    
-    # Calculate total
-    total = sum(item.total_price for item in cart_items)
-    
-    # Create order
-    order = Order(user_id=current_user.id, total_amount=total)
-    db.session.add(order)
-    db.session.flush()  # Get the order ID
-    
-    # Create order items
-    for cart_item in cart_items:
-        order_item = OrderItem(
-            order_id=order.id,
-            product_id=cart_item.product_id,
-            quantity=cart_item.quantity,
-            price=cart_item.product.price
-        )
-        db.session.add(order_item)
-    
-    # Clear cart
-    for cart_item in cart_items:
-        db.session.delete(cart_item)
-    
-    # --- INICIO: GENERAR FACTURA PDF CON FPDF2 ---
+    cart = get_cart()
     try:
-        # Usar ruta absoluta
-        pdf_dir = os.path.join(current_app.root_path, 'static', 'invoices')
-        os.makedirs(pdf_dir, exist_ok=True)
-
-        # Generar número de factura
-        invoice_number = f"INV-{order.id}-{datetime.now().strftime('%Y%m%d')}"
-
-        # Crear registro en base de datos
-        invoice = Invoice(invoice_number=invoice_number, order_id=order.id)
-        db.session.add(invoice)
-        db.session.flush()
-
-        # Crear PDF
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_auto_page_break(auto=True, margin=15)
-
-        # --- ESTILO PROFESIONAL PARA PANADERÍA ---
-        # Logo (placeholder - puedes reemplazarlo con tu logo real)
-        # if os.path.exists(os.path.join(current_app.root_path, 'static', 'images', 'logo_panaderia.png')):
-        #     pdf.image(os.path.join(current_app.root_path, 'static', 'images', 'logo_panaderia.png'), x=10, y=10, w=40)
-
-        # Título principal
-        pdf.set_font("Arial", 'B', 20)
-        pdf.set_text_color(210, 105, 30)  # Color chocolate
-        pdf.cell(0, 15, "Panadería Delicias", ln=True, align='C')
-        pdf.set_text_color(0, 0, 0)  # Volver a negro
-        pdf.ln(5)
-
-        # Subtítulo
-        pdf.set_font("Arial", 'I', 12)
-        pdf.cell(0, 10, "Calidad y Sabor en Cada Bocado", ln=True, align='C')
-        pdf.ln(10)
-
-        # Número de factura
-        pdf.set_font("Arial", 'B', 14)
-        pdf.set_fill_color(255, 248, 220)  # Fondo beige claro
-        pdf.cell(0, 12, f"FACTURA N° {invoice_number}", ln=True, align='C', fill=True)
-        pdf.ln(15)
-
-        # Información del cliente y fecha
-        pdf.set_font("Arial", size=11)
-        client_name = order.user.username if order.user else "Cliente Desconocido"
-        pdf.cell(0, 10, f"Cliente: {client_name}", ln=True)
-        
-        date_str = order.created_at.strftime('%d/%m/%Y') if order.created_at else "Fecha no disponible"
-        pdf.cell(0, 10, f"Fecha: {date_str}", ln=True)
-        pdf.ln(15)
-
-        # Tabla de productos
-        pdf.set_font("Arial", 'B', 11)
-        pdf.set_fill_color(245, 222, 179)  # Fondo beige dorado
-        pdf.set_text_color(139, 69, 19)   # Color marrón oscuro
-        pdf.cell(90, 12, "Producto", border=1, fill=True)
-        pdf.cell(30, 12, "Cantidad", border=1, fill=True, align='C')
-        pdf.cell(35, 12, "Precio", border=1, fill=True, align='R')
-        pdf.cell(35, 12, "Total", border=1, fill=True, align='R')
-        pdf.ln()
-        pdf.set_text_color(0, 0, 0)
-
-        pdf.set_font("Arial", size=10)
-        for item in order.order_items:
-            product_name = item.product.name if item.product else "Producto eliminado"
-            # Limitar longitud del nombre
-            if len(product_name) > 25:
-                product_name = product_name[:22] + "..."
-                
-            pdf.cell(90, 10, product_name, border=1)
-            pdf.cell(30, 10, str(item.quantity), border=1, align='C')
-            pdf.cell(35, 10, f"${item.price:.2f}", border=1, align='R')
-            pdf.cell(35, 10, f"${item.total_price:.2f}", border=1, align='R')
-            pdf.ln()
-
-        # Total final
-        pdf.ln(10)
-        pdf.set_font("Arial", 'B', 14)
-        pdf.set_fill_color(255, 255, 255)
-        pdf.cell(155, 12, "TOTAL", border=1, fill=True, align='R')
-        pdf.set_text_color(255, 0, 0)  # Rojo para el total
-        pdf.cell(35, 12, f"${order.total_amount:.2f}", border=1, fill=True, align='R')
-        pdf.set_text_color(0, 0, 0)
-
-        # Mensaje de agradecimiento
-        pdf.ln(20)
-        pdf.set_font("Arial", 'I', 11)
-        pdf.set_text_color(210, 105, 30)
-        pdf.cell(0, 10, "¡Gracias por su compra! Vuelva pronto.", ln=True, align='C')
-        pdf.set_text_color(0, 0, 0)
-        pdf.cell(0, 10, "Para reclamos o consultas: contacto@panaderiadelicias.com", ln=True, align='C')
-
-        # Guardar PDF
-        pdf_filename = f"invoice_{invoice.id}.pdf"
-        pdf_path = os.path.join(pdf_dir, pdf_filename)
-        pdf.output(pdf_path)
-
-        # Guardar ruta en DB
-        invoice.pdf_file_path = os.path.join('static', 'invoices', pdf_filename)
-        db.session.commit()
-
-        flash('¡Factura generada con éxito!', 'success')
-
-    except Exception as e:
-        print(f"❌ Error generando PDF: {e}")
-        flash('Orden creada, pero no se pudo generar la factura.', 'warning')
-    # --- FIN: GENERAR FACTURA PDF CON FPDF2 ---
+        if uses_session_cart():
+            # El carrito de sesión se escribe en la BD solo aquí. Su token
+            # identifica el contenido, así que sirve de clave de idempotencia
+            # también entre pestañas que comparten la cookie.
+            quantities = {line.product_id: line.quantity for line in cart.lines()}
+            order = place_order(current_user.id, cart.token, cart_quantities=quantities)
+            cart.clear()
+        else:
+            order = place_order(current_user.id, request.form.get('idempotency_key') or None)
+    except CheckoutError as e:
+        flash(str(e), 'warning')
+        return redirect(url_for('cart.index'))
     
-    db.session.commit()
+    if order.invoice and not order.invoice.pdf_file_path and not lazy_rendering():
+        enqueue_invoice(order.invoice.id)
     flash('Order placed successfully!', 'success')
     
     return redirect(url_for('cart.order_confirmation', order_id=order.id))
@@ -210,26 +85,58 @@ def checkout():
 @bp.route('/confirmation/<int:order_id>')
 @login_required
 def order_confirmation(order_id):
+    order = Order.query.options(*load_profile('order_detail')).filter_by(id=order_id, user_id=current_user.id).first_or_404()
+    invoice_ready = bool(order.invoice and (order.invoice.pdf_file_path or lazy_rendering()))
+    # Cuántas veces se recargó ya la página esperando el PDF: no se espera para siempre
+    poll = request.args.get('poll', 0, type=int)
+    polling = bool(order.invoice and not invoice_ready
+                   and order.invoice.render_status == PENDING
+                   and poll < current_app.config['INVOICE_POLL_LIMIT'])
+    return render_template('orders/confirmation.html', order=order, invoice_ready=invoice_ready,
+                           polling=polling, poll=poll)
+
+@bp.route('/confirmation/<int:order_id>/retry_invoice')
+@login_required
+@primary
+def retry_invoice(order_id):
     order = Order.query.filter_by(id=order_id, user_id=current_user.id).first_or_404()
-    return render_template('orders/confirmation.html', order=order)
+    if order.invoice and not lazy_rendering() and retry_invoice_render(order.invoice.id):
+        flash('Estamos generando tu factura de nuevo.', 'info')
+    return redirect(url_for('cart.order_confirmation', order_id=order.id))
 
 @bp.route('/download_invoice/<int:order_id>')
 @login_required
 def download_invoice(order_id):
     order = Order.query.filter_by(id=order_id, user_id=current_user.id).first_or_404()
     
-    if not order.invoice or not order.invoice.pdf_file_path:
+    if not order.invoice:
         abort(404, description="Factura no encontrada.")
     
-    # Usar current_app.root_path
-    pdf_path = os.path.join(current_app.root_path, order.invoice.pdf_file_path)
+    if order.invoice.pdf_file_path:
+        stored = open_invoice_file(order.invoice.pdf_file_path)
+    elif lazy_rendering():
+        stored = open_rendered_invoice(order.invoice)
+    elif order.invoice.render_status == FAILED:
+        flash('No pudimos generar tu factura. Vuelve a intentarlo desde la confirmación del pedido.', 'warning')
+        return redirect(url_for('cart.order_confirmation', order_id=order.id))
+    else:
+        flash('Tu factura se está generando. Inténtalo de nuevo en unos segundos.', 'info')
+        return redirect(url_for('cart.order_confirmation', order_id=order.id))
     
-    if not os.path.exists(pdf_path):
+    if stored is None:
         abort(404, description="Archivo PDF no encontrado.")
     
-    return send_file(
-        pdf_path,
-        as_attachment=True,
-        download_name=f"factura_{order.id}.pdf",
-        mimetype='application/pdf'
+    # Streaming con ETag (hash del contenido) y soporte de Range / 304
+    response = current_app.response_class(
+        wrap_file(request.environ, stored.fileobj),
+        mimetype='application/pdf',
+        direct_passthrough=True
     )
+    response.content_length = stored.size
+    response.set_etag(stored.etag)
+    response.last_modified = stored.last_modified
+    response.headers['Content-Disposition'] = f'attachment; filename=factura_{order.id}.pdf'
+    response.cache_control.private = True
+    response.cache_control.max_age = 3600
+    return response.make_conditional(request.environ, accept_ranges=True,
+                                     complete_length=stored.size)
@@ -0,0 +1,227 @@
+import uuid
+from decimal import Decimal
+
+from flask import current_app, session
+from flask_login import current_user
+import sqlalchemy as sa
+from sqlalchemy.exc import IntegrityError
+
+from app1 import db
+from models import Product, CartItem
+from loaders import load_profile
+
+# Almacenamiento del carrito con dos backends intercambiables:
+#   - SessionCart: vive en la cookie de sesión firmada; no escribe en la BD.
+#     Es el carrito de los visitantes anónimos y, con CART_BACKEND='session'
+#     (por defecto), también el de los usuarios logueados.
+#   - DbCart: las filas CartItem de siempre, una escritura por cambio.
+# El carrito de sesión se fusiona con el de la BD al iniciar sesión y se
+# vuelca a CartItem solo al pagar (ver cart.checkout.place_order).
+
+SESSION_KEY = 'cart'
+
+
+class CartLine:
+    """Línea de un carrito de sesión, con la misma forma que CartItem."""
+
+    def __init__(self, product, quantity):
+        self.product = product
+        self.product_id = product.id
+        self.quantity = quantity
+
+    @property
+    def total_price(self):
+        return float(self.quantity) * float(self.product.price)
+
+
+class SessionCart:
+    def __init__(self):
+        self._data = session.get(SESSION_KEY) or {'items': {}, 'token': uuid.uuid4().hex}
+
+    @property
+    def token(self):
+        """Identifica el contenido actual del carrito; cambia con cada modificación."""
+        return self._data['token']
+
+    def _items(self):
+        return {int(pid): qty for pid, qty in self._data['items'].items()}
+
+    def quantities(self):
+        """{product_id: cantidad}, sin los productos desactivados o borrados (como lines())."""
+        items = self._items()
+        if not items:
+            return {}
+        active = db.session.execute(
+            sa.select(Product.id).where(Product.id.in_(items), Product.active.is_(True))
+        ).scalars()
+        return {pid: items[pid] for pid in active}
+
+    def lines(self):
+        quantities = self._items()
+        if not quantities:
+            return []
+        products = (Product.query.options(*load_profile('catalog'))
+                    .filter(Product.id.in_(quantities), Product.active.is_(True)).all())
+        by_id = {p.id: p for p in products}
+        return [CartLine(by_id[pid], qty) for pid, qty in quantities.items() if pid in by_id]
+
+    def get(self, product_id):
+        quantity = self._data['items'].get(str(product_id))
+        if not quantity:
+            return None
+        product = db.session.get(Product, product_id)
+        return CartLine(product, quantity) if product else None
+
+    def add(self, product, quantity):
+        items = self._data['items']
+        items[str(product.id)] = items.get(str(product.id), 0) + quantity
+        self._save()
+        return CartLine(product, items[str(product.id)])
+
+    def set(self, product_id, quantity):
+        if quantity <= 0:
+            return self.remove(product_id)
+        if str(product_id) not in self._data['items']:
+            return False
+        self._data['items'][str(product_id)] = quantity
+        self._save()
+        return True
+
+    def remove(self, product_id):
+        removed = self._data['items'].pop(str(product_id), None) is not None
+        if removed:
+            self._save()
+        return removed
+
+    def replace(self, quantities):
+        self._data['items'] = {str(pid): qty for pid, qty in quantities.items() if qty > 0}
+        self._save()
+
+    def clear(self):
+        session.pop(SESSION_KEY, None)
+
+    def mark_synced(self):
+        """Anota que la BD ya tiene este mismo contenido."""
+        self._data['synced'] = self._data['token']
+        session[SESSION_KEY] = self._data
+
+    def is_synced(self):
+        return self._data.get('synced') == self._data['token']
+
+    def _save(self):
+        self._data['token'] = uuid.uuid4().hex
+        session[SESSION_KEY] = self._data
+
+
+class DbCart:
+    token = None
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+
+    def _query(self):
+        return CartItem.query.filter_by(user_id=self.user_id)
+
+    def quantities(self):
+        return {item.product_id: item.quantity for item in self._query().all()}
+
+    def lines(self):
+        return self._query().options(*load_profile('cart')).all()
+
+    def get(self, product_id):
+        return self._query().options(*load_profile('cart')).filter_by(product_id=product_id).first()
+
+    def add(self, product, quantity):
+        cart_item = self._query().filter_by(product_id=product.id).first()
+        if cart_item:
+            cart_item.quantity += quantity
+        else:
+            cart_item = CartItem(user_id=self.user_id, product_id=product.id, quantity=quantity)
+            db.session.add(cart_item)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Otra petición insertó la misma línea (uq_cart_item_user_product)
+            db.session.rollback()
+            cart_item = self._query().filter_by(product_id=product.id).one()
+            cart_item.quantity += quantity
+            db.session.commit()
+        return cart_item
+
+    def set(self, product_id, quantity):
+        cart_item = self._query().filter_by(product_id=product_id).first()
+        if cart_item is None:
+            return False
+        if quantity > 0:
+            cart_item.quantity = quantity
+        else:
+            db.session.delete(cart_item)
+        db.session.commit()
+        return True
+
+    def remove(self, product_id):
+        deleted = self._query().filter_by(product_id=product_id).delete()
+        db.session.commit()
+        return bool(deleted)
+
+    def replace(self, quantities):
+        write_cart_items(self.user_id, quantities)
+        db.session.commit()
+
+    def clear(self):
+        self._query().delete()
+        db.session.commit()
+
+
+def uses_session_cart():
+    return not current_user.is_authenticated or current_app.config['CART_BACKEND'] == 'session'
+
+
+def get_cart():
+    """Carrito del visitante actual según CART_BACKEND."""
+    if uses_session_cart():
+        return SessionCart()
+    return DbCart(current_user.id)
+
+
+def cart_total(lines):
+    return sum((Decimal(line.quantity) * line.product.price for line in lines), Decimal('0'))
+
+
+def write_cart_items(user_id, quantities):
+    """Reemplaza las filas CartItem del usuario por `quantities` (sin confirmar)."""
+    CartItem.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+    db.session.add_all([
+        CartItem(user_id=user_id, product_id=product_id, quantity=quantity)
+        for product_id, quantity in quantities.items() if quantity > 0
+    ])
+    db.session.flush()
+
+
+def merge_cart_on_login(user_id):
+    """Fusiona el carrito anónimo con el guardado en la BD (a lo sumo una escritura)."""
+    session_cart = SessionCart()
+    pending = session_cart.quantities()
+    db_cart = DbCart(user_id)
+
+    merged = db_cart.quantities()
+    for product_id, quantity in pending.items():
+        merged[product_id] = merged.get(product_id, 0) + quantity
+    if pending:
+        db_cart.replace(merged)
+
+    if current_app.config['CART_BACKEND'] == 'session':
+        session_cart.replace(merged)
+        session_cart.mark_synced()
+    else:
+        session_cart.clear()
+
+
+def save_cart_on_logout(user_id):
+    """Guarda el carrito de sesión en la BD (si cambió) y lo quita de la cookie."""
+    if current_app.config['CART_BACKEND'] != 'session':
+        return
+    session_cart = SessionCart()
+    if not session_cart.is_synced():
+        DbCart(user_id).replace(session_cart.quantities())
+    session_cart.clear()
@@ -0,0 +1,124 @@
+import uuid
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from werkzeug.utils import import_string
+
+from cache import TTLCache
+from models import Product, Category
+from loaders import load_profile
+from routing import primary_reads
+
+# Caché de lectura del catálogo (categorías y destacados). Se invalida
+# completa cuando una sesión confirma cambios sobre Product o Category.
+catalog_cache = TTLCache()
+
+
+def init_catalog_cache(app):
+    global catalog_cache
+    backend = app.config.get("CATALOG_CACHE_BACKEND")
+    if backend:
+        # Ruta "modulo:fabrica" de un backend compartido con la interfaz de TTLCache
+        catalog_cache = import_string(backend)(app)
+    else:
+        catalog_cache = TTLCache(
+            maxsize=app.config["CATALOG_CACHE_SIZE"],
+            ttl=app.config["CATALOG_CACHE_TTL"]
+        )
+
+
+def _snapshot(obj, **extra):
+    """Copia las columnas de una fila a un objeto plano, seguro fuera de la sesión."""
+    values = {attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs}
+    values.update(extra)
+    return SimpleNamespace(**values)
+
+
+def _cached(key, loader):
+    value = catalog_cache.get(key)
+    if value is None:
+        # Recién invalidado, una réplica puede no tener aún el cambio: lo que
+        # se guarde en la caché se lee del primario para no fijar datos viejos
+        _, updated_at = catalog_version()
+        lag = current_app.config['DATABASE_REPLICA_STICKY_SECONDS']
+        # (+1: updated_at va truncado al segundo)
+        recent = (datetime.now(timezone.utc) - updated_at).total_seconds() < lag + 1
+        with primary_reads() if recent else nullcontext():
+            value = loader()
+        catalog_cache.set(key, value)
+    return value
+
+
+def get_categories():
+    return _cached('categories', lambda: [_snapshot(c) for c in Category.query.order_by(Category.id).all()])
+
+
+def get_category(category_id):
+    for category in get_categories():
+        if category.id == category_id:
+            return category
+    return None
+
+
+def get_featured_products(limit=6):
+    def load():
+        products = (Product.query.options(*load_profile('catalog'))
+                    .filter_by(featured=True).limit(limit).all())
+        return [_snapshot(p, category=_snapshot(p.category)) for p in products]
+    return _cached(f'featured:{limit}', load)
+
+
+def count_products(category_id=None):
+    """Total de productos activos (de una categoría), cacheado con el catálogo."""
+    def load():
+        query = Product.query.filter_by(active=True)
+        if category_id:
+            query = query.filter_by(category_id=category_id)
+        return query.count()
+    return _cached(f'count:{category_id or "all"}', load)
+
+
+def catalog_version():
+    """(token, fecha) de la versión vigente del catálogo; cambia en cada invalidación.
+
+    Vive en la misma caché que los datos, así que también se renueva cuando
+    estos expiran: una versión nunca sobrevive a los datos con que se generó.
+    """
+    version = catalog_cache.get('version')
+    if version is None:
+        version = (uuid.uuid4().hex[:16], datetime.now(timezone.utc).replace(microsecond=0))
+        catalog_cache.set('version', version)
+    return version
+
+
+def cached_fragment(key, render):
+    """HTML de un trozo de plantilla, cacheado por versión del catálogo y `key`."""
+    token, _ = catalog_version()
+    return _cached(f'fragment:{token}:' + ':'.join(str(part) for part in key), render)
+
+
+def invalidate_catalog():
+    catalog_cache.clear()
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_catalog_changes(session, flush_context, instances):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, (Product, Category)):
+            session.info['catalog_dirty'] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    if session.info.pop('catalog_dirty', False):
+        invalidate_catalog()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _reset_on_rollback(session):
+    session.info.pop('catalog_dirty', None)
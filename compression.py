@@ -0,0 +1,60 @@
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # Sin el paquete Brotli se comprime solo con gzip
+    brotli = None
+
+# Compresión de las respuestas dinámicas (HTML y JSON). Los archivos
+# estáticos y las descargas (PDF, ZIP, CSV en streaming) salen tal cual:
+# ya vienen comprimidos o se envían por trozos.
+
+COMPRESSIBLE_TYPES = {'text/html', 'application/json', 'text/plain', 'text/csv'}
+
+
+def _choose_encoding(accept_encodings):
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding, level):
+    if encoding == 'br':
+        # Calidad media: las máximas (10-11) tardan demasiado para cada petición
+        return brotli.compress(data, quality=level['br'], mode=brotli.MODE_TEXT)
+    return gzip.compress(data, compresslevel=level['gzip'], mtime=0)
+
+
+def init_compression(app):
+    if not app.config['COMPRESSION']:
+        return
+    min_size = app.config['COMPRESSION_MIN_SIZE']
+    level = {'br': app.config['COMPRESSION_BROTLI_QUALITY'],
+             'gzip': app.config['COMPRESSION_GZIP_LEVEL']}
+
+    @app.after_request
+    def compress_response(response):
+        if (response.direct_passthrough or response.is_streamed
+                or response.mimetype not in COMPRESSIBLE_TYPES
+                or not 200 <= response.status_code < 300 or response.status_code == 204
+                or 'Content-Encoding' in response.headers):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = _choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        response.set_data(compress(data, encoding, level))
+        response.headers['Content-Encoding'] = encoding
+        # La versión comprimida es otra representación: su ETag pasa a ser débil
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,244 @@
+import csv
+import io
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import islice
+
+import click
+import sqlalchemy as sa
+from flask.cli import AppGroup
+
+from app1 import db
+from models import Order, OrderItem, Product, Category, User
+
+# Exportación de pedidos y líneas en streaming. Las filas salen de un cursor
+# del lado del servidor (yield_per) y se escriben por lotes, así la memoria
+# no depende del tamaño del rango exportado.
+
+orders_cli = AppGroup('orders', help='Pedidos: exportación de datos.')
+
+EXPORT_COLUMNS = [
+    'order_id', 'created_at', 'status', 'customer', 'product_id', 'product',
+    'category', 'quantity', 'price', 'line_total',
+]
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def export_rows(start=None, end=None, status=None, category_id=None, batch_size=1000):
+    """Itera (sin cargar todo en memoria) las líneas de pedido que cumplen los filtros.
+
+    `start` y `end` son fechas inclusivas.
+    """
+    line_total = (OrderItem.quantity * OrderItem.price).label('line_total')
+    stmt = (sa.select(Order.id, Order.created_at, Order.status, User.username,
+                      OrderItem.product_id, Product.name, Category.name,
+                      OrderItem.quantity, OrderItem.price, line_total)
+            .join(OrderItem, OrderItem.order_id == Order.id)
+            .join(User, Order.user_id == User.id)
+            .join(Product, OrderItem.product_id == Product.id)
+            .join(Category, Product.category_id == Category.id)
+            .order_by(Order.id, OrderItem.id))
+    if start:
+        stmt = stmt.where(Order.created_at >= datetime.combine(start, datetime.min.time()))
+    if end:
+        stmt = stmt.where(Order.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    if status:
+        stmt = stmt.where(Order.status == status)
+    if category_id:
+        stmt = stmt.where(Product.category_id == category_id)
+
+    result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+    for partition in result.partitions():
+        yield from partition
+
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def iter_csv(rows, batch_size=1000):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in _batches(rows, batch_size):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+class _ChunkSink:
+    """Archivo de solo escritura que acumula bytes hasta que se vacían con `drain()`."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_parquet(rows, batch_size=10000):
+    # pyarrow es opcional: solo hace falta para este formato
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError('La exportación a Parquet requiere instalar pyarrow.')
+
+    schema = pa.schema([
+        ('order_id', pa.int64()),
+        ('created_at', pa.timestamp('us')),
+        ('status', pa.string()),
+        ('customer', pa.string()),
+        ('product_id', pa.int64()),
+        ('product', pa.string()),
+        ('category', pa.string()),
+        ('quantity', pa.int64()),
+        ('price', pa.decimal128(10, 2)),
+        ('line_total', pa.decimal128(12, 2)),
+    ])
+
+    def generate():
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema)
+        try:
+            for batch in _batches(rows, batch_size):
+                columns = list(zip(*batch))
+                writer.write_batch(pa.record_batch(
+                    [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                    schema=schema
+                ))
+                yield sink.drain()
+        finally:
+            writer.close()
+        yield sink.drain()
+
+    return generate()
+
+
+def iter_export(fmt, rows):
+    if fmt == 'parquet':
+        return iter_parquet(rows)
+    return iter_csv(rows)
+
+
+@orders_cli.command('export')
+@click.option('--format', 'fmt', type=click.Choice(list(EXPORT_FORMATS)), default='csv')
+@click.option('--output', '-o', type=click.File('wb'), default='-',
+              help='Archivo de salida (por defecto, la salida estándar).')
+@click.option('--start', type=click.DateTime(formats=['%Y-%m-%d']), help='Desde (AAAA-MM-DD).')
+@click.option('--end', type=click.DateTime(formats=['%Y-%m-%d']), help='Hasta, inclusive (AAAA-MM-DD).')
+@click.option('--status', help='Solo pedidos con este estado.')
+@click.option('--category', 'category_id', type=int, help='Solo líneas de esta categoría.')
+def export_command(fmt, output, start, end, status, category_id):
+    """Exporta pedidos y líneas de pedido en CSV o Parquet."""
+    rows = export_rows(start=start.date() if start else None,
+                       end=end.date() if end else None,
+                       status=status, category_id=category_id)
+    try:
+        for chunk in iter_export(fmt, rows):
+            output.write(chunk)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+
+
+def _synthetic_order_items(count, items_per_order, batch_size=10000):
+    """Inserta `count` líneas sintéticas en la transacción actual, por lotes."""
+    user_id = db.session.execute(sa.select(User.id).order_by(User.id).limit(1)).scalar()
+    products = db.session.execute(sa.select(Product.id, Product.price).order_by(Product.id)).all()
+    if user_id is None or not products:
+        raise click.ClickException('Hacen falta un usuario y productos (`flask seed`).')
+    first_order = (db.session.execute(sa.select(sa.func.max(Order.id))).scalar() or 0) + 1
+    orders = -(-count // items_per_order)
+    started = datetime(2020, 1, 1)
+    for offset in range(0, orders, batch_size):
+        ids = range(first_order + offset, first_order + min(offset + batch_size, orders))
+        db.session.execute(Order.__table__.insert(), [
+            {'id': order_id, 'user_id': user_id, 'status': 'Paid', 'total_amount': Decimal('10.00'),
+             'created_at': started + timedelta(minutes=order_id)}
+            for order_id in ids
+        ])
+        db.session.execute(OrderItem.__table__.insert(), [
+            {'order_id': order_id, 'product_id': products[(order_id + i) % len(products)].id,
+             'quantity': 1 + i, 'price': products[(order_id + i) % len(products)].price}
+            for order_id in ids for i in range(items_per_order)
+            if (order_id - first_order) * items_per_order + i < count
+        ])
+
+
+def _measure(make_chunks):
+    """(bytes, segundos, pico de memoria de Python en bytes) de generar y consumir la exportación."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = 0
+    try:
+        for chunk in make_chunks():
+            size += len(chunk)
+        return size, time.perf_counter() - started, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@orders_cli.command('export-benchmark')
+@click.option('--items', 'count', default=1000000, show_default=True, help='Líneas de pedido sintéticas.')
+@click.option('--items-per-order', default=4, show_default=True)
+@click.option('--format', 'fmt', type=click.Choice(list(EXPORT_FORMATS)), default='csv')
+@click.option('--compare-buffered', is_flag=True,
+              help='Medir también cargando todas las filas antes de escribir (necesita mucha memoria).')
+def export_benchmark_command(count, items_per_order, fmt, compare_buffered):
+    """Mide la memoria de la exportación en streaming sobre un volumen sintético.
+
+    Las líneas se insertan en una transacción que se deshace al terminar: la
+    base queda como estaba. La memoria es el pico de Python (tracemalloc),
+    que además hace la exportación más lenta que sin medir.
+    """
+    click.echo(f'Insertando {count} líneas sintéticas...')
+    _synthetic_order_items(count, items_per_order)
+    try:
+        runs = [('streaming', lambda: iter_export(fmt, export_rows()))]
+        if compare_buffered:
+            runs.append(('todo en memoria', lambda: iter_export(fmt, list(export_rows()))))
+        for name, make_chunks in runs:
+            try:
+                size, seconds, peak = _measure(make_chunks)
+            except RuntimeError as e:
+                raise click.ClickException(str(e))
+            click.echo(f'{name}: {size / 1024 / 1024:.0f} MB de {fmt} en {seconds:.1f} s, '
+                       f'pico de memoria {peak / 1024 / 1024:.1f} MB')
+    finally:
+        db.session.rollback()
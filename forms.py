@@ -1,7 +1,10 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, TextAreaField, DecimalField, SelectField, IntegerField, BooleanField
-from wtforms.validators import DataRequired, Email, Length, EqualTo, NumberRange, ValidationError
-from models import User, Category
+from wtforms.validators import DataRequired, Email, Length, EqualTo, NumberRange
+import sqlalchemy as sa
+from app1 import db
+from models import User
+from catalog import get_categories
 
 class LoginForm(FlaskForm):
     email = StringField('Correo electrónico', validators=[DataRequired(message="El correo es obligatorio"), Email(message="Correo inválido")])
@@ -13,15 +16,20 @@ class RegistrationForm(FlaskForm):
     password = PasswordField('Contraseña', validators=[DataRequired(message="La contraseña es obligatoria"), Length(min=6, message="Debe tener al menos 6 caracteres")])
     password2 = PasswordField('Repite la contraseña', validators=[DataRequired(message="Debes repetir la contraseña"), EqualTo('password', message="Las contraseñas no coinciden")])
     
-    def validate_username(self, username):
-        user = User.query.filter_by(username=username.data).first()
-        if user:
-            raise ValidationError('El nombre de usuario ya existe. Por favor elige otro.')
-
-    def validate_email(self, email):
-        user = User.query.filter_by(email=email.data).first()
-        if user:
-            raise ValidationError('El correo ya está registrado. Usa uno diferente.')
+    def validate(self, extra_validators=None):
+        if not super().validate(extra_validators):
+            return False
+        # Nombre y correo se comprueban en una sola consulta
+        taken = db.session.execute(
+            sa.select(User.username, User.email)
+            .where(sa.or_(User.username == self.username.data, User.email == self.email.data))
+        ).all()
+        for username, email in taken:
+            if username == self.username.data:
+                self.username.errors.append('El nombre de usuario ya existe. Por favor elige otro.')
+            if email == self.email.data:
+                self.email.errors.append('El correo ya está registrado. Usa uno diferente.')
+        return not taken
 
 class ProductForm(FlaskForm):
     name = StringField('Nombre del producto', validators=[DataRequired(message="El nombre es obligatorio"), Length(max=100, message="Máximo 100 caracteres")])
@@ -34,11 +42,14 @@ class ProductForm(FlaskForm):
     
     def __init__(self, *args, **kwargs):
         super(ProductForm, self).__init__(*args, **kwargs)
-        self.category_id.choices = [(c.id, c.name) for c in Category.query.all()]
+        self.category_id.choices = [(c.id, c.name) for c in get_categories()]
 
 class CategoryForm(FlaskForm):
     name = StringField('Nombre de la categoría', validators=[DataRequired(message="El nombre es obligatorio"), Length(max=80, message="Máximo 80 caracteres")])
     description = TextAreaField('Descripción (opcional)')
 
+class RestockForm(FlaskForm):
+    """Solo el token CSRF: las cantidades llegan como campos add-<product_id>."""
+
 class CartItemForm(FlaskForm):
     quantity = IntegerField('Cantidad', validators=[DataRequired(message="La cantidad es obligatoria"), NumberRange(min=1, message="Debe ser al menos 1")])
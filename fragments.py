@@ -0,0 +1,65 @@
+import hashlib
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from werkzeug.http import is_resource_modified
+from werkzeug.wrappers import Response
+
+from catalog import cached_fragment, catalog_version
+
+# Caché de fragmentos de las páginas del catálogo. La grilla de productos y
+# la navegación por categorías son iguales para todos los visitantes, así
+# que se guardan ya renderizadas en la caché del catálogo, con la versión
+# de este en la clave: cualquier cambio en Product o Category las descarta.
+
+
+class FragmentCacheExtension(Extension):
+    """Etiqueta `{% cache clave %}...{% endcache %}`.
+
+    `clave` es una tupla con lo que distingue al fragmento (categoría,
+    orden, cursor...); con None el bloque se renderiza siempre.
+    """
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = parser.parse_expression()
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', [key]), [], [], body).set_lineno(lineno)
+
+    def _render(self, key, caller):
+        if key is None or not current_app.config['CATALOG_FRAGMENT_CACHE']:
+            return caller()
+        return Markup(cached_fragment(key, caller))
+
+
+def catalog_conditional(view):
+    """Añade ETag y Last-Modified a una página del catálogo y responde 304 si no cambió.
+
+    Solo para visitantes anónimos sin mensajes pendientes: para ellos la
+    página depende únicamente de la URL y de la versión del catálogo, así
+    que el 304 se decide antes de ejecutar la vista.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if current_user.is_authenticated or session.get('_flashes'):
+            return view(*args, **kwargs)
+
+        token, updated_at = catalog_version()
+        etag = hashlib.sha1(f'{token}:{request.full_path}'.encode()).hexdigest()
+        if not is_resource_modified(request.environ, etag=etag, last_modified=updated_at):
+            response = Response(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+        response.set_etag(etag)
+        response.last_modified = updated_at
+        # Revalidar siempre: al iniciar sesión la misma URL cambia de contenido
+        response.cache_control.no_cache = True
+        response.vary.add('Cookie')
+        return response
+    return wrapper
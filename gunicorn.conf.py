@@ -0,0 +1,61 @@
+import multiprocessing
+import os
+
+# Configuración de gunicorn para producción:
+#   gunicorn -c gunicorn.conf.py main:app
+# Todo se puede ajustar por variables de entorno sin reconstruir la imagen.
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# gthread: cada worker atiende varias peticiones a la vez con hilos, que es
+# lo que conviene a una app que pasa la mayor parte del tiempo esperando a
+# la base de datos. Con gevent instalado se puede usar GUNICORN_WORKER_CLASS=gevent.
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+# La app se carga una vez en el proceso maestro y los workers la heredan
+# al hacer fork: arrancan antes y comparten memoria de solo lectura.
+preload_app = True
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Reciclar workers de vez en cuando acota el crecimiento de memoria
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = max_requests // 10
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("LOG_LEVEL", "info").lower()
+
+# Cada hilo puede tener una conexión abierta: el pool de cada worker debe
+# alcanzar para todos sus hilos. Se fija antes de que se cargue la app.
+os.environ.setdefault("APP_ENV", "production")
+os.environ.setdefault("DB_POOL_SIZE", str(threads))
+
+
+def post_fork(server, worker):
+    # Las conexiones abiertas en el maestro no se pueden compartir entre
+    # procesos: cada worker empieza con un pool vacío.
+    from app1 import db
+    from main import app
+
+    with app.app_context():
+        # El primario y, si las hay, las réplicas
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    # Los renders de factura que estaban en el pool de un worker reciclado o
+    # caído se perdieron con él: el UPDATE condicional reparte cada uno a un
+    # solo worker.
+    from invoices.jobs import requeue_stuck_invoices
+    from main import app
+
+    try:
+        requeue_stuck_invoices(app)
+    except Exception:
+        worker.log.exception("No se pudieron reencolar las facturas pendientes")
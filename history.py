@@ -0,0 +1,55 @@
+from collections import defaultdict
+
+import sqlalchemy as sa
+
+from app1 import db
+from loaders import load_profile
+from models import Order, OrderItem
+from pagination import keyset_paginate
+
+# Historial de pedidos paginado por cursor. Cada página cuesta lo mismo sin
+# importar cuántos pedidos tenga el usuario: una consulta agregada trae los
+# pedidos de la página con su número de líneas, unidades y subtotal, otra
+# las líneas de esos pedidos, y el resumen del historial es un COUNT/SUM.
+# Los importes son Numeric en la base y Decimal en Python, sin floats.
+
+PER_PAGE = 10
+
+MONEY = sa.Numeric(12, 2)
+
+
+def order_summary(user_id):
+    """(pedidos, total gastado) de todo el historial de un usuario."""
+    return db.session.execute(
+        sa.select(sa.func.count(Order.id),
+                  sa.type_coerce(sa.func.coalesce(sa.func.sum(Order.total_amount), 0), MONEY))
+        .where(Order.user_id == user_id)
+    ).one()
+
+
+def order_history_page(user_id, cursor=None, per_page=PER_PAGE):
+    """Página del historial: filas con los datos del pedido, sus cifras y sus líneas."""
+    count, spent = order_summary(user_id)
+    query = (db.session.query(
+                Order.id, Order.created_at, Order.status, Order.total_amount,
+                sa.func.count(OrderItem.id).label('line_count'),
+                sa.func.coalesce(sa.func.sum(OrderItem.quantity), 0).label('item_count'),
+                sa.type_coerce(sa.func.coalesce(sa.func.sum(OrderItem.quantity * OrderItem.price), 0),
+                               MONEY).label('subtotal'))
+             .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+             .filter(Order.user_id == user_id)
+             .group_by(Order.id, Order.created_at, Order.status, Order.total_amount))
+    page = keyset_paginate(query, (Order.created_at, Order.id), cursor=cursor,
+                           per_page=per_page, descending=True, total=count)
+    page.spent = spent
+
+    # Líneas solo de los pedidos visibles, en una consulta
+    lines = defaultdict(list)
+    if page.items:
+        items = (OrderItem.query.options(*load_profile('order_history'))
+                 .filter(OrderItem.order_id.in_([row.id for row in page.items]))
+                 .order_by(OrderItem.order_id, OrderItem.id))
+        for item in items:
+            lines[item.order_id].append(item)
+    page.lines = lines
+    return page
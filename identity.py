@@ -0,0 +1,87 @@
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from werkzeug.utils import import_string
+
+from app1 import db
+from cache import TTLCache
+from models import User
+
+# Caché de la identidad del usuario con sesión iniciada. Flask-Login carga
+# el usuario en cada petición, pero las plantillas y los permisos solo usan
+# id, nombre y is_admin: se guarda una copia de esos campos por id y se
+# descarta cuando una sesión confirma cambios sobre ese User. Con la caché
+# en memoria, un cambio hecho en otro proceso tarda como mucho
+# USER_CACHE_TTL segundos en verse; con USER_CACHE_BACKEND es inmediato.
+user_cache = TTLCache()
+
+
+class CachedUser(UserMixin):
+    """Copia de los campos de User que se usan como `current_user`."""
+
+    def __init__(self, id, username, email, is_admin):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.is_admin = bool(is_admin)
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.username, user.email, user.is_admin)
+
+    def __repr__(self):
+        return f'<CachedUser {self.username}>'
+
+
+def init_user_cache(app):
+    global user_cache
+    backend = app.config.get("USER_CACHE_BACKEND")
+    if backend:
+        # Ruta "modulo:fabrica" de un backend compartido con la interfaz de TTLCache
+        user_cache = import_string(backend)(app)
+    else:
+        user_cache = TTLCache(
+            maxsize=app.config["USER_CACHE_SIZE"],
+            ttl=app.config["USER_CACHE_TTL"]
+        )
+
+
+def load_cached_user(user_id):
+    """Identidad del usuario `user_id`, desde la caché o la base de datos."""
+    key = f'user:{user_id}'
+    user = user_cache.get(key)
+    if user is None:
+        row = db.session.get(User, user_id)
+        if row is None:
+            return None
+        user = CachedUser.from_user(row)
+        user_cache.set(key, user)
+    return user
+
+
+def cache_user(user):
+    """Guarda la identidad de un usuario recién autenticado."""
+    user_cache.set(f'user:{user.id}', CachedUser.from_user(user))
+
+
+def invalidate_user(user_id):
+    user_cache.delete(f'user:{user_id}')
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_user_changes(session, flush_context):
+    # Después del flush los usuarios nuevos ya tienen id
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            session.info.setdefault('users_dirty', set()).add(obj.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_users_on_commit(session):
+    for user_id in session.info.pop('users_dirty', ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _reset_users_on_rollback(session):
+    session.info.pop('users_dirty', None)
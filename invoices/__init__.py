@@ -0,0 +1,4 @@
+from invoices.pdf import InvoiceRenderer, get_invoice_renderer, write_invoice_pdf
+from invoices.storage import get_invoice_storage, open_invoice_file
+from invoices.jobs import enqueue_invoice, retry_invoice_render, requeue_stuck_invoices
+from invoices.render import lazy_rendering, open_rendered_invoice, get_invoice_cache
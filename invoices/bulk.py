@@ -0,0 +1,170 @@
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import sqlalchemy as sa
+
+from app1 import db
+from exports import _ChunkSink, _batches
+from models import Invoice, Order
+from invoices.pdf import LAYOUT_VERSION, InvoiceRenderer, get_invoice_renderer, render_invoice_pdf
+from invoices.storage import get_invoice_storage, invoice_file_exists, open_invoice_file
+from loaders import load_profile
+
+# Operaciones por lotes sobre las facturas: regenerar los PDF que faltan o
+# quedaron con un diseño viejo (en varios procesos) y descargar un rango de
+# fechas como ZIP en streaming.
+
+
+def snapshot_invoice(invoice):
+    """Copia en objetos simples (serializables con pickle) los datos que usa el PDF."""
+    order = invoice.order
+    order_data = SimpleNamespace(
+        user=SimpleNamespace(username=order.user.username) if order.user else None,
+        created_at=order.created_at,
+        total_amount=order.total_amount,
+        order_items=[
+            SimpleNamespace(
+                product=SimpleNamespace(name=item.product.name) if item.product else None,
+                quantity=item.quantity,
+                price=item.price,
+                total_price=item.total_price,
+            )
+            for item in order.order_items
+        ],
+    )
+    return invoice.id, invoice.invoice_number, order_data
+
+
+# Renderer de cada proceso del pool: la plantilla se arma una vez por proceso
+_worker_renderer = None
+
+
+def _init_worker(renderer_options):
+    global _worker_renderer
+    _worker_renderer = InvoiceRenderer(**renderer_options)
+
+
+def _render_snapshot(snapshot):
+    # Se ejecuta en los procesos del pool: solo FPDF, sin base de datos
+    invoice_id, invoice_number, order_data = snapshot
+    return invoice_id, _worker_renderer.render(order_data, invoice_number)
+
+
+def find_stale_invoices(force=False, check_files=True, include_unrendered=True,
+                        start=None, end=None):
+    """Ids de las facturas cuyo PDF falta, no existe en el almacenamiento o es de otro diseño."""
+    stmt = (sa.select(Invoice.id, Invoice.pdf_file_path, Invoice.layout_version)
+            .join(Order, Invoice.order_id == Order.id)
+            .order_by(Invoice.id))
+    if start:
+        stmt = stmt.where(Order.created_at >= datetime.combine(start, datetime.min.time()))
+    if end:
+        stmt = stmt.where(Order.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+
+    ids = []
+    for invoice_id, path, version in db.session.execute(stmt.execution_options(yield_per=1000)):
+        if force:
+            ids.append(invoice_id)
+        elif not path:
+            if include_unrendered:
+                ids.append(invoice_id)
+        elif version != LAYOUT_VERSION or (check_files and not invoice_file_exists(path)):
+            ids.append(invoice_id)
+    return ids
+
+
+def _pool_context():
+    # fork evita que cada proceso vuelva a importar (y a crear) la aplicación;
+    # los procesos hijos solo usan FPDF.
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+def rebuild_invoices(invoice_ids, workers=None, batch_size=200, on_batch=None):
+    """Regenera en paralelo los PDF de `invoice_ids` y los guarda en el almacenamiento.
+
+    Los datos se leen y se guardan por lotes en el proceso principal; el
+    render (lo caro) se reparte en un pool de `workers` procesos. Devuelve
+    un dict con el número de facturas, bytes escritos y segundos empleados.
+    """
+    storage = get_invoice_storage()
+    workers = workers or os.cpu_count() or 1
+    stats = {'invoices': 0, 'bytes': 0, 'seconds': 0.0}
+    started = datetime.now()
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context(),
+                             initializer=_init_worker,
+                             initargs=(get_invoice_renderer().options,)) as pool:
+        for batch in _batches(invoice_ids, batch_size):
+            invoices = {invoice.id: invoice for invoice in
+                        Invoice.query.options(*load_profile('invoice'))
+                        .filter(Invoice.id.in_(batch)).all()}
+            snapshots = [snapshot_invoice(invoice) for invoice in invoices.values()]
+            chunksize = max(1, len(snapshots) // (workers * 4))
+            for invoice_id, data in pool.map(_render_snapshot, snapshots, chunksize=chunksize):
+                invoice = invoices[invoice_id]
+                invoice.pdf_file_path = storage.save(data)
+                invoice.layout_version = LAYOUT_VERSION
+                invoice.render_status = None
+                stats['bytes'] += len(data)
+            db.session.commit()
+            # Soltar los objetos del lote para que la memoria no crezca
+            db.session.expunge_all()
+            stats['invoices'] += len(snapshots)
+            stats['seconds'] = (datetime.now() - started).total_seconds()
+            if on_batch:
+                on_batch(stats)
+    return stats
+
+
+def iter_invoice_zip(start=None, end=None, batch_size=100):
+    """Genera un ZIP (por trozos) con los PDF de las facturas de los pedidos del rango.
+
+    Cada PDF se lee (o se genera, si aún no existe) y se escribe de uno en
+    uno, así que la memoria no depende del tamaño de los PDF del rango.
+    """
+    stmt = (sa.select(Invoice.id, Invoice.invoice_number, Invoice.pdf_file_path, Order.created_at)
+            .join(Order, Invoice.order_id == Order.id)
+            .order_by(Invoice.id))
+    if start:
+        stmt = stmt.where(Order.created_at >= datetime.combine(start, datetime.min.time()))
+    if end:
+        stmt = stmt.where(Order.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    # Solo metadatos (unos bytes por factura): se leen de una vez para poder
+    # hacer otras consultas mientras se recorre el rango
+    rows = db.session.execute(stmt).all()
+
+    sink = _ChunkSink()
+    # Los PDF ya vienen comprimidos: se guardan sin volver a comprimir
+    archive = zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED)
+    try:
+        for batch in _batches(rows, batch_size):
+            pending = [invoice_id for invoice_id, _, path, _ in batch if not path]
+            unrendered = {}
+            if pending:
+                unrendered = {invoice.id: invoice for invoice in
+                              Invoice.query.options(*load_profile('invoice'))
+                              .filter(Invoice.id.in_(pending)).all()}
+            for invoice_id, invoice_number, path, created_at in batch:
+                data = None
+                if path:
+                    stored = open_invoice_file(path)
+                    if stored is not None:
+                        with stored.fileobj as f:
+                            data = f.read()
+                elif invoice_id in unrendered:
+                    data = render_invoice_pdf(unrendered[invoice_id])
+                if data is None:
+                    continue
+                info = zipfile.ZipInfo(f'{invoice_number}.pdf',
+                                       date_time=(created_at or datetime.now()).timetuple()[:6])
+                archive.writestr(info, data)
+                yield sink.drain()
+    finally:
+        archive.close()
+    yield sink.drain()
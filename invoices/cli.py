@@ -0,0 +1,173 @@
+import os
+import statistics
+import time
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+import click
+import sqlalchemy as sa
+from flask import current_app
+from flask.cli import AppGroup
+
+from app1 import db
+from models import Invoice, Product
+from bootstrap import scratch_app
+from invoices.storage import LEGACY_PREFIX, get_invoice_storage
+from invoices.bulk import find_stale_invoices, rebuild_invoices, iter_invoice_zip
+from invoices.jobs import drain_invoice_queue, requeue_stuck_invoices
+from invoices.pdf import get_invoice_renderer
+from invoices.render import lazy_rendering
+
+invoices_cli = AppGroup('invoices', help='Facturas en PDF.')
+
+
+@invoices_cli.command('migrate-storage')
+@click.option('--batch-size', default=200, show_default=True)
+def migrate_storage_command(batch_size):
+    """Mueve los PDF antiguos de static/invoices al almacenamiento configurado.
+
+    Cada original se borra en cuanto el commit deja la factura apuntando a
+    la copia: bajo static/ cualquiera podía descargarlo.
+    """
+    storage = get_invoice_storage()
+    migrated = missing = 0
+    while True:
+        invoices = (Invoice.query
+                    .filter(Invoice.pdf_file_path.startswith(LEGACY_PREFIX))
+                    .order_by(Invoice.id)
+                    .offset(missing)
+                    .limit(batch_size)
+                    .all())
+        if not invoices:
+            break
+        moved = []
+        for invoice in invoices:
+            path = os.path.join(current_app.root_path, *invoice.pdf_file_path.split('/'))
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                # Se queda con la clave antigua; se puede regenerar más tarde
+                missing += 1
+                continue
+            invoice.pdf_file_path = storage.save(data)
+            moved.append(path)
+        db.session.commit()
+        for path in moved:
+            os.remove(path)
+        migrated += len(moved)
+    current_app.logger.info('Facturas migradas: %s', migrated)
+    click.echo(f'Facturas migradas: {migrated}. Sin archivo: {missing}.')
+
+
+@invoices_cli.command('rebuild')
+@click.option('--all', 'force', is_flag=True, help='Regenerar todas, no solo las que faltan o están desactualizadas.')
+@click.option('--workers', type=int, help='Procesos de render (por defecto, uno por CPU).')
+@click.option('--batch-size', default=200, show_default=True)
+@click.option('--no-check-files', is_flag=True, help='No comprobar que el archivo exista en el almacenamiento.')
+@click.option('--start', type=click.DateTime(formats=['%Y-%m-%d']), help='Pedidos desde (AAAA-MM-DD).')
+@click.option('--end', type=click.DateTime(formats=['%Y-%m-%d']), help='Pedidos hasta, inclusive (AAAA-MM-DD).')
+def rebuild_command(force, workers, batch_size, no_check_files, start, end):
+    """Regenera en paralelo los PDF que faltan, se perdieron o tienen un diseño viejo."""
+    # En modo lazy las facturas sin PDF son lo normal: solo se rehacen las guardadas
+    invoice_ids = find_stale_invoices(force=force, check_files=not no_check_files,
+                                      include_unrendered=not lazy_rendering(),
+                                      start=start.date() if start else None,
+                                      end=end.date() if end else None)
+    if not invoice_ids:
+        click.echo('No hay facturas para regenerar.')
+        return
+    click.echo(f'Regenerando {len(invoice_ids)} facturas...')
+
+    def report(stats):
+        rate = stats['invoices'] / stats['seconds'] if stats['seconds'] else 0
+        click.echo(f"  {stats['invoices']}/{len(invoice_ids)} ({rate:.1f} facturas/s)")
+
+    stats = rebuild_invoices(invoice_ids, workers=workers, batch_size=batch_size, on_batch=report)
+    rate = stats['invoices'] / stats['seconds'] if stats['seconds'] else 0
+    click.echo(f"Facturas regeneradas: {stats['invoices']} en {stats['seconds']:.1f} s "
+               f"({rate:.1f} facturas/s, {stats['bytes'] / 1024 / 1024:.1f} MB).")
+
+
+@invoices_cli.command('zip')
+@click.option('--output', '-o', type=click.File('wb'), default='-',
+              help='Archivo de salida (por defecto, la salida estándar).')
+@click.option('--start', type=click.DateTime(formats=['%Y-%m-%d']), help='Desde (AAAA-MM-DD).')
+@click.option('--end', type=click.DateTime(formats=['%Y-%m-%d']), help='Hasta, inclusive (AAAA-MM-DD).')
+def zip_command(output, start, end):
+    """Escribe un ZIP con las facturas de los pedidos del rango de fechas."""
+    for chunk in iter_invoice_zip(start=start.date() if start else None,
+                                  end=end.date() if end else None):
+        output.write(chunk)
+
+
+@invoices_cli.command('benchmark')
+@click.option('--count', default=500, show_default=True, help='Facturas a generar.')
+@click.option('--lines', default=5, show_default=True, help='Líneas por factura.')
+def benchmark_command(count, lines):
+    """Mide cuántas facturas por segundo genera un solo núcleo (sin base de datos)."""
+    renderer = get_invoice_renderer()
+    order = SimpleNamespace(
+        user=SimpleNamespace(username='cliente'),
+        created_at=datetime(2024, 1, 1, 8, 0),
+        total_amount=Decimal('2.50') * 2 * lines,
+        order_items=[SimpleNamespace(product=SimpleNamespace(name=f'Producto de prueba {i}'),
+                                     quantity=2, price=Decimal('2.50'), total_price=Decimal('5.00'))
+                     for i in range(lines)],
+    )
+    renderer.render(order, 'INV-0')  # calentamiento
+    started = time.perf_counter()
+    size = 0
+    for i in range(count):
+        size += len(renderer.render(order, f'INV-{i}'))
+    elapsed = time.perf_counter() - started
+    click.echo(f'{count} facturas en {elapsed:.2f} s: {count / elapsed:.0f} facturas/s por núcleo '
+               f'({elapsed / count * 1000:.2f} ms/factura, {size / count / 1024:.1f} KB de media).')
+
+
+@invoices_cli.command('requeue')
+def requeue_command():
+    """Vuelve a encolar las facturas que llevan más de INVOICE_STUCK_SECONDS pendientes."""
+    count = requeue_stuck_invoices(current_app._get_current_object())
+    drain_invoice_queue()
+    click.echo(f'Facturas reencoladas: {count}.')
+
+
+def _time_checkouts(app, orders, lines):
+    client = app.test_client()
+    client.post('/auth/login', data={'email': 'admin@bakery.com', 'password': 'admin123'})
+    with app.app_context():
+        product_ids = db.session.execute(
+            sa.select(Product.id).where(Product.active.is_(True)).order_by(Product.id).limit(lines)
+        ).scalars().all()
+    timings = []
+    for _ in range(orders):
+        for product_id in product_ids:
+            client.post(f'/cart/add/{product_id}', data={'quantity': 1})
+        started = time.perf_counter()
+        response = client.post('/cart/checkout', data={'idempotency_key': uuid.uuid4().hex})
+        timings.append((time.perf_counter() - started) * 1000)
+        if '/confirmation/' not in response.headers.get('Location', ''):
+            raise click.ClickException(f'El checkout no creó el pedido (HTTP {response.status_code}).')
+    return timings
+
+
+@invoices_cli.command('checkout-benchmark')
+@click.option('--orders', default=100, show_default=True, help='Checkouts por modo.')
+@click.option('--lines', default=3, show_default=True, help='Productos por pedido.')
+def checkout_benchmark_command(orders, lines):
+    """Latencia del checkout (p50/p99) generando el PDF en la petición y en la cola.
+
+    Cada modo usa una base SQLite temporal; la configurada no se toca.
+    """
+    modes = (('PDF en la petición (antes)', '1'), ('PDF en la cola (ahora)', '0'))
+    for label, sync in modes:
+        with scratch_app(INVOICE_QUEUE_SYNC=sync, INVOICE_RENDER_MODE='eager',
+                         LOG_LEVEL='WARNING') as app:
+            timings = _time_checkouts(app, orders, lines)
+            drain_invoice_queue()
+        percentiles = statistics.quantiles(timings, n=100)
+        click.echo(f'{label}: p50 {percentiles[49]:.1f} ms, p99 {percentiles[98]:.1f} ms '
+                   f'({orders} checkouts de {lines} productos).')
@@ -0,0 +1,134 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+from flask import current_app
+
+from app1 import db
+from models import Invoice
+from invoices.pdf import write_invoice_pdf
+from invoices.storage import get_invoice_storage
+from loaders import load_profile
+
+logger = logging.getLogger(__name__)
+
+# Invoice.render_status
+PENDING = 'pending'
+FAILED = 'failed'
+
+# Un pool por proceso; se crea en el primer encolado para que cada worker
+# de gunicorn tenga sus propios hilos (nunca el proceso maestro).
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config['INVOICE_WORKERS'],
+                thread_name_prefix='invoice-worker'
+            )
+    return _executor
+
+
+def drain_invoice_queue():
+    """Espera a que terminen los renders encolados en este proceso (comandos y benchmarks)."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def enqueue_invoice(invoice_id):
+    """Encola la generación del PDF de una factura ya confirmada en la base de datos."""
+    app = current_app._get_current_object()
+    if app.config['INVOICE_QUEUE_SYNC']:
+        return render_invoice_job(app, invoice_id)
+    return _get_executor(app).submit(render_invoice_job, app, invoice_id)
+
+
+def render_invoice_job(app, invoice_id):
+    with app.app_context():
+        invoice = db.session.get(Invoice, invoice_id, options=load_profile('invoice'))
+        if invoice is None or invoice.pdf_file_path:
+            return None
+        try:
+            path = write_invoice_pdf(invoice, get_invoice_storage(app))
+            db.session.commit()
+            return path
+        except Exception:
+            db.session.rollback()
+            logger.exception("Error generando PDF de la factura %s", invoice_id)
+            _mark_failed(invoice_id)
+            return None
+
+
+def _mark_failed(invoice_id):
+    # La confirmación deja de esperar y ofrece reintentar
+    try:
+        db.session.execute(
+            sa.update(Invoice)
+            .where(Invoice.id == invoice_id, Invoice.pdf_file_path.is_(None))
+            .values(render_status=FAILED)
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        logger.exception("No se pudo marcar como fallida la factura %s", invoice_id)
+
+
+def _claim(invoice_id, stuck_before, retry):
+    """Pasa la factura a 'pending' si nadie la está generando; True si la reclamó.
+
+    Es un UPDATE condicional: entre varios workers o pestañas solo uno gana.
+    Con `retry` también reclama las fallidas y las que nunca se encolaron.
+    """
+    claimable = sa.and_(Invoice.render_status == PENDING,
+                        Invoice.render_requested_at < stuck_before)
+    if retry:
+        claimable = sa.or_(claimable, Invoice.render_status.is_(None),
+                           Invoice.render_status == FAILED)
+    return bool(db.session.execute(
+        sa.update(Invoice)
+        .where(Invoice.id == invoice_id, Invoice.pdf_file_path.is_(None), claimable)
+        .values(render_status=PENDING, render_requested_at=datetime.utcnow())
+    ).rowcount)
+
+
+def retry_invoice_render(invoice_id):
+    """Vuelve a encolar una factura fallida o perdida; False si ya hay un render en curso."""
+    config = current_app.config
+    # Un render en curso es uno encolado hace menos de lo que la confirmación lo espera
+    waited = timedelta(seconds=config['INVOICE_POLL_SECONDS'] * config['INVOICE_POLL_LIMIT'])
+    claimed = _claim(invoice_id, datetime.utcnow() - waited, retry=True)
+    db.session.commit()
+    if claimed:
+        enqueue_invoice(invoice_id)
+    return claimed
+
+
+def requeue_stuck_invoices(app):
+    """Encola de nuevo las facturas que llevan más de INVOICE_STUCK_SECONDS en 'pending'.
+
+    Un worker reciclado o caído pierde los trabajos de su pool; se llama al
+    arrancar cada worker. Devuelve cuántas encoló.
+    """
+    with app.app_context():
+        stuck_before = datetime.utcnow() - timedelta(seconds=app.config['INVOICE_STUCK_SECONDS'])
+        invoice_ids = db.session.execute(
+            sa.select(Invoice.id)
+            .where(Invoice.render_status == PENDING, Invoice.pdf_file_path.is_(None),
+                   Invoice.render_requested_at < stuck_before)
+        ).scalars().all()
+        claimed = [i for i in invoice_ids if _claim(i, stuck_before, retry=False)]
+        db.session.commit()
+        for invoice_id in claimed:
+            enqueue_invoice(invoice_id)
+        if claimed:
+            logger.info("Facturas reencoladas: %d", len(claimed))
+        return len(claimed)
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import logging
+from datetime import timezone
+from functools import cached_property
+
+from flask import current_app
+
+from profiling import track
+
+# Subir este número al cambiar el diseño: `flask invoices rebuild` regenera
+# los PDF guardados con una versión anterior. (Cambiar solo la configuración
+# de la cabecera no lo sube: en ese caso, `flask invoices rebuild --all`.)
+LAYOUT_VERSION = 1
+
+
+class InvoiceRenderer:
+    """Genera los PDF de las facturas con un diseño fijo y textos configurables.
+
+    Se crea una vez por aplicación (o por proceso del pool de `rebuild`) con
+    los textos fijos ya resueltos. Las partes fijas (cabecera, encabezado de
+    la tabla y pie) se vuelven a dibujar en cada factura: copiar un PDF a
+    medio hacer cuesta lo mismo que dibujar esas pocas celdas. La salida es
+    determinista: la fecha de creación es la del pedido y los metadatos son
+    fijos, así que regenerar una factura da los mismos bytes.
+    """
+
+    # Argumentos del constructor; `options` los devuelve para recrearlo en otro proceso
+    OPTIONS = ('title', 'subtitle', 'thanks', 'contact', 'name_max_length')
+
+    def __init__(self, title="Panadería Delicias", subtitle="Calidad y Sabor en Cada Bocado",
+                 thanks="¡Gracias por su compra! Vuelva pronto.",
+                 contact="Para reclamos o consultas: contacto@panaderiadelicias.com",
+                 name_max_length=25):
+        self.title = title
+        self.subtitle = subtitle
+        self.thanks = thanks
+        self.contact = contact
+        self.name_max_length = name_max_length
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(title=config['INVOICE_TITLE'],
+                   subtitle=config['INVOICE_SUBTITLE'],
+                   thanks=config['INVOICE_THANKS'],
+                   contact=config['INVOICE_CONTACT'],
+                   name_max_length=config['INVOICE_NAME_MAX_LENGTH'])
+
+    @property
+    def options(self):
+        return {name: getattr(self, name) for name in self.OPTIONS}
+
+    @cached_property
+    def fingerprint(self):
+        """Versión del diseño y hash de las opciones: cambia cuando cambiarían los bytes del PDF."""
+        options = json.dumps(self.options, sort_keys=True).encode()
+        return f'v{LAYOUT_VERSION}-{hashlib.sha256(options).hexdigest()[:12]}'
+
+    def _header(self, pdf, invoice_number):
+        # --- ESTILO PROFESIONAL PARA PANADERÍA ---
+        # Título principal
+        pdf.set_font("Helvetica", 'B', 20)
+        pdf.set_text_color(210, 105, 30)  # Color chocolate
+        pdf.cell(0, 15, self.title, ln=True, align='C')
+        pdf.set_text_color(0, 0, 0)  # Volver a negro
+        pdf.ln(5)
+
+        # Subtítulo
+        pdf.set_font("Helvetica", 'I', 12)
+        pdf.cell(0, 10, self.subtitle, ln=True, align='C')
+        pdf.ln(10)
+
+        # Número de factura
+        pdf.set_font("Helvetica", 'B', 14)
+        pdf.set_fill_color(255, 248, 220)  # Fondo beige claro
+        pdf.cell(0, 12, f"FACTURA N° {invoice_number}", ln=True, align='C', fill=True)
+        pdf.ln(15)
+
+    def _table_header(self, pdf):
+        pdf.set_font("Helvetica", 'B', 11)
+        pdf.set_fill_color(245, 222, 179)  # Fondo beige dorado
+        pdf.set_text_color(139, 69, 19)   # Color marrón oscuro
+        pdf.cell(90, 12, "Producto", border=1, fill=True)
+        pdf.cell(30, 12, "Cantidad", border=1, fill=True, align='C')
+        pdf.cell(35, 12, "Precio", border=1, fill=True, align='R')
+        pdf.cell(35, 12, "Total", border=1, fill=True, align='R')
+        pdf.ln()
+        pdf.set_text_color(0, 0, 0)
+
+    def _footer(self, pdf):
+        # Mensaje de agradecimiento
+        pdf.ln(20)
+        pdf.set_font("Helvetica", 'I', 11)
+        pdf.set_text_color(210, 105, 30)
+        pdf.cell(0, 10, self.thanks, ln=True, align='C')
+        pdf.set_text_color(0, 0, 0)
+        pdf.cell(0, 10, self.contact, ln=True, align='C')
+
+    def _product_name(self, item):
+        name = item.product.name if item.product else "Producto eliminado"
+        # Limitar longitud del nombre
+        if len(name) > self.name_max_length:
+            name = name[:max(self.name_max_length - 3, 0)] + "..."
+        return name
+
+    def build(self, order, invoice_number):
+        """Arma el PDF de la factura de un pedido (sin escribirlo a disco)."""
+        # fpdf (con Pillow y fontTools) tarda ~0,25 s en importarse: se
+        # difiere hasta la primera factura para no alargar el arranque.
+        from fpdf import FPDF
+
+        pdf = FPDF()
+        if order.created_at:
+            pdf.set_creation_date(order.created_at.replace(tzinfo=timezone.utc))
+        pdf.set_title(f"Factura {invoice_number}")
+        pdf.set_author(self.title)
+        pdf.set_producer(self.title)
+        pdf.add_page()
+        pdf.set_auto_page_break(auto=True, margin=15)
+
+        self._header(pdf, invoice_number)
+
+        # Información del cliente y fecha
+        pdf.set_font("Helvetica", size=11)
+        client_name = order.user.username if order.user else "Cliente Desconocido"
+        pdf.cell(0, 10, f"Cliente: {client_name}", ln=True)
+
+        date_str = order.created_at.strftime('%d/%m/%Y') if order.created_at else "Fecha no disponible"
+        pdf.cell(0, 10, f"Fecha: {date_str}", ln=True)
+        pdf.ln(15)
+
+        # Tabla de productos
+        self._table_header(pdf)
+        pdf.set_font("Helvetica", size=10)
+        for item in order.order_items:
+            pdf.cell(90, 10, self._product_name(item), border=1)
+            pdf.cell(30, 10, str(item.quantity), border=1, align='C')
+            pdf.cell(35, 10, f"${item.price:.2f}", border=1, align='R')
+            pdf.cell(35, 10, f"${item.total_price:.2f}", border=1, align='R')
+            pdf.ln()
+
+        # Total final
+        pdf.ln(10)
+        pdf.set_font("Helvetica", 'B', 14)
+        pdf.set_fill_color(255, 255, 255)
+        pdf.cell(155, 12, "TOTAL", border=1, fill=True, align='R')
+        pdf.set_text_color(255, 0, 0)  # Rojo para el total
+        pdf.cell(35, 12, f"${order.total_amount:.2f}", border=1, fill=True, align='R')
+        pdf.set_text_color(0, 0, 0)
+
+        self._footer(pdf)
+        return pdf
+
+    def render(self, order, invoice_number):
+        """Devuelve los bytes del PDF de la factura de un pedido."""
+        with track('pdf'):
+            return bytes(self.build(order, invoice_number).output())
+
+
+def init_invoice_renderer(app):
+    # fpdf registra en DEBUG el tamaño de cada objeto de cada PDF; con el
+    # logging de la app en DEBUG eso encarece cada render en un ~15%.
+    logging.getLogger('fpdf').setLevel(logging.INFO)
+    app.extensions['invoice_renderer'] = InvoiceRenderer.from_config(app.config)
+
+
+def get_invoice_renderer(app=None):
+    return (app or current_app).extensions['invoice_renderer']
+
+
+def render_invoice_pdf(invoice):
+    """Devuelve los bytes del PDF de una factura."""
+    return get_invoice_renderer().render(invoice.order, invoice.invoice_number)
+
+
+def write_invoice_pdf(invoice, storage):
+    """Genera el PDF de una factura, lo guarda en `storage` y anota su clave en la factura."""
+    invoice.pdf_file_path = storage.save(render_invoice_pdf(invoice))
+    invoice.layout_version = LAYOUT_VERSION
+    invoice.render_status = None
+    return invoice.pdf_file_path
@@ -0,0 +1,176 @@
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import timezone
+
+from flask import current_app
+
+from models import Invoice
+from invoices.pdf import get_invoice_renderer, render_invoice_pdf
+from invoices.storage import StoredFile
+from loaders import load_profile
+
+logger = logging.getLogger(__name__)
+
+# Modo INVOICE_RENDER_MODE=lazy: el checkout crea la fila Invoice sin PDF y
+# la factura se genera la primera vez que alguien la descarga. Como el PDF
+# es determinista, no hace falta guardarlo: se mantiene en una caché LRU en
+# memoria acotada en bytes, y lo que sale de ella se vuelca a disco. La
+# clave incluye la versión del diseño y las opciones del renderer, así que
+# un cambio de textos o de LAYOUT_VERSION no sirve PDFs viejos (ni del disco).
+
+
+class InvoicePDFCache:
+    """LRU de PDFs acotada por tamaño en memoria, con desborde a un directorio."""
+
+    def __init__(self, max_bytes, spill_dir=None, max_spill_bytes=0):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.max_spill_bytes = max_spill_bytes
+        self._data = OrderedDict()
+        self._size = 0
+        self._spilled = OrderedDict()
+        self._spill_size = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'spill_hits': 0, 'misses': 0,
+                      'renders': 0, 'render_seconds': 0.0}
+        if spill_dir:
+            self._load_spill_index()
+
+    def _load_spill_index(self):
+        os.makedirs(self.spill_dir, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.spill_dir):
+            if name.endswith('.pdf'):
+                stat = os.stat(os.path.join(self.spill_dir, name))
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._spilled[key] = size
+            self._spill_size += size
+
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, f'{key}.pdf')
+
+    def get(self, key):
+        with self._lock:
+            data = self._data.get(key)
+            if data is not None:
+                self._data.move_to_end(key)
+                self.stats['hits'] += 1
+                return data
+            spilled = key in self._spilled
+        if spilled:
+            try:
+                with open(self._spill_path(key), 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                data = None
+            if data is not None:
+                with self._lock:
+                    self.stats['spill_hits'] += 1
+                self.set(key, data)
+                return data
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def set(self, key, data):
+        evicted = []
+        with self._lock:
+            if key in self._data:
+                self._size -= len(self._data.pop(key))
+            self._data[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes and len(self._data) > 1:
+                old_key, old_data = self._data.popitem(last=False)
+                self._size -= len(old_data)
+                evicted.append((old_key, old_data))
+        for old_key, old_data in evicted:
+            self._spill(old_key, old_data)
+
+    def _spill(self, key, data):
+        if not self.spill_dir or key in self._spilled:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.spill_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, self._spill_path(key))
+        with self._lock:
+            self._spilled[key] = len(data)
+            self._spill_size += len(data)
+            while self._spill_size > self.max_spill_bytes and self._spilled:
+                old_key, size = self._spilled.popitem(last=False)
+                self._spill_size -= size
+                try:
+                    os.remove(self._spill_path(old_key))
+                except FileNotFoundError:
+                    pass
+
+    def record_render(self, seconds):
+        with self._lock:
+            self.stats['renders'] += 1
+            self.stats['render_seconds'] += seconds
+
+    def snapshot(self):
+        """Métricas de la caché: aciertos, tasa de aciertos y tiempo de render."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_bytes'] = self._size
+            stats['memory_entries'] = len(self._data)
+            stats['spill_bytes'] = self._spill_size
+            stats['spill_entries'] = len(self._spilled)
+        lookups = stats['hits'] + stats['spill_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['spill_hits']) / lookups if lookups else 0.0
+        stats['avg_render_ms'] = (stats['render_seconds'] * 1000 / stats['renders']
+                                  if stats['renders'] else 0.0)
+        return stats
+
+
+def init_invoice_cache(app):
+    # En modo eager la caché no se usa: sin directorio de desborde que crear ni recorrer
+    spill_dir = None
+    if lazy_rendering(app):
+        spill_dir = app.config['INVOICE_CACHE_DIR'] or os.path.join(app.instance_path, 'invoice-cache')
+    app.extensions['invoice_pdf_cache'] = InvoicePDFCache(
+        app.config['INVOICE_CACHE_BYTES'],
+        spill_dir=spill_dir,
+        max_spill_bytes=app.config['INVOICE_CACHE_SPILL_BYTES'],
+    )
+
+
+def get_invoice_cache(app=None):
+    return (app or current_app).extensions['invoice_pdf_cache']
+
+
+def lazy_rendering(app=None):
+    return (app or current_app).config['INVOICE_RENDER_MODE'] == 'lazy'
+
+
+def get_invoice_pdf(invoice):
+    """Bytes del PDF de una factura, desde la caché o generándolo al vuelo."""
+    cache = get_invoice_cache()
+    key = f'{invoice.invoice_number}-{get_invoice_renderer().fingerprint}'
+    data = cache.get(key)
+    if data is None:
+        # Solo al generar hacen falta cliente, líneas y productos
+        invoice = Invoice.query.options(*load_profile('invoice')).filter_by(id=invoice.id).one()
+        started = time.perf_counter()
+        data = render_invoice_pdf(invoice)
+        elapsed = time.perf_counter() - started
+        cache.record_render(elapsed)
+        cache.set(key, data)
+        logger.debug("Factura %s generada en %.1f ms", invoice.invoice_number, elapsed * 1000)
+    return data
+
+
+def open_rendered_invoice(invoice):
+    """Igual que `open_invoice_file`, pero para facturas generadas bajo demanda."""
+    data = get_invoice_pdf(invoice)
+    created_at = invoice.order.created_at
+    return StoredFile(io.BytesIO(data), len(data), hashlib.sha256(data).hexdigest(),
+                      created_at.replace(tzinfo=timezone.utc) if created_at else None)
@@ -0,0 +1,149 @@
+import hashlib
+import io
+import os
+import tempfile
+from datetime import datetime, timezone
+
+from flask import current_app
+
+# Almacenamiento de los PDF de facturas. Invoice.pdf_file_path guarda una
+# clave relativa al backend configurado: "ab/cd/<sha256>.pdf". El contenido
+# se direcciona por su hash, así que un PDF idéntico (p. ej. una factura
+# regenerada) se guarda una sola vez y el hash sirve de ETag. Las claves
+# antiguas "static/invoices/invoice_X.pdf" ya no se leen desde la app:
+# static/ se sirve en público con URLs adivinables. `flask invoices
+# migrate-storage` las pasa al backend y borra el original.
+
+LEGACY_PREFIX = 'static/'
+
+
+class StoredFile:
+    """Archivo abierto desde un backend, listo para enviarse por HTTP."""
+
+    def __init__(self, fileobj, size, etag, last_modified=None):
+        self.fileobj = fileobj
+        self.size = size
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+def content_key(data):
+    digest = hashlib.sha256(data).hexdigest()
+    return f'{digest[:2]}/{digest[2:4]}/{digest}.pdf', digest
+
+
+def _etag_from_key(key):
+    return os.path.splitext(os.path.basename(key))[0]
+
+
+class LocalInvoiceStorage:
+    """Directorio local repartido en subcarpetas por los primeros bytes del hash."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def save(self, data):
+        key, _ = content_key(data)
+        path = self._path(key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Escritura atómica: nunca se sirve un PDF a medio escribir
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+        return key
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def open(self, key):
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return StoredFile(open(path, 'rb'), stat.st_size, _etag_from_key(key),
+                          datetime.fromtimestamp(stat.st_mtime, timezone.utc))
+
+
+class S3InvoiceStorage:
+    """Bucket compatible con S3 (AWS, MinIO, ...). Requiere boto3."""
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, client=None):
+        if client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise RuntimeError('INVOICE_STORAGE=s3 requiere instalar boto3.')
+            client = boto3.client('s3', endpoint_url=endpoint_url)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+
+    def _object_key(self, key):
+        return f'{self.prefix}/{key}' if self.prefix else key
+
+    def _head(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def save(self, data):
+        key, digest = content_key(data)
+        if self._head(key) is None:
+            self.client.put_object(Bucket=self.bucket, Key=self._object_key(key), Body=data,
+                                   ContentType='application/pdf',
+                                   Metadata={'sha256': digest})
+        return key
+
+    def exists(self, key):
+        return self._head(key) is not None
+
+    def open(self, key):
+        head = self._head(key)
+        if head is None:
+            return None
+        body = self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))['Body']
+        # Las facturas pesan pocos KB: se leen a memoria para poder servir rangos
+        return StoredFile(io.BytesIO(body.read()), head['ContentLength'], _etag_from_key(key),
+                          head.get('LastModified'))
+
+
+def init_invoice_storage(app):
+    backend = app.config['INVOICE_STORAGE']
+    if backend == 's3':
+        storage = S3InvoiceStorage(app.config['INVOICE_S3_BUCKET'],
+                                   prefix=app.config['INVOICE_S3_PREFIX'],
+                                   endpoint_url=app.config['INVOICE_S3_ENDPOINT_URL'])
+    else:
+        storage = LocalInvoiceStorage(app.config['INVOICE_STORAGE_PATH']
+                                      or os.path.join(app.instance_path, 'invoices'))
+    app.extensions['invoice_storage'] = storage
+
+
+def get_invoice_storage(app=None):
+    return (app or current_app).extensions['invoice_storage']
+
+
+def is_legacy_key(key):
+    return key.startswith(LEGACY_PREFIX)
+
+
+def invoice_file_exists(key, app=None):
+    # Una clave antigua cuenta como archivo perdido: se migra o se regenera
+    return not is_legacy_key(key) and get_invoice_storage(app).exists(key)
+
+
+def open_invoice_file(key, app=None):
+    """Abre el PDF de `key` desde el almacenamiento (o None si no existe o es una clave antigua)."""
+    if is_legacy_key(key):
+        return None
+    return get_invoice_storage(app).open(key)
@@ -0,0 +1,40 @@
+from sqlalchemy.orm import joinedload, selectinload
+from models import CartItem, Order, OrderItem, Product, Invoice
+
+# Perfiles de carga con nombre: cada página pide de una vez las relaciones que
+# su plantilla va a recorrer, en lugar de disparar un SELECT lazy por fila.
+# Se construyen bajo demanda porque los backrefs solo existen una vez
+# configurados los mappers.
+_PROFILES = {
+    # Grillas de productos: la tarjeta muestra el nombre de la categoría
+    'catalog': lambda: (
+        joinedload(Product.category),
+    ),
+    # cart/index.html y checkout: producto y categoría de cada línea
+    'cart': lambda: (
+        joinedload(CartItem.product).joinedload(Product.category),
+    ),
+    # orders/history.html: las líneas de la página se cargan aparte, con su producto
+    'order_history': lambda: (
+        joinedload(OrderItem.product),
+    ),
+    # orders/confirmation.html: líneas, productos y factura
+    'order_detail': lambda: (
+        selectinload(Order.order_items).joinedload(OrderItem.product),
+        joinedload(Order.invoice),
+    ),
+    # Listados de pedidos del panel: nombre del cliente
+    'admin_orders': lambda: (
+        joinedload(Order.user),
+    ),
+    # Generación del PDF: pedido, cliente, líneas y productos
+    'invoice': lambda: (
+        joinedload(Invoice.order).joinedload(Order.user),
+        joinedload(Invoice.order).selectinload(Order.order_items).joinedload(OrderItem.product),
+    ),
+}
+
+
+def load_profile(name):
+    """Devuelve las opciones de carga del perfil `name` para usar en `.options(...)`."""
+    return _PROFILES[name]()
@@ -0,0 +1,125 @@
+import http.client
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+# Prueba de carga de la configuración de producción: levanta gunicorn con
+# gunicorn.conf.py y distintos números de workers, y mide cuántas peticiones
+# por segundo atiende una URL. El generador de carga corre en este mismo
+# proceso (hilos con conexiones keep-alive): en una máquina con pocos
+# núcleos compite con los workers, así que los números sirven para comparar
+# configuraciones entre sí, no como capacidad absoluta.
+
+load_cli = AppGroup('load', help='Pruebas de carga.')
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_ready(port, path, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', path)
+            if conn.getresponse().status == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def _hammer(port, path, concurrency, seconds):
+    """Latencias (s) de las respuestas 200 y número de errores durante `seconds`."""
+    deadline = time.monotonic() + seconds
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def client():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        mine, failed = [], 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+                if response.status == 200:
+                    mine.append(time.perf_counter() - started)
+                else:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+            errors.append(failed)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, sum(errors)
+
+
+@load_cli.command('gunicorn')
+@click.option('--workers', 'worker_counts', type=int, multiple=True,
+              help='Workers a probar (se puede repetir). Por defecto 1, 2 y 4.')
+@click.option('--threads', type=int, help='Hilos por worker (por defecto, GUNICORN_THREADS o 4).')
+@click.option('--path', default='/products/', show_default=True, help='URL a pedir.')
+@click.option('--concurrency', default=16, show_default=True, help='Clientes simultáneos.')
+@click.option('--duration', default=10, show_default=True, help='Segundos de medición por configuración.')
+@click.option('--warmup', default=2, show_default=True, help='Segundos de calentamiento sin medir.')
+def gunicorn_command(worker_counts, threads, path, concurrency, duration, warmup):
+    """Peticiones por segundo de gunicorn (gunicorn.conf.py) con distintos números de workers.
+
+    Usa la base configurada y solo hace peticiones GET. Los errores incluyen
+    las conexiones keep-alive que se cortan cuando un worker se recicla
+    (GUNICORN_MAX_REQUESTS).
+    """
+    root = current_app.root_path
+    for workers in worker_counts or (1, 2, 4):
+        port = _free_port()
+        env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers), LOG_LEVEL='warning')
+        if threads:
+            env['GUNICORN_THREADS'] = str(threads)
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', os.path.join(root, 'gunicorn.conf.py'), 'main:app'],
+            cwd=root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            if not _wait_until_ready(port, path, timeout=60):
+                raise click.ClickException(f'gunicorn con {workers} workers no respondió 200 en {path}.')
+            _hammer(port, path, concurrency, warmup)
+            latencies, errors = _hammer(port, path, concurrency, duration)
+        finally:
+            # SIGINT: apagado inmediato, sin esperar el graceful_timeout
+            server.send_signal(signal.SIGINT)
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
+        if len(latencies) < 2:
+            raise click.ClickException(f'Con {workers} workers casi no hubo respuestas ({errors} errores).')
+        percentiles = statistics.quantiles(latencies, n=100)
+        click.echo(f'{workers} worker{"s" if workers != 1 else ""}: {len(latencies) / duration:.0f} req/s, '
+                   f'p50 {percentiles[49] * 1000:.1f} ms, p99 {percentiles[98] * 1000:.1f} ms, '
+                   f'{errors} errores ({concurrency} clientes, {duration} s).')
@@ -1,9 +1,9 @@
-from app1 import app
-from flask_migrate import Migrate
+from app1 import create_app
+from invoices.jobs import requeue_stuck_invoices
 
-# Configurar Flask-Migrate
-migrate = Migrate() 
+app = create_app()
 
 if __name__ == '__main__':
+    requeue_stuck_invoices(app)
     app.run(host='0.0.0.0', port=5000, debug=False)
     # Trigger rebuild - do not remove
@@ -0,0 +1,64 @@
+"""order idempotency keys, daily sales rollup, invoice layout version
+
+Revision ID: c3f1a9d2e4b7
+Revises: 899921d7ac05
+Create Date: 2026-10-17 14:05:12.418337
+
+Lo que se añadió a los modelos antes de tener migraciones y que la revisión
+inicial no crea. Comprueba cada cambio antes de aplicarlo: las bases que se
+crearon con la primera versión de la revisión inicial ya lo tienen.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f1a9d2e4b7'
+down_revision = '899921d7ac05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    order_columns = {c['name'] for c in inspector.get_columns('order')}
+    order_uniques = {u['name'] for u in inspector.get_unique_constraints('order')}
+    invoice_columns = {c['name'] for c in inspector.get_columns('invoice')}
+
+    if 'idempotency_key' not in order_columns or 'uq_order_user_idempotency_key' not in order_uniques:
+        with op.batch_alter_table('order', schema=None) as batch_op:
+            if 'idempotency_key' not in order_columns:
+                batch_op.add_column(sa.Column('idempotency_key', sa.String(length=64), nullable=True))
+            if 'uq_order_user_idempotency_key' not in order_uniques:
+                batch_op.create_unique_constraint('uq_order_user_idempotency_key',
+                                                  ['user_id', 'idempotency_key'])
+
+    if not inspector.has_table('daily_sales'):
+        op.create_table('daily_sales',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('orders', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['category_id'], ['category.id'], ),
+        sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('day', 'product_id', name='uq_daily_sales_day_product')
+        )
+
+    if 'layout_version' not in invoice_columns:
+        with op.batch_alter_table('invoice', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('layout_version', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('invoice', schema=None) as batch_op:
+        batch_op.drop_column('layout_version')
+
+    op.drop_table('daily_sales')
+
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_order_user_idempotency_key', type_='unique')
+        batch_op.drop_column('idempotency_key')
@@ -3,7 +3,7 @@ import os
 
 from flask_login import UserMixin
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from passwords import get_password_hasher
 from datetime import datetime
 
 from sqlalchemy import func
@@ -22,10 +22,14 @@ class User(UserMixin, db.Model):
     cart_items = db.relationship('CartItem', backref='user', lazy=True, cascade='all, delete-orphan')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = get_password_hasher().hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return get_password_hasher().verify(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        """True si el hash guardado usa otros parámetros que PASSWORD_HASH_METHOD."""
+        return get_password_hasher().needs_rehash(self.password_hash)
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -61,6 +65,17 @@ class Product(db.Model):
     cart_items = db.relationship('CartItem', backref='product', lazy=True)
     order_items = db.relationship('OrderItem', backref='product', lazy=True)
     
+    # Índices para el catálogo: listados de activos (por fecha o precio, con
+    # keyset sobre id), filtrados por categoría, destacados de la portada y
+    # el listado completo del panel de administración
+    __table_args__ = (
+        db.Index('ix_product_created_at', 'created_at', 'id'),
+        db.Index('ix_product_active_created_at', 'active', 'created_at', 'id'),
+        db.Index('ix_product_active_price', 'active', 'price', 'id'),
+        db.Index('ix_product_category_active_created_at', 'category_id', 'active', 'created_at', 'id'),
+        db.Index('ix_product_featured_active', 'featured', 'active'),
+    )
+    
     def __repr__(self):
         return f'<Product {self.name}>'
 
@@ -74,6 +89,11 @@ class CartItem(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
     
+    # Una fila por producto en el carrito; también sirve de índice por user_id
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'product_id', name='uq_cart_item_user_product'),
+    )
+    
     @property
     def total_price(self):
         return float(self.quantity) * float(self.product.price)
@@ -86,10 +106,17 @@ class Order(db.Model):
     total_amount = db.Column(db.Numeric(10, 2), nullable=False)
     status = db.Column(db.String(20), default='pending')  # pending, confirmed, preparing, ready, delivered
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    idempotency_key = db.Column(db.String(64))  # Enviada por el formulario de pago
     
     # Foreign Keys
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'idempotency_key', name='uq_order_user_idempotency_key'),
+        db.Index('ix_order_user_created_at', 'user_id', 'created_at'),
+        db.Index('ix_order_created_at', 'created_at'),
+    )
+    
     # Relationships
     order_items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan')
     
@@ -105,12 +132,13 @@ class OrderItem(db.Model):
     price = db.Column(db.Numeric(10, 2), nullable=False)  # Price at time of order
     
     # Foreign Keys
-    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False, index=True)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
     
     @property
     def total_price(self):
-        return float(self.quantity) * float(self.price)
+        # Decimal: price es Numeric y quantity entero, sin pasar por float
+        return self.quantity * self.price
     
     def __repr__(self):
         return f'<OrderItem {self.product.name} x{self.quantity}>'
@@ -123,8 +151,12 @@ class Invoice(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     invoice_number = db.Column(db.String(50), unique=True, nullable=False)
-    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
-    pdf_file_path = db.Column(db.String(256))  # Ruta relativa: "static/invoices/invoice_X.pdf"
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False, index=True)
+    pdf_file_path = db.Column(db.String(256))  # Clave en el almacenamiento de facturas (ver invoices.storage)
+    layout_version = db.Column(db.Integer)  # Versión del diseño con la que se generó el PDF
+    # Render en segundo plano: 'pending' (encolado) o 'failed'; NULL si no hay ninguno en curso
+    render_status = db.Column(db.String(16), index=True)
+    render_requested_at = db.Column(db.DateTime)  # Último encolado, para detectar trabajos perdidos
     created_at = db.Column(db.DateTime, default=func.now(), nullable=False)
 
     order = db.relationship('Order', backref=db.backref('invoice', uselist=False, lazy=True))
@@ -132,14 +164,57 @@ class Invoice(db.Model):
     def __repr__(self):
         return f'<Invoice {self.invoice_number}>'
 
-    def get_pdf_url(self):
-        """Devuelve la ruta relativa para usar en url_for('static', ...)"""
-        if self.pdf_file_path:
-            path = self.pdf_file_path
-            if path.startswith('static/'):
-                path = path[7:]  # Quita 'static/'
-            return path
-        return None
-    
-    
-    
+
+class DailySales(db.Model):
+    """Ventas acumuladas por día y producto (rollup para el panel de administración)."""
+    __tablename__ = 'daily_sales'
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+
+    # Foreign Keys
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
+
+    product = db.relationship('Product')
+    category = db.relationship('Category')
+
+    __table_args__ = (
+        db.UniqueConstraint('day', 'product_id', name='uq_daily_sales_day_product'),
+    )
+
+    def __repr__(self):
+        return f'<DailySales {self.day} product={self.product_id} x{self.quantity}>'
+
+
+class DailyStock(db.Model):
+    """Inventario de un producto para un día: cuántos se hornearon y cuántos se vendieron.
+
+    Un producto sin fila para el día no lleva inventario (se vende sin límite).
+    """
+    __tablename__ = 'daily_stock'
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    sold = db.Column(db.Integer, nullable=False, default=0)
+
+    # Foreign Keys
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+
+    product = db.relationship('Product')
+
+    __table_args__ = (
+        db.UniqueConstraint('day', 'product_id', name='uq_daily_stock_day_product'),
+        db.CheckConstraint('sold <= quantity', name='ck_daily_stock_not_oversold'),
+    )
+
+    @property
+    def remaining(self):
+        return max(self.quantity - self.sold, 0)
+
+    def __repr__(self):
+        return f'<DailyStock {self.day} product={self.product_id} {self.sold}/{self.quantity}>'
@@ -0,0 +1,191 @@
+import base64
+import binascii
+import json
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+import click
+import sqlalchemy as sa
+from flask.cli import AppGroup
+
+from app1 import db
+
+
+# Paginación por cursor (keyset): en lugar de OFFSET, cada página filtra por
+# los valores de orden de la última fila vista, así la página 1000 cuesta lo
+# mismo que la primera. El cursor viaja en la URL como un token opaco.
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'dec': str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'dec' in value:
+            return Decimal(value['dec'])
+    return value
+
+
+def encode_cursor(values, direction='next'):
+    payload = json.dumps({'k': [_encode_value(v) for v in values], 'd': direction},
+                         separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Devuelve (valores, dirección) o (None, 'next') si el token no es válido."""
+    if not token:
+        return None, 'next'
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return [_decode_value(v) for v in payload['k']], payload['d']
+    except (ValueError, KeyError, TypeError, InvalidOperation, binascii.Error):
+        return None, 'next'
+
+
+def _matches_column(value, column):
+    """True si un valor del cursor tiene el tipo de Python de su columna de orden."""
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return True
+    if isinstance(value, bool):
+        return python_type is bool
+    if python_type is Decimal:
+        return isinstance(value, int) or (isinstance(value, Decimal) and value.is_finite())
+    return isinstance(value, python_type)
+
+
+class KeysetPage:
+    """Página de resultados por cursor, con la misma forma básica que `Pagination`."""
+
+    keyset = True
+
+    def __init__(self, items, next_cursor, prev_cursor, per_page, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.per_page = per_page
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+def keyset_paginate(query, order_by, cursor=None, per_page=12, descending=False, total=None):
+    """Pagina `query` por las columnas `order_by` (la última debe ser única, p. ej. el id).
+
+    `total` es opcional: None omite el COUNT(*) y un callable permite pasar
+    un conteo propio (aproximado o cacheado) que solo se evalúa aquí.
+    """
+    values, direction = decode_cursor(cursor)
+    # Un cursor manipulado (otro número de valores, otros tipos) vuelve a la primera página
+    if values is not None and (
+            direction not in ('next', 'prev') or len(values) != len(order_by)
+            or not all(_matches_column(v, c) for v, c in zip(values, order_by))):
+        values, direction = None, 'next'
+
+    key = sa.tuple_(*order_by)
+    backwards = direction == 'prev'
+    # Recorrer hacia atrás invierte el sentido del orden y de la comparación
+    forward_desc = descending != backwards
+
+    if values is not None:
+        bound = sa.tuple_(*[sa.literal(v, c.type) for v, c in zip(values, order_by)])
+        query = query.filter(key < bound if forward_desc else key > bound)
+    query = query.order_by(*[c.desc() if forward_desc else c.asc() for c in order_by])
+
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    def cursor_for(row, to):
+        return encode_cursor([getattr(row, c.key) for c in order_by], to)
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if (has_more and not backwards) or (backwards and values is not None):
+            next_cursor = cursor_for(rows[-1], 'next')
+        if (has_more and backwards) or (not backwards and values is not None):
+            prev_cursor = cursor_for(rows[0], 'prev')
+
+    return KeysetPage(rows, next_cursor, prev_cursor, per_page,
+                      total=total() if callable(total) else total)
+
+
+pagination_cli = AppGroup('pagination', help='Paginación del catálogo.')
+
+
+@pagination_cli.command('benchmark')
+@click.option('--products', 'count', default=20000, show_default=True, help='Productos sintéticos.')
+@click.option('--page', default=1000, show_default=True, help='Página a medir.')
+@click.option('--per-page', default=12, show_default=True)
+@click.option('--repeat', default=20, show_default=True, help='Mediciones por método.')
+def benchmark_command(count, page, per_page, repeat):
+    """Compara OFFSET con cursor en una página profunda del listado de productos.
+
+    Los productos sintéticos se insertan en una transacción que se deshace
+    al terminar: la base queda como estaba.
+    """
+    from models import Category, Product
+
+    category_id = db.session.execute(sa.select(Category.id).limit(1)).scalar()
+    if category_id is None:
+        raise click.ClickException('Hace falta al menos una categoría (`flask seed`).')
+    count = max(count, page * per_page)
+    started = datetime(2020, 1, 1)
+    db.session.execute(Product.__table__.insert(), [
+        {'name': f'Producto {i}', 'description': '', 'price': Decimal(i % 5000) / 100 + 1,
+         'featured': False, 'active': True, 'category_id': category_id,
+         'created_at': datetime.fromtimestamp(started.timestamp() + i)}
+        for i in range(count)
+    ])
+    query = Product.query.filter_by(active=True)
+    order_by = (Product.created_at, Product.id)
+
+    def offset_page():
+        items = (query.order_by(Product.created_at.desc(), Product.id.desc())
+                 .offset((page - 1) * per_page).limit(per_page).all())
+        query.order_by(None).count()
+        return items
+
+    # Cursor de la página pedida: los valores de la última fila de la anterior
+    boundary = (query.order_by(Product.created_at.desc(), Product.id.desc())
+                .offset((page - 1) * per_page - 1).limit(1).one())
+    cursor = encode_cursor([boundary.created_at, boundary.id])
+
+    def keyset_page():
+        return keyset_paginate(query, order_by, cursor=cursor, per_page=per_page, descending=True).items
+
+    try:
+        assert [p.id for p in offset_page()] == [p.id for p in keyset_page()]
+        for name, fetch in (('OFFSET + COUNT', offset_page), ('cursor', keyset_page)):
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                fetch()
+                timings.append(time.perf_counter() - start)
+            timings.sort()
+            click.echo(f'{name}: página {page} con {count} productos en '
+                       f'{timings[len(timings) // 2] * 1000:.2f} ms (mediana de {repeat})')
+    finally:
+        db.session.rollback()
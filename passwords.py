@@ -0,0 +1,104 @@
+import threading
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+# Hash de contraseñas con parámetros configurables (PASSWORD_HASH_METHOD,
+# en el formato de werkzeug: "scrypt:n:r:p" o "pbkdf2:sha256:iteraciones").
+# Al cambiarlos, cada usuario pasa a los nuevos parámetros en su siguiente
+# inicio de sesión. El hash se calcula en el hilo de la petición (hashlib
+# suelta el GIL) y un semáforo acota cuántos corren a la vez, así unos
+# cuantos inicios de sesión simultáneos no acaparan la CPU del worker.
+
+
+# Valores de werkzeug para los parámetros de scrypt que no se indican (n, r, p)
+SCRYPT_DEFAULTS = (2 ** 15, 8, 1)
+
+
+def canonical_method(method):
+    """El método con todos sus parámetros, tal como queda al inicio del hash guardado.
+
+    Los que falten se completan con los valores por defecto de werkzeug:
+    "scrypt:16384" es "scrypt:16384:8:1" y "pbkdf2" es "pbkdf2:sha256:<iteraciones>".
+    """
+    name, *args = method.strip().split(':')
+    if name == 'scrypt':
+        if len(args) > len(SCRYPT_DEFAULTS):
+            raise ValueError(f"'scrypt' admite como mucho 3 parámetros: {method}")
+        n, r, p = [int(arg) for arg in args] + list(SCRYPT_DEFAULTS[len(args):])
+        return f'scrypt:{n}:{r}:{p}'
+    if name == 'pbkdf2':
+        if len(args) > 2:
+            raise ValueError(f"'pbkdf2' admite como mucho 2 parámetros: {method}")
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    return method
+
+
+class PasswordHasher:
+    """Genera y verifica hashes de contraseña, con `concurrency` como máximo a la vez."""
+
+    def __init__(self, method='scrypt', concurrency=2):
+        self.method = canonical_method(method)
+        self._slots = threading.BoundedSemaphore(concurrency)
+
+    def hash(self, password):
+        with self._slots:
+            return generate_password_hash(password, self.method)
+
+    def verify(self, password_hash, password):
+        with self._slots:
+            return check_password_hash(password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return password_hash.split('$', 1)[0] != self.method
+
+
+def init_password_hasher(app):
+    app.extensions['password_hasher'] = PasswordHasher(app.config['PASSWORD_HASH_METHOD'],
+                                                       app.config['PASSWORD_HASH_WORKERS'])
+
+
+def get_password_hasher(app=None):
+    return (app or current_app).extensions['password_hasher']
+
+
+passwords_cli = AppGroup('passwords', help='Hash de contraseñas.')
+
+BENCHMARK_METHODS = ('scrypt:32768:8:1', 'scrypt:16384:8:1', 'pbkdf2:sha256:1000000',
+                     'pbkdf2:sha256:600000', 'pbkdf2:sha256:260000')
+
+
+@passwords_cli.command('benchmark')
+@click.option('--method', 'methods', multiple=True,
+              help='Parámetros a medir (se puede repetir). Por defecto, varios de scrypt y pbkdf2.')
+@click.option('--count', default=50, show_default=True, help='Inicios de sesión por método.')
+@click.option('--concurrency', type=int, help='Hashes a la vez (por defecto, PASSWORD_HASH_WORKERS).')
+def benchmark_command(methods, count, concurrency):
+    """Mide cuántos inicios de sesión por segundo verifica un worker con cada método."""
+    concurrency = concurrency or current_app.config['PASSWORD_HASH_WORKERS']
+    configured = canonical_method(current_app.config['PASSWORD_HASH_METHOD'])
+    for method in methods or BENCHMARK_METHODS:
+        hasher = PasswordHasher(method, concurrency)
+        stored = hasher.hash('contraseña de prueba')
+        started = time.perf_counter()
+        hasher.verify(stored, 'contraseña de prueba')
+        single = time.perf_counter() - started
+        # Verificaciones simultáneas, una por hilo, como varias peticiones de login a la vez
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(hasher.verify(stored, 'contraseña de prueba')))
+                   for _ in range(count)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        assert len(results) == count and all(results)
+        marker = ' (configurado)' if canonical_method(method) == configured else ''
+        click.echo(f'{hasher.method}{marker}: {single * 1000:.0f} ms por verificación, '
+                   f'{count / elapsed:.1f} logins/s con {concurrency} a la vez')
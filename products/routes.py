@@ -1,46 +1,91 @@
-from flask import render_template, request
+from flask import render_template, request, abort, current_app, jsonify
 from products import bp
-from models import Product, Category
+from models import Product
+from loaders import load_profile
+from catalog import get_categories, get_category, count_products
+from fragments import catalog_conditional
+from search import search_products
+from pagination import keyset_paginate
+from stock import stock_levels
+
+# Órdenes disponibles para la paginación por cursor: (columnas, descendente)
+SORT_ORDERS = {
+    'recientes': ((Product.created_at, Product.id), True),
+    'precio': ((Product.price, Product.id), False),
+}
+
+
+def _paginate_catalog(query, category_id=None):
+    sort = request.args.get('sort', 'recientes')
+    order_by, descending = SORT_ORDERS.get(sort, SORT_ORDERS['recientes'])
+    return keyset_paginate(query, order_by,
+                           cursor=request.args.get('cursor'),
+                           per_page=12,
+                           descending=descending,
+                           total=lambda: count_products(category_id))
+
+def _grid_key(name, category):
+    """Clave del fragmento de la grilla: todo lo que cambia su contenido (y sus enlaces)."""
+    return (name, category, request.args.get('sort'), request.args.get('cursor'))
 
 @bp.route('/')
+@catalog_conditional
 def index():
     page = request.args.get('page', 1, type=int)
     category_id = request.args.get('category', type=int)
     search = request.args.get('search', '')
     
-    query = Product.query.filter_by(active=True)
+    query = Product.query.options(*load_profile('catalog')).filter_by(active=True)
     
     if category_id:
         query = query.filter_by(category_id=category_id)
     
+    # Los productos se cargan desde la plantilla, solo si el fragmento de
+    # la grilla no está en caché
     if search:
-        query = query.filter(Product.name.contains(search) | Product.description.contains(search))
+        # Los resultados van por relevancia, así que la búsqueda sigue con OFFSET
+        query = search_products(query, search)
+        load_products = lambda: query.paginate(page=page, per_page=12, error_out=False)
+        grid_key = None
+    else:
+        load_products = lambda: _paginate_catalog(query, category_id)
+        grid_key = _grid_key('products', request.args.get('category'))
     
-    products = query.paginate(
-        page=page, per_page=12, error_out=False
-    )
-    
-    categories = Category.query.all()
-    selected_category = Category.query.get(category_id) if category_id else None
+    categories = get_categories()
+    selected_category = get_category(category_id) if category_id else None
     
     return render_template('products/index.html', 
-                         products=products,
+                         load_products=load_products,
+                         grid_key=grid_key,
                          categories=categories,
                          selected_category=selected_category,
                          search=search)
 
 @bp.route('/category/<int:category_id>')
+@catalog_conditional
 def category(category_id):
-    category = Category.query.get_or_404(category_id)
-    page = request.args.get('page', 1, type=int)
+    category = get_category(category_id)
+    if category is None:
+        abort(404)
     
-    products = Product.query.filter_by(category_id=category_id, active=True).paginate(
-        page=page, per_page=12, error_out=False
-    )
+    query = Product.query.options(*load_profile('catalog')).filter_by(category_id=category_id, active=True)
     
-    categories = Category.query.all()
+    categories = get_categories()
     
     return render_template('products/category.html',
                          category=category,
-                         products=products,
+                         load_products=lambda: _paginate_catalog(query, category_id),
+                         grid_key=_grid_key('category', category_id),
                          categories=categories)
+
+@bp.route('/stock')
+def stock():
+    """Unidades que quedan hoy de los productos con inventario.
+
+    Las grillas del catálogo van en caché de fragmentos y con ETag, así que
+    el inventario no se renderiza en ellas: cart.js lo pide aquí y lo pinta.
+    """
+    response = jsonify({str(product_id): remaining for product_id, remaining in stock_levels().items()})
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config['STOCK_CACHE_TTL']
+    return response
@@ -0,0 +1,225 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from flask import Response, abort, before_render_template, g, has_app_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Instrumentación por petición, opcional (PROFILING=1). Para cada petición
+# registra el tiempo total, el número y tiempo de las consultas SQL, el
+# tiempo de render de plantillas y el de generación de PDF. Las peticiones
+# lentas se registran con su lista de consultas, /metrics expone los
+# acumulados en formato Prometheus (por proceso) y, para las rutas
+# elegidas, se guarda una muestra de cProfile.
+
+# Límites (segundos) de los buckets del histograma de duración
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    """Tiempos acumulados de una petición."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []  # (sql, segundos)
+        self.timings = defaultdict(float)  # 'sql', 'template', 'pdf'
+        self.profiler = None
+
+
+class Metrics:
+    """Contadores e histogramas en memoria, por endpoint, en formato Prometheus."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = defaultdict(int)  # (endpoint, method, status) -> n
+        self.duration_buckets = defaultdict(lambda: [0] * len(BUCKETS))  # endpoint -> cuentas
+        self.duration_count = defaultdict(int)
+        self.duration_sum = defaultdict(float)
+        self.sql_queries = defaultdict(int)
+        self.phase_seconds = defaultdict(float)  # (endpoint, fase) -> segundos
+
+    def observe(self, endpoint, method, status, seconds, stats):
+        with self._lock:
+            self.requests[(endpoint, method, status)] += 1
+            buckets = self.duration_buckets[endpoint]
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+            self.duration_count[endpoint] += 1
+            self.duration_sum[endpoint] += seconds
+            self.sql_queries[endpoint] += len(stats.queries)
+            for phase, value in stats.timings.items():
+                self.phase_seconds[(endpoint, phase)] += value
+
+    def render(self, extra=()):
+        lines = [
+            '# HELP http_requests_total Peticiones atendidas.',
+            '# TYPE http_requests_total counter',
+        ]
+        with self._lock:
+            for (endpoint, method, status), n in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {n}')
+            lines += [
+                '# HELP http_request_duration_seconds Duración de las peticiones.',
+                '# TYPE http_request_duration_seconds histogram',
+            ]
+            for endpoint in sorted(self.duration_count):
+                for bound, n in zip(BUCKETS, self.duration_buckets[endpoint]):
+                    lines.append(f'http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {n}')
+                count = self.duration_count[endpoint]
+                lines.append(f'http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {count}')
+                lines.append(f'http_request_duration_seconds_sum{{endpoint="{endpoint}"}} {self.duration_sum[endpoint]:.6f}')
+                lines.append(f'http_request_duration_seconds_count{{endpoint="{endpoint}"}} {count}')
+            lines += [
+                '# HELP sql_queries_total Consultas SQL ejecutadas durante peticiones.',
+                '# TYPE sql_queries_total counter',
+            ]
+            for endpoint, n in sorted(self.sql_queries.items()):
+                lines.append(f'sql_queries_total{{endpoint="{endpoint}"}} {n}')
+            lines += [
+                '# HELP request_phase_seconds_total Tiempo por fase (sql, template, pdf).',
+                '# TYPE request_phase_seconds_total counter',
+            ]
+            for (endpoint, phase), value in sorted(self.phase_seconds.items()):
+                lines.append(f'request_phase_seconds_total{{endpoint="{endpoint}",phase="{phase}"}} {value:.6f}')
+        lines.extend(extra)
+        return '\n'.join(lines) + '\n'
+
+
+def _current_stats():
+    return g.get('_request_stats') if has_app_context() else None
+
+
+@contextmanager
+def track(phase):
+    """Suma al `phase` de la petición en curso el tiempo del bloque (sin efecto fuera de una)."""
+    stats = _current_stats()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.timings[phase] += time.perf_counter() - started
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats() is not None:
+        conn.info.setdefault('_query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats()
+    started = conn.info.get('_query_started')
+    if stats is None or not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    stats.queries.append((statement, elapsed))
+    stats.timings['sql'] += elapsed
+
+
+def _before_render(sender, template, context, **extra):
+    stats = _current_stats()
+    if stats is not None:
+        g._template_started = time.perf_counter()
+
+
+def _after_render(sender, template, context, **extra):
+    stats = _current_stats()
+    started = g.pop('_template_started', None)
+    if stats is not None and started is not None:
+        stats.timings['template'] += time.perf_counter() - started
+
+
+def _invoice_cache_metrics(app):
+    cache = app.extensions.get('invoice_pdf_cache')
+    if cache is None:
+        return []
+    snapshot = cache.snapshot()
+    lines = ['# HELP invoice_pdf_cache_events_total Búsquedas en la caché de PDF de facturas.',
+             '# TYPE invoice_pdf_cache_events_total counter']
+    for event_name in ('hits', 'spill_hits', 'misses'):
+        lines.append(f'invoice_pdf_cache_events_total{{result="{event_name}"}} {snapshot[event_name]}')
+    lines += ['# TYPE invoice_pdf_renders_total counter',
+              f'invoice_pdf_renders_total {snapshot["renders"]}',
+              '# TYPE invoice_pdf_render_seconds_total counter',
+              f'invoice_pdf_render_seconds_total {snapshot["render_seconds"]:.6f}']
+    return lines
+
+
+def init_profiling(app):
+    if not app.config['PROFILING']:
+        return
+    metrics = Metrics()
+    app.extensions['profiling_metrics'] = metrics
+    slow_seconds = app.config['SLOW_REQUEST_MS'] / 1000
+    profile_routes = set(app.config['PROFILE_ROUTES'])
+    sample_rate = app.config['PROFILE_SAMPLE_RATE']
+    profile_dir = app.config['PROFILE_DIR'] or os.path.join(app.instance_path, 'profiles')
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+    @app.before_request
+    def start_request_stats():
+        stats = g._request_stats = RequestStats()
+        if request.endpoint in profile_routes and random.random() < sample_rate:
+            stats.profiler = cProfile.Profile()
+            stats.profiler.enable()
+
+    @app.after_request
+    def finish_request_stats(response):
+        stats = g.pop('_request_stats', None)
+        if stats is None:
+            return response
+        elapsed = time.perf_counter() - stats.started
+        endpoint = request.endpoint or 'unknown'
+        if endpoint != 'metrics':
+            metrics.observe(endpoint, request.method, response.status_code, elapsed, stats)
+
+        response.headers['Server-Timing'] = ', '.join(
+            [f'total;dur={elapsed * 1000:.1f}'] +
+            [f'{phase};dur={value * 1000:.1f}' for phase, value in stats.timings.items()]
+        )
+
+        if elapsed >= slow_seconds:
+            logger.warning(
+                'Petición lenta %s %s: %.0f ms, %d consultas (%.0f ms), plantillas %.0f ms, PDF %.0f ms\n%s',
+                request.method, request.path, elapsed * 1000, len(stats.queries),
+                stats.timings['sql'] * 1000, stats.timings['template'] * 1000,
+                stats.timings['pdf'] * 1000,
+                '\n'.join(f'  [{seconds * 1000:.1f} ms] {" ".join(sql.split())}'
+                          for sql, seconds in stats.queries)
+            )
+
+        if stats.profiler is not None:
+            stats.profiler.disable()
+            os.makedirs(profile_dir, exist_ok=True)
+            path = os.path.join(profile_dir, f'{endpoint}-{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}.prof')
+            stats.profiler.dump_stats(path)
+            summary = io.StringIO()
+            pstats.Stats(stats.profiler, stream=summary).sort_stats('cumulative').print_stats(15)
+            logger.info('Perfil de %s guardado en %s\n%s', endpoint, path, summary.getvalue())
+        return response
+
+    @app.route('/metrics', endpoint='metrics')
+    def metrics_endpoint():
+        token = app.config['METRICS_TOKEN']
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            abort(403)
+        return Response(metrics.render(_invoice_cache_metrics(app)),
+                        mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,109 @@
+import random
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+# Lecturas en réplicas (DATABASE_REPLICA_URLS). Los SELECT de las peticiones
+# GET/HEAD, y de las vistas marcadas con @read_only, van a una réplica; todo
+# lo demás va al primario: escrituras, peticiones POST, la CLI y cualquier
+# lectura de una petición que ya escribió. Tras un commit, el navegador que
+# escribió sigue leyendo del primario DATABASE_REPLICA_STICKY_SECONDS
+# segundos, para que vea lo que acaba de guardar aunque la réplica vaya
+# con retraso (p. ej. la confirmación después del checkout).
+
+REPLICA_PREFIX = 'replica-'
+READ_METHODS = {'GET', 'HEAD'}
+
+
+def replica_binds(urls, engine_options):
+    """Binds de Flask-SQLAlchemy para las réplicas: {'replica-0': {...}, ...}."""
+    return {f'{REPLICA_PREFIX}{i}': {'url': url, **engine_options(url)}
+            for i, url in enumerate(urls)}
+
+
+def read_only(view):
+    """Marca una vista que no escribe: sus lecturas pueden ir a réplicas con cualquier método."""
+    view.read_only = True
+    return view
+
+
+def primary(view):
+    """Marca una vista GET que escribe: lee del primario para no escribir sobre datos atrasados."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with primary_reads():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def primary_reads():
+    """Dentro del bloque, la petición en curso lee del primario."""
+    if not has_request_context():
+        yield
+        return
+    previous = g.get('_db_primary', False)
+    g._db_primary = True
+    try:
+        yield
+    finally:
+        g._db_primary = previous
+
+
+def _replicas_allowed():
+    if not has_request_context() or g.get('_db_primary') or g.get('_db_wrote'):
+        return False
+    if session.get('_db_primary_until', 0) > time.time():
+        return False
+    view = current_app.view_functions.get(request.endpoint)
+    return request.method in READ_METHODS or getattr(view, 'read_only', False)
+
+
+class RoutingSession(Session):
+    """Sesión que reparte los SELECT entre el primario y las réplicas."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and clause is not None:
+            if getattr(clause, 'is_dml', False):
+                self._mark_write()
+            elif getattr(clause, 'is_select', False) and not self.info.get('wrote'):
+                replica = self._replica()
+                if replica is not None:
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _replica(self):
+        keys = current_app.config['DATABASE_REPLICA_BINDS']
+        if not keys or not _replicas_allowed():
+            return None
+        # Una réplica por sesión: dentro de una petición las lecturas son coherentes entre sí
+        key = self.info.get('replica')
+        if key is None:
+            key = self.info['replica'] = random.choice(keys)
+        return self._db.engines[key]
+
+    def _mark_write(self):
+        self.info['wrote'] = True
+        if has_request_context():
+            g._db_wrote = True
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _flushed(session, flush_context):
+    session._mark_write()
+
+
+def init_routing(app):
+    if not app.config['DATABASE_REPLICA_BINDS']:
+        return
+    sticky = app.config['DATABASE_REPLICA_STICKY_SECONDS']
+
+    @app.after_request
+    def stick_to_primary(response):
+        if g.get('_db_wrote'):
+            session['_db_primary_until'] = time.time() + sticky
+        return response
@@ -0,0 +1,189 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import click
+import sqlalchemy as sa
+from flask.cli import AppGroup
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app1 import db
+from cache import TTLCache
+from models import DailySales, Order, OrderItem, Product, Category, User
+
+# Rollup diario de ventas por producto y categoría. El checkout lo mantiene
+# al día dentro de su transacción y el panel de administración solo lee de
+# aquí, así su costo no crece con el historial de pedidos. Los totales de
+# productos, categorías, pedidos y usuarios son COUNT(*) cacheados unos
+# segundos (DASHBOARD_COUNTS_TTL): el checkout no escribe ningún contador
+# compartido, que serializaría los pedidos concurrentes sobre una misma fila.
+
+counter_cache = TTLCache(maxsize=1, ttl=60)
+
+sales_cli = AppGroup('sales', help='Rollups de ventas diarias.')
+
+_UPSERTS = {
+    'sqlite': sqlite_insert,
+    'postgresql': pg_insert,
+}
+
+
+def record_sales(day, lines):
+    """Suma al rollup de `day` las líneas de un pedido.
+
+    `lines` es una lista de tuplas (product_id, category_id, quantity, revenue).
+    """
+    table = DailySales.__table__
+    rows = [
+        {'day': day, 'product_id': product_id, 'category_id': category_id,
+         'quantity': quantity, 'revenue': revenue, 'orders': 1}
+        for product_id, category_id, quantity, revenue in lines
+    ]
+    if not rows:
+        return
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect in _UPSERTS:
+        stmt = _UPSERTS[dialect](table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.day, table.c.product_id],
+            set_={
+                'quantity': table.c.quantity + stmt.excluded.quantity,
+                'revenue': table.c.revenue + stmt.excluded.revenue,
+                'orders': table.c.orders + stmt.excluded.orders,
+            }
+        )
+        db.session.execute(stmt)
+    elif dialect == 'mysql':
+        stmt = mysql_insert(table).values(rows)
+        stmt = stmt.on_duplicate_key_update(
+            quantity=table.c.quantity + stmt.inserted.quantity,
+            revenue=table.c.revenue + stmt.inserted.revenue,
+            orders=table.c.orders + stmt.inserted.orders,
+        )
+        db.session.execute(stmt)
+    else:
+        for row in rows:
+            updated = db.session.execute(
+                table.update()
+                .where(table.c.day == row['day'], table.c.product_id == row['product_id'])
+                .values(quantity=table.c.quantity + row['quantity'],
+                        revenue=table.c.revenue + row['revenue'],
+                        orders=table.c.orders + 1)
+            ).rowcount
+            if not updated:
+                db.session.execute(table.insert().values(row))
+
+
+COUNTED_MODELS = {Product: 'products', Category: 'categories', Order: 'orders', User: 'users'}
+
+
+def init_counter_cache(app):
+    global counter_cache
+    counter_cache = TTLCache(maxsize=1, ttl=app.config["DASHBOARD_COUNTS_TTL"])
+
+
+def store_counters():
+    """{nombre: total} de los contadores del panel, en una consulta cada DASHBOARD_COUNTS_TTL segundos."""
+    counters = counter_cache.get('counters')
+    if counters is None:
+        count = lambda model: sa.select(sa.func.count()).select_from(model).scalar_subquery()
+        row = db.session.execute(sa.select(*(count(model).label(name)
+                                             for model, name in COUNTED_MODELS.items()))).one()
+        counters = dict(row._mapping)
+        counter_cache.set('counters', counters)
+    return counters
+
+
+def backfill_sales(since=None):
+    """Reconstruye el rollup desde Order/OrderItem (todo el historial o desde `since`)."""
+    table = DailySales.__table__
+    day = sa.func.date(Order.created_at)
+
+    delete = table.delete()
+    if since:
+        delete = delete.where(table.c.day >= since)
+    db.session.execute(delete)
+
+    source = (sa.select(day.label('day'),
+                        OrderItem.product_id,
+                        Product.category_id,
+                        sa.func.sum(OrderItem.quantity),
+                        sa.func.sum(OrderItem.quantity * OrderItem.price),
+                        sa.func.count(sa.distinct(Order.id)))
+              .join(Order, OrderItem.order_id == Order.id)
+              .join(Product, OrderItem.product_id == Product.id)
+              .group_by(day, OrderItem.product_id, Product.category_id))
+    if since:
+        source = source.where(Order.created_at >= datetime.combine(since, datetime.min.time()))
+
+    result = db.session.execute(table.insert().from_select(
+        ['day', 'product_id', 'category_id', 'quantity', 'revenue', 'orders'], source
+    ))
+    db.session.commit()
+    return result.rowcount
+
+
+def sales_summary(days=30, top=5):
+    """Cifras del panel: totales del periodo, más vendidos, categorías y serie diaria."""
+    today = datetime.utcnow().date()  # Order.created_at está en UTC
+    since = today - timedelta(days=days - 1)
+    in_range = DailySales.day >= since
+
+    totals = db.session.execute(
+        sa.select(sa.func.coalesce(sa.func.sum(DailySales.revenue), 0),
+                  sa.func.coalesce(sa.func.sum(DailySales.quantity), 0))
+        .where(in_range)
+    ).one()
+    today_revenue = db.session.execute(
+        sa.select(sa.func.coalesce(sa.func.sum(DailySales.revenue), 0))
+        .where(DailySales.day == today)
+    ).scalar()
+
+    best_sellers = db.session.execute(
+        sa.select(Product.name,
+                  sa.func.sum(DailySales.quantity).label('quantity'),
+                  sa.func.sum(DailySales.revenue).label('revenue'))
+        .join(Product, DailySales.product_id == Product.id)
+        .where(in_range)
+        .group_by(Product.id, Product.name)
+        .order_by(sa.desc('quantity'))
+        .limit(top)
+    ).all()
+
+    by_category = db.session.execute(
+        sa.select(Category.name,
+                  sa.func.sum(DailySales.quantity).label('quantity'),
+                  sa.func.sum(DailySales.revenue).label('revenue'))
+        .join(Category, DailySales.category_id == Category.id)
+        .where(in_range)
+        .group_by(Category.id, Category.name)
+        .order_by(sa.desc('revenue'))
+    ).all()
+
+    daily = db.session.execute(
+        sa.select(DailySales.day, sa.func.sum(DailySales.revenue).label('revenue'))
+        .where(in_range)
+        .group_by(DailySales.day)
+        .order_by(DailySales.day)
+    ).all()
+
+    return {
+        'days': days,
+        'revenue': Decimal(totals[0]),
+        'units': int(totals[1]),
+        'today_revenue': Decimal(today_revenue),
+        'best_sellers': best_sellers,
+        'by_category': by_category,
+        'daily': daily,
+    }
+
+
+@sales_cli.command('backfill')
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Reconstruir solo desde esta fecha (AAAA-MM-DD).')
+def backfill_command(since):
+    """Reconstruye el rollup de ventas diarias desde el historial."""
+    rows = backfill_sales(since.date() if since else None)
+    click.echo(f'Rollup de ventas reconstruido: {rows} filas.')
@@ -0,0 +1,219 @@
+import random
+import re
+import time
+from decimal import Decimal
+
+import click
+import sqlalchemy as sa
+from flask.cli import AppGroup
+from sqlalchemy import event
+from sqlalchemy.dialects.mysql import match as mysql_match
+from sqlalchemy.orm import Session
+
+from app1 import db
+from models import Category, Product
+
+# Búsqueda de texto completo sobre el catálogo, insensible a mayúsculas y
+# tildes ("eclair" encuentra "Éclair"):
+#   - SQLite: tabla virtual FTS5 `product_fts`, mantenida desde la sesión.
+#   - MySQL: índice FULLTEXT sobre (name, description); lo mantiene el motor.
+#   - PostgreSQL: índice GIN sobre to_tsvector(unaccent(...)); idem.
+# Otros motores caen al LIKE de siempre.
+
+FTS_TABLE = 'product_fts'
+# Índices creados por ensure_search_index (fuera de las migraciones)
+SEARCH_INDEXES = ('ix_product_fulltext', 'ix_product_search')
+
+_fts = sa.table(FTS_TABLE, sa.column('rowid'), sa.column('rank'))
+
+# Debe coincidir con la expresión del índice GIN para que PostgreSQL lo use
+_PG_DOCUMENT = "to_tsvector('simple', f_unaccent(coalesce(name, '') || ' ' || coalesce(description, '')))"
+
+search_cli = AppGroup('search', help='Índice de búsqueda de productos.')
+
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+
+def _pg_document():
+    text = sa.func.coalesce(Product.name, '') + ' ' + sa.func.coalesce(Product.description, '')
+    return sa.func.to_tsvector('simple', sa.func.f_unaccent(text))
+
+
+def _terms(search):
+    return re.findall(r'\w+', search.lower())
+
+
+def search_products(query, search):
+    """Filtra `query` (sobre Product) por `search` y la ordena por relevancia."""
+    terms = _terms(search)
+    if not terms:
+        return query.filter(sa.false())
+
+    dialect = _dialect()
+    if dialect == 'sqlite':
+        # Cada término como prefijo: "croiss" encuentra "Croissant"
+        match = ' '.join(f'"{t}"*' for t in terms)
+        # MATERIALIZED: el MATCH se evalúa una vez. Como subconsulta, en el
+        # COUNT de la paginación SQLite recorría product y repetía el MATCH
+        # por cada fila (minutos con 100.000 productos).
+        hits = (sa.select(_fts.c.rowid, _fts.c.rank)
+                .where(sa.text(f'{FTS_TABLE} MATCH :match').bindparams(match=match))
+                .cte('product_hits')
+                .prefix_with('MATERIALIZED'))
+        return query.join(hits, Product.id == hits.c.rowid).order_by(hits.c.rank)
+
+    if dialect == 'mysql':
+        relevance = mysql_match(Product.name, Product.description,
+                                against=' '.join(f'+{t}*' for t in terms)).in_boolean_mode()
+        return query.filter(relevance).order_by(relevance.desc())
+
+    if dialect == 'postgresql':
+        tsquery = sa.func.to_tsquery('simple', sa.func.f_unaccent(' & '.join(f'{t}:*' for t in terms)))
+        return (query.filter(_pg_document().op('@@')(tsquery))
+                .order_by(sa.func.ts_rank(_pg_document(), tsquery).desc()))
+
+    return _like_products(query, terms)
+
+
+def _like_products(query, terms):
+    like = sa.and_(*(Product.name.contains(t) | Product.description.contains(t) for t in terms))
+    return query.filter(like)
+
+
+def ensure_search_index(rebuild=False):
+    """Crea el índice de búsqueda del motor actual si no existe (o lo reconstruye)."""
+    dialect = _dialect()
+    if dialect == 'sqlite':
+        exists = db.session.execute(
+            sa.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': FTS_TABLE}
+        ).first()
+        if exists and not rebuild:
+            return
+        db.session.execute(sa.text(f'DROP TABLE IF EXISTS {FTS_TABLE}'))
+        db.session.execute(sa.text(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"name, description, tokenize = 'unicode61 remove_diacritics 2')"
+        ))
+        db.session.execute(sa.text(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, description) "
+            f"SELECT id, name, coalesce(description, '') FROM product"
+        ))
+    elif dialect == 'mysql':
+        exists = db.session.execute(sa.text(
+            "SELECT 1 FROM information_schema.statistics WHERE table_schema = DATABASE() "
+            "AND table_name = 'product' AND index_name = 'ix_product_fulltext'"
+        )).first()
+        if not exists:
+            db.session.execute(sa.text(
+                'CREATE FULLTEXT INDEX ix_product_fulltext ON product (name, description)'
+            ))
+    elif dialect == 'postgresql':
+        db.session.execute(sa.text('CREATE EXTENSION IF NOT EXISTS unaccent'))
+        # unaccent() no es IMMUTABLE; el envoltorio permite usarlo en un índice
+        db.session.execute(sa.text(
+            "CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text "
+            "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT "
+            "AS $$ SELECT public.unaccent('public.unaccent', $1) $$"
+        ))
+        if rebuild:
+            db.session.execute(sa.text('DROP INDEX IF EXISTS ix_product_search'))
+        db.session.execute(sa.text(
+            f'CREATE INDEX IF NOT EXISTS ix_product_search ON product USING gin ({_PG_DOCUMENT})'
+        ))
+    db.session.commit()
+
+
+@event.listens_for(Session, 'after_flush')
+def _sync_fts(session, flush_context):
+    """Mantiene `product_fts` al día dentro de la misma transacción (solo SQLite)."""
+    changed = [obj for obj in (*session.new, *session.dirty) if isinstance(obj, Product)]
+    deleted = [obj for obj in session.deleted if isinstance(obj, Product)]
+    if not changed and not deleted:
+        return
+
+    connection = session.connection()
+    if connection.dialect.name != 'sqlite':
+        return
+
+    delete = sa.text(f'DELETE FROM {FTS_TABLE} WHERE rowid = :id')
+    insert = sa.text(f'INSERT INTO {FTS_TABLE} (rowid, name, description) VALUES (:id, :name, :description)')
+    for product in (*changed, *deleted):
+        connection.execute(delete, {'id': product.id})
+    for product in changed:
+        connection.execute(insert, {'id': product.id, 'name': product.name,
+                                    'description': product.description or ''})
+
+
+@search_cli.command('reindex')
+def reindex_command():
+    """Reconstruye el índice de búsqueda desde la tabla de productos."""
+    ensure_search_index(rebuild=True)
+    click.echo(f'Índice de búsqueda reconstruido ({_dialect()}).')
+
+
+# Vocabulario de los productos sintéticos del benchmark
+_KINDS = ('Pan', 'Croissant', 'Pastel', 'Galletas', 'Tarta', 'Éclair', 'Baguette', 'Alfajores',
+          'Brioche', 'Rosca', 'Muffin', 'Empanada')
+_FLAVORS = ('chocolate', 'vainilla', 'fresa', 'almendra', 'integral', 'masa madre', 'canela',
+            'limón', 'arequipe', 'queso', 'zanahoria', 'avena', 'coco', 'nuez')
+_WORDS = ('artesanal', 'crujiente', 'esponjoso', 'horneado', 'mantequilla', 'relleno', 'tradicional',
+          'casero', 'dulce', 'salado', 'fresco', 'premium', 'harina', 'azúcar', 'huevos', 'semillas')
+
+
+@search_cli.command('benchmark')
+@click.option('--products', 'count', default=100000, show_default=True, help='Productos sintéticos.')
+@click.option('--query', 'queries', multiple=True,
+              help='Búsqueda a medir (se puede repetir). Por defecto, varias típicas.')
+@click.option('--limit', default=12, show_default=True, help='Resultados por búsqueda, como una página.')
+@click.option('--repeat', default=10, show_default=True, help='Mediciones por búsqueda.')
+def benchmark_command(count, queries, limit, repeat):
+    """Compara el índice de texto completo con LIKE sobre un catálogo sintético.
+
+    Los productos se insertan en una transacción que se deshace al terminar:
+    la base (y su índice) quedan como estaban.
+    """
+    category_id = db.session.execute(sa.select(Category.id).limit(1)).scalar()
+    if category_id is None:
+        raise click.ClickException('Hace falta al menos una categoría (`flask seed`).')
+    dialect = _dialect()
+    if dialect not in ('sqlite', 'mysql', 'postgresql'):
+        raise click.ClickException(f'{dialect} no tiene índice de texto completo: solo LIKE.')
+
+    rng = random.Random(0)
+    first_id = (db.session.execute(sa.select(sa.func.max(Product.id))).scalar() or 0) + 1
+    db.session.execute(Product.__table__.insert(), [
+        {'id': first_id + i,
+         'name': f'{rng.choice(_KINDS)} de {rng.choice(_FLAVORS)} {i}',
+         'description': ' '.join(rng.sample(_WORDS, 6)),
+         'price': Decimal(rng.randint(100, 5000)) / 100,
+         'featured': False, 'active': True, 'category_id': category_id}
+        for i in range(count)
+    ])
+    if dialect == 'sqlite':
+        # Core no pasa por _sync_fts: el índice de los sintéticos se llena aparte
+        db.session.execute(sa.text(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, description) "
+            f"SELECT id, name, coalesce(description, '') FROM product WHERE id >= :first"
+        ), {'first': first_id})
+
+    query = Product.query.filter_by(active=True)
+    try:
+        for search in queries or ('pan', 'chocolate', 'eclair almendra', 'croiss'):
+            results = {}
+            for name, run in (('texto completo', lambda: search_products(query, search)),
+                              ('LIKE', lambda: _like_products(query, _terms(search)))):
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    run().limit(limit).all()
+                    run().order_by(None).count()
+                    timings.append(time.perf_counter() - start)
+                timings.sort()
+                results[name] = (timings[len(timings) // 2] * 1000, run().order_by(None).count())
+            click.echo(f'"{search}": ' + ', '.join(
+                f'{name} {ms:.1f} ms ({hits} resultados)' for name, (ms, hits) in results.items()))
+    finally:
+        db.session.rollback()
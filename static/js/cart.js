@@ -1,5 +1,8 @@
 // Cart functionality and interactive features
 
+// Rutas del servidor (url_for en base.html); currentScript solo existe mientras se ejecuta el script
+const appUrls = document.currentScript ? document.currentScript.dataset : {};
+
 document.addEventListener('DOMContentLoaded', function() {
     // Initialize cart functionality
     initializeCart();
@@ -9,28 +12,145 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Initialize form validations
     initializeFormValidations();
+
+    // Inventario del día en las grillas de productos
+    initializeStockBadges();
 });
 
 function initializeCart() {
-    // Add to cart button animations
-    const addToCartButtons = document.querySelectorAll('form[action*="add_to_cart"] button[type="submit"]');
-    
-    addToCartButtons.forEach(button => {
-        button.addEventListener('click', function(e) {
-            // Add loading state
-            const originalText = this.innerHTML;
-            this.innerHTML = '<i class="fas fa-spinner fa-spin me-2"></i>Adding...';
-            this.disabled = true;
-            
-            // Reset button after a short delay (form will submit)
-            setTimeout(() => {
-                this.innerHTML = originalText;
-                this.disabled = false;
-            }, 2000);
+    // Agregar al carrito vía la API JSON, sin recargar la página.
+    // Si no hay JavaScript, el formulario sigue enviándose a la ruta normal.
+    document.querySelectorAll('form[data-cart-api]').forEach(form => {
+        if (form.closest('[data-cart-line]')) {
+            return;
+        }
+        form.addEventListener('submit', function(e) {
+            e.preventDefault();
+            const button = form.querySelector('button[type="submit"]');
+            const originalText = button.innerHTML;
+            button.innerHTML = '<i class="fas fa-spinner fa-spin me-2"></i>Agregando...';
+            button.disabled = true;
+
+            cartRequest(form.dataset.cartApi, 'POST', { quantity: quantityOf(form, 1) })
+                .then(data => showToast(`${data.line.name} agregado al carrito (${data.cart.count} artículos)`, 'success'))
+                .catch(error => showToast(error.message, 'danger'))
+                .finally(() => {
+                    button.innerHTML = originalText;
+                    button.disabled = false;
+                });
+        });
+    });
+
+    // Actualizar y quitar líneas en la página del carrito
+    document.querySelectorAll('[data-cart-line]').forEach(line => {
+        const form = line.querySelector('form[data-cart-api]');
+        const removeLink = line.querySelector('[data-cart-remove]');
+
+        if (form) {
+            form.addEventListener('submit', function(e) {
+                e.preventDefault();
+                cartRequest(form.dataset.cartApi, 'PUT', { quantity: quantityOf(form, 0) })
+                    .then(data => applyCartUpdate(line, data))
+                    .catch(error => showToast(error.message, 'danger'));
+            });
+        }
+
+        if (removeLink) {
+            removeLink.addEventListener('click', function(e) {
+                e.preventDefault();
+                cartRequest(removeLink.dataset.cartRemove, 'DELETE')
+                    .then(data => applyCartUpdate(line, data))
+                    .catch(error => showToast(error.message, 'danger'));
+            });
+        }
+    });
+}
+
+function quantityOf(form, fallback) {
+    const input = form.querySelector('input[name="quantity"]');
+    const value = input ? parseInt(input.value) : NaN;
+    return isNaN(value) ? fallback : value;
+}
+
+function cartRequest(url, method, body) {
+    const options = {
+        method: method,
+        headers: { 'Accept': 'application/json' },
+        credentials: 'same-origin'
+    };
+    if (body) {
+        options.headers['Content-Type'] = 'application/json';
+        options.body = JSON.stringify(body);
+    }
+    return fetch(url, options).then(response => {
+        if (response.status === 401 && appUrls.loginUrl) {
+            window.location.href = appUrls.loginUrl;
+        }
+        return response.json().then(data => {
+            if (!response.ok) {
+                throw new Error(data.error || 'No se pudo actualizar el carrito');
+            }
+            return data;
         });
     });
 }
 
+function applyCartUpdate(line, data) {
+    if (data.removed !== undefined) {
+        line.remove();
+        showToast('Producto eliminado del carrito', 'info');
+    } else if (data.line) {
+        const lineTotal = line.querySelector('[data-line-total]');
+        if (lineTotal) {
+            lineTotal.textContent = '$' + data.line.total;
+        }
+        showToast('Carrito actualizado', 'success');
+    }
+
+    if (data.cart.lines === 0) {
+        // Mostrar el estado de carrito vacío que arma el servidor
+        window.location.reload();
+        return;
+    }
+
+    const totals = { 'cart-subtotal': data.cart.subtotal, 'cart-tax': data.cart.tax, 'cart-total': data.cart.total };
+    Object.keys(totals).forEach(id => {
+        const element = document.getElementById(id);
+        if (element) {
+            element.textContent = '$' + totals[id];
+        }
+    });
+}
+
+function initializeStockBadges() {
+    // Las grillas llegan de la caché de fragmentos sin inventario: se pide aparte
+    const badges = document.querySelectorAll('[data-stock]');
+    if (!badges.length || !appUrls.stockUrl) {
+        return;
+    }
+    fetch(appUrls.stockUrl, { headers: { 'Accept': 'application/json' } })
+        .then(response => response.ok ? response.json() : {})
+        .then(levels => {
+            badges.forEach(badge => {
+                const remaining = levels[badge.dataset.stock];
+                if (remaining === undefined) {
+                    return;
+                }
+                const button = badge.closest('.card-body').querySelector('button[type="submit"]');
+                if (remaining > 0) {
+                    badge.textContent = `Quedan ${remaining} hoy`;
+                } else {
+                    badge.textContent = 'Agotado por hoy';
+                    badge.classList.replace('text-muted', 'text-danger');
+                    if (button) {
+                        button.disabled = true;
+                    }
+                }
+            });
+        })
+        .catch(() => {});
+}
+
 function initializeQuantityControls() {
     // Quantity input validation
     const quantityInputs = document.querySelectorAll('input[name="quantity"]');
@@ -168,10 +288,13 @@ function showToast(message, type = 'info') {
     const toast = document.createElement('div');
     toast.className = `alert alert-${type} alert-dismissible fade show position-fixed`;
     toast.style.cssText = 'top: 20px; right: 20px; z-index: 9999; min-width: 300px;';
-    toast.innerHTML = `
-        ${message}
-        <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
-    `;
+    // Texto plano: el mensaje puede traer nombres de producto o errores del servidor
+    toast.textContent = message;
+    const closeButton = document.createElement('button');
+    closeButton.type = 'button';
+    closeButton.className = 'btn-close';
+    closeButton.dataset.bsDismiss = 'alert';
+    toast.appendChild(closeButton);
     
     // Add to page
     document.body.appendChild(toast);
@@ -0,0 +1,194 @@
+import threading
+import time
+from datetime import date, datetime
+
+import click
+import sqlalchemy as sa
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app1 import db
+from cache import TTLCache
+from models import DailyStock, Product
+
+# Inventario diario por producto. El checkout descuenta con un UPDATE
+# condicional (sold = sold + n WHERE sold + n <= quantity): no hay lectura
+# previa ni SELECT ... FOR UPDATE, así que la fila de un producto muy pedido
+# solo queda bloqueada desde ese UPDATE hasta el commit, y nunca se vende
+# más de lo horneado. Los días van en UTC, como el rollup de ventas.
+
+stock_cache = TTLCache(maxsize=8, ttl=5)
+
+_UPSERTS = {
+    'sqlite': sqlite_insert,
+    'postgresql': pg_insert,
+}
+
+stock_cli = AppGroup('stock', help='Inventario diario.')
+
+
+class OutOfStock(Exception):
+    """No queda inventario del día suficiente para una línea del pedido."""
+
+    def __init__(self, product_id, requested, remaining):
+        super().__init__(f'Producto {product_id}: pedidos {requested}, quedan {remaining}')
+        self.product_id = product_id
+        self.requested = requested
+        self.remaining = remaining
+
+
+def init_stock_cache(app):
+    global stock_cache
+    stock_cache = TTLCache(maxsize=8, ttl=app.config["STOCK_CACHE_TTL"])
+
+
+def today():
+    return datetime.utcnow().date()
+
+
+def reserve_stock(quantities, day=None):
+    """Descuenta `quantities` ({product_id: cantidad}) del inventario del día.
+
+    Va dentro de la transacción del pedido y conviene llamarla justo antes
+    del commit. Lanza OutOfStock si alguna línea no alcanza; quien llama
+    debe hacer rollback. Los productos sin inventario del día no se tocan.
+    """
+    day = day or today()
+    table = DailyStock.__table__
+    missed = []
+    # Siempre en el mismo orden: dos pedidos con los mismos productos no se bloquean en cruz
+    for product_id in sorted(quantities):
+        quantity = quantities[product_id]
+        updated = db.session.execute(
+            table.update()
+            .where(table.c.day == day, table.c.product_id == product_id,
+                   table.c.sold + quantity <= table.c.quantity)
+            .values(sold=table.c.sold + quantity)
+        ).rowcount
+        if not updated:
+            missed.append(product_id)
+    if not missed:
+        return
+    # Una sola lectura para las líneas que no se descontaron: ¿agotadas o sin inventario ese día?
+    rows = {row.product_id: row for row in db.session.execute(
+        sa.select(table.c.product_id, table.c.quantity, table.c.sold)
+        .where(table.c.day == day, table.c.product_id.in_(missed))
+    )}
+    for product_id in missed:
+        row = rows.get(product_id)
+        if row is not None:
+            raise OutOfStock(product_id, quantities[product_id], max(row.quantity - row.sold, 0))
+
+
+def restock(quantities, day=None):
+    """Suma unidades horneadas al inventario del día ({product_id: unidades})."""
+    day = day or today()
+    table = DailyStock.__table__
+    rows = [{'day': day, 'product_id': product_id, 'quantity': quantity, 'sold': 0}
+            for product_id, quantity in quantities.items() if quantity > 0]
+    if not rows:
+        return
+
+    # Upsert: dos reposiciones a la vez de un producto sin fila no chocan en el INSERT
+    dialect = db.session.get_bind().dialect.name
+    if dialect in _UPSERTS:
+        stmt = _UPSERTS[dialect](table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.day, table.c.product_id],
+            set_={'quantity': table.c.quantity + stmt.excluded.quantity}
+        )
+        db.session.execute(stmt)
+    elif dialect == 'mysql':
+        stmt = mysql_insert(table).values(rows)
+        stmt = stmt.on_duplicate_key_update(quantity=table.c.quantity + stmt.inserted.quantity)
+        db.session.execute(stmt)
+    else:
+        for row in rows:
+            updated = db.session.execute(
+                table.update()
+                .where(table.c.day == day, table.c.product_id == row['product_id'])
+                .values(quantity=table.c.quantity + row['quantity'])
+            ).rowcount
+            if not updated:
+                db.session.execute(table.insert().values(row))
+    invalidate_stock()
+
+
+def stock_levels(day=None):
+    """{product_id: unidades que quedan} de los productos con inventario del día, cacheado."""
+    day = day or today()
+    key = f'levels:{day.isoformat()}'
+    levels = stock_cache.get(key)
+    if levels is None:
+        table = DailyStock.__table__
+        levels = {product_id: max(quantity - sold, 0) for product_id, quantity, sold in
+                  db.session.execute(sa.select(table.c.product_id, table.c.quantity, table.c.sold)
+                                     .where(table.c.day == day))}
+        stock_cache.set(key, levels)
+    return levels
+
+
+def invalidate_stock():
+    stock_cache.clear()
+
+
+@stock_cli.command('benchmark')
+@click.option('--workers', default=16, show_default=True, help='Hilos comprando a la vez.')
+@click.option('--attempts', default=400, show_default=True, help='Compras intentadas en total.')
+@click.option('--stock', 'quantity', default=250, show_default=True, help='Unidades horneadas.')
+@click.option('--product-id', type=int, help='Producto a usar (por defecto, el primero activo).')
+def benchmark_command(workers, attempts, quantity, product_id):
+    """Muchos hilos compran a la vez un mismo producto; comprueba que no se venda de más."""
+    # Un día que no es real, para no tocar el inventario de hoy
+    day = date(2000, 1, 1)
+    app = current_app._get_current_object()
+    product_id = product_id or db.session.execute(
+        sa.select(Product.id).where(Product.active.is_(True)).order_by(Product.id).limit(1)
+    ).scalar_one()
+    DailyStock.query.filter_by(day=day).delete()
+    restock({product_id: quantity}, day=day)
+    db.session.commit()
+
+    results = {'sold': 0, 'sold_out': 0, 'errors': 0}
+    lock = threading.Lock()
+    counter = iter(range(attempts))
+
+    def buyer():
+        with app.app_context():
+            while True:
+                with lock:
+                    if next(counter, None) is None:
+                        return
+                try:
+                    reserve_stock({product_id: 1}, day=day)
+                    db.session.commit()
+                    outcome = 'sold'
+                except OutOfStock:
+                    db.session.rollback()
+                    outcome = 'sold_out'
+                except sa.exc.OperationalError:
+                    # p. ej. "database is locked" en SQLite con muchos escritores
+                    db.session.rollback()
+                    outcome = 'errors'
+                with lock:
+                    results[outcome] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=buyer) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    row = DailyStock.query.filter_by(day=day, product_id=product_id).one()
+    DailyStock.query.filter_by(day=day).delete()
+    db.session.commit()
+    click.echo(f'{attempts} intentos con {workers} hilos en {elapsed:.2f} s '
+               f'({attempts / elapsed:.0f}/s): {results["sold"]} vendidos, '
+               f'{results["sold_out"]} agotados, {results["errors"]} errores.')
+    click.echo(f'Inventario final: {row.sold}/{row.quantity} vendidos'
+               + (' (sobreventa!)' if row.sold > row.quantity else ', sin sobreventa.'))
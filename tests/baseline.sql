@@ -0,0 +1,92 @@
+-- Base de datos tal como la dejaba la versión anterior a las migraciones
+-- (db.create_all() y la siembra de create_app), volcada con sqlite3 .dump
+BEGIN TRANSACTION;
+CREATE TABLE cart_item (
+	id INTEGER NOT NULL, 
+	quantity INTEGER NOT NULL, 
+	created_at DATETIME, 
+	user_id INTEGER NOT NULL, 
+	product_id INTEGER NOT NULL, 
+	PRIMARY KEY (id), 
+	FOREIGN KEY(user_id) REFERENCES user (id), 
+	FOREIGN KEY(product_id) REFERENCES product (id)
+);
+CREATE TABLE category (
+	id INTEGER NOT NULL, 
+	name VARCHAR(80) NOT NULL, 
+	description TEXT, 
+	created_at DATETIME, 
+	PRIMARY KEY (id), 
+	UNIQUE (name)
+);
+INSERT INTO "category" VALUES(1,'Pan','Pan fresco recién horneado','2026-10-17 12:08:35.569159');
+INSERT INTO "category" VALUES(2,'Pasteles','Deliciosos pasteles para toda ocasión','2026-10-17 12:08:35.569164');
+INSERT INTO "category" VALUES(3,'Pastelería','Dulces y salados artesanales','2026-10-17 12:08:35.569167');
+INSERT INTO "category" VALUES(4,'Galletas','Galletas caseras tradicionales','2026-10-17 12:08:35.569168');
+CREATE TABLE invoice (
+	id INTEGER NOT NULL, 
+	invoice_number VARCHAR(50) NOT NULL, 
+	order_id INTEGER NOT NULL, 
+	pdf_file_path VARCHAR(256), 
+	created_at DATETIME NOT NULL, 
+	PRIMARY KEY (id), 
+	UNIQUE (invoice_number), 
+	FOREIGN KEY(order_id) REFERENCES "order" (id)
+);
+CREATE TABLE "order" (
+	id INTEGER NOT NULL, 
+	total_amount NUMERIC(10, 2) NOT NULL, 
+	status VARCHAR(20), 
+	created_at DATETIME, 
+	user_id INTEGER NOT NULL, 
+	PRIMARY KEY (id), 
+	FOREIGN KEY(user_id) REFERENCES user (id)
+);
+CREATE TABLE order_item (
+	id INTEGER NOT NULL, 
+	quantity INTEGER NOT NULL, 
+	price NUMERIC(10, 2) NOT NULL, 
+	order_id INTEGER NOT NULL, 
+	product_id INTEGER NOT NULL, 
+	PRIMARY KEY (id), 
+	FOREIGN KEY(order_id) REFERENCES "order" (id), 
+	FOREIGN KEY(product_id) REFERENCES product (id)
+);
+CREATE TABLE product (
+	id INTEGER NOT NULL, 
+	name VARCHAR(100) NOT NULL, 
+	description TEXT, 
+	price NUMERIC(10, 2) NOT NULL, 
+	image_url VARCHAR(200), 
+	featured BOOLEAN, 
+	active BOOLEAN, 
+	created_at DATETIME, 
+	category_id INTEGER NOT NULL, 
+	PRIMARY KEY (id), 
+	FOREIGN KEY(category_id) REFERENCES category (id)
+);
+INSERT INTO "product" VALUES(1,'Pan de Masa Madre','Pan artesanal tradicional con corteza crujiente y miga esponjosa',5.99,NULL,1,1,'2026-10-17 12:08:35.573834',1);
+INSERT INTO "product" VALUES(2,'Croissant de Chocolate','Hojaldrado mantecoso relleno de chocolate belga',3.5,NULL,1,1,'2026-10-17 12:08:35.573838',3);
+INSERT INTO "product" VALUES(3,'Pastel de Vainilla','Clásico pastel de vainilla con crema de mantequilla',25,NULL,1,1,'2026-10-17 12:08:35.573839',2);
+INSERT INTO "product" VALUES(4,'Galletas Chispas Chocolate','Galletas recién horneadas con chispas de chocolate premium',2.99,NULL,0,1,'2026-10-17 12:08:35.573839',4);
+INSERT INTO "product" VALUES(5,'Pan Integral','Pan saludable de trigo integral con semillas',4.99,NULL,0,1,'2026-10-17 12:08:35.573840',1);
+INSERT INTO "product" VALUES(6,'Tarta de Fresa','Fresas frescas sobre crema pastelera de vainilla',4.75,NULL,1,1,'2026-10-17 12:08:35.573840',3);
+INSERT INTO "product" VALUES(7,'Pastel Red Velvet','Delicioso pastel red velvet con frosting de queso crema',28,NULL,0,1,'2026-10-17 12:08:35.573841',2);
+INSERT INTO "product" VALUES(8,'Galletas de Avena','Galletas saludables de avena con pasas',2.75,NULL,0,1,'2026-10-17 12:08:35.573841',4);
+INSERT INTO "product" VALUES(9,'Baguette Francesa','Auténtica baguette crujiente estilo francés',3.25,NULL,0,1,'2026-10-17 12:08:35.573842',1);
+INSERT INTO "product" VALUES(10,'Éclair de Chocolate','Hojaldre relleno de crema y cubierto de chocolate',4.5,NULL,0,1,'2026-10-17 12:08:35.573842',3);
+INSERT INTO "product" VALUES(11,'Pastel de Zanahoria','Húmedo pastel de zanahoria con frosting de queso',26,NULL,1,1,'2026-10-17 12:08:35.573843',2);
+INSERT INTO "product" VALUES(12,'Alfajores','Deliciosos alfajores rellenos de dulce de leche',3.99,NULL,1,1,'2026-10-17 12:08:35.573843',4);
+CREATE TABLE user (
+	id INTEGER NOT NULL, 
+	username VARCHAR(64) NOT NULL, 
+	email VARCHAR(120) NOT NULL, 
+	password_hash VARCHAR(256) NOT NULL, 
+	is_admin BOOLEAN, 
+	created_at DATETIME, 
+	PRIMARY KEY (id), 
+	UNIQUE (username), 
+	UNIQUE (email)
+);
+INSERT INTO "user" VALUES(1,'admin','admin@bakery.com','scrypt:32768:8:1$OU84S5JltTGCkBl0$b0ba914d0c318599d2039b0b2b2cfc30fff3277fa854c07e072be289905c521c287de3a969c66b21140e55fa6464e754fb8d6609662f26a2f7676144d9996ba3',1,'2026-10-17 12:08:35.562036');
+COMMIT;
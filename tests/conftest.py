@@ -0,0 +1,102 @@
+import os
+
+import pytest
+from sqlalchemy import event
+
+from app1 import create_app, db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def configure_env(monkeypatch, tmp_path, **overrides):
+    """Variables de entorno de una app de prueba con su propia base SQLite en `tmp_path`."""
+    env = {
+        'DATABASE_URL': f'sqlite:///{tmp_path / "bakery.db"}',
+        'LOG_LEVEL': 'WARNING',
+        'INVOICE_QUEUE_SYNC': '1',
+        'INVOICE_STORAGE_PATH': str(tmp_path / 'invoices'),
+        'INVOICE_CACHE_DIR': str(tmp_path / 'invoice-cache'),
+        # Hash barato: las pruebas no miden el coste del login
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+    }
+    env.update(overrides)
+    for key, value in env.items():
+        monkeypatch.setenv(key, value)
+    # Flask-Migrate busca migrations/ en el directorio actual
+    monkeypatch.chdir(ROOT)
+
+
+def make_app():
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    return app
+
+
+def bootstrapped_app(monkeypatch, tmp_path, **overrides):
+    """App de prueba con el esquema migrado y los datos iniciales, como tras `flask bootstrap`."""
+    from bootstrap import migrate_schema, seed_data
+    from search import ensure_search_index
+
+    configure_env(monkeypatch, tmp_path, **overrides)
+    app = make_app()
+    with app.app_context():
+        migrate_schema()
+        ensure_search_index()
+        seed_data()
+    return app
+
+
+def dispose(app):
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    app = bootstrapped_app(monkeypatch, tmp_path)
+    yield app
+    dispose(app)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def login(client, email='admin@bakery.com', password='admin123'):
+    return client.post('/auth/login', data={'email': email, 'password': password})
+
+
+class StatementLog:
+    """Sentencias SQL ejecutadas mientras está activo el registro."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __len__(self):
+        return len(self.statements)
+
+    def clear(self):
+        self.statements.clear()
+
+    def matching(self, text):
+        return [sql for sql, _ in self.statements if text in sql]
+
+
+@pytest.fixture
+def statements(app):
+    """Cuenta las sentencias de todos los engines de la app (primario y réplicas)."""
+    log = StatementLog()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        log.statements.append((statement, parameters))
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', record)
+    yield log
+    for engine in engines:
+        event.remove(engine, 'before_cursor_execute', record)
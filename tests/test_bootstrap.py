@@ -0,0 +1,68 @@
+import os
+import sqlite3
+
+import pytest
+import sqlalchemy as sa
+
+from app1 import db
+from models import Invoice, Order
+from tests.conftest import configure_env, dispose, login, make_app
+
+BASELINE_DUMP = os.path.join(os.path.dirname(__file__), 'baseline.sql')
+
+
+@pytest.fixture
+def baseline_app(monkeypatch, tmp_path):
+    """App sobre una base creada por la versión anterior a las migraciones."""
+    configure_env(monkeypatch, tmp_path)
+    with sqlite3.connect(tmp_path / 'bakery.db') as conn, open(BASELINE_DUMP) as dump:
+        conn.executescript(dump.read())
+    app = make_app()
+    yield app
+    dispose(app)
+
+
+def test_bootstrap_upgrades_baseline_database(baseline_app):
+    result = baseline_app.test_cli_runner().invoke(args=['bootstrap'])
+    assert result.exit_code == 0, result.output
+
+    with baseline_app.app_context():
+        inspector = sa.inspect(db.engine)
+        assert 'idempotency_key' in {c['name'] for c in inspector.get_columns('order')}
+        assert 'layout_version' in {c['name'] for c in inspector.get_columns('invoice')}
+        assert inspector.has_table('daily_sales')
+
+    client = baseline_app.test_client()
+    assert login(client).status_code == 302
+    client.post('/cart/add/1', data={'quantity': 2})
+    response = client.post('/cart/checkout')
+    assert response.status_code == 302
+    assert '/cart/confirmation/' in response.headers['Location']
+
+    with baseline_app.app_context():
+        order = Order.query.one()
+        assert order.idempotency_key
+        assert Invoice.query.filter_by(order_id=order.id).count() == 1
+    assert client.get('/admin/').status_code == 200
+
+
+def test_bootstrap_refuses_to_stamp_other_schemas(baseline_app, tmp_path):
+    with sqlite3.connect(tmp_path / 'bakery.db') as conn:
+        conn.execute('ALTER TABLE "order" ADD COLUMN idempotency_key VARCHAR(64)')
+
+    result = baseline_app.test_cli_runner().invoke(args=['bootstrap'])
+    assert result.exit_code != 0
+    assert 'columna de más: order.idempotency_key' in result.output
+    with baseline_app.app_context():
+        assert not sa.inspect(db.engine).has_table('alembic_version')
+
+
+def test_bootstrap_benchmark_uses_a_scratch_database(app):
+    with app.app_context():
+        url = str(db.engine.url)
+    result = app.test_cli_runner().invoke(args=['bootstrap-benchmark', '--repeat', '1'])
+    assert result.exit_code == 0, result.output
+    for step in ('create_app', 'migrate_schema', 'ensure_search_index', 'seed_data'):
+        assert f'{step}: ' in result.output
+    assert 'base ya preparada' in result.output
+    assert os.environ['DATABASE_URL'] == url
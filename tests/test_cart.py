@@ -0,0 +1,84 @@
+from app1 import db
+from models import CartItem, Order, Product
+from tests.conftest import login
+
+
+def cart_writes(statements):
+    return [sql for sql in statements.statements
+            if sql[0].lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE')) and 'cart_item' in sql[0]]
+
+
+def saved_cart(app):
+    with app.app_context():
+        return {item.product_id: item.quantity for item in CartItem.query.filter_by(user_id=1)}
+
+
+def test_session_cart_does_not_write(app):
+    result = app.test_cli_runner().invoke(args=['cart', 'benchmark', '--interactions', '40'])
+    assert result.exit_code == 0, result.output
+    lines = dict(line.split(': ', 1) for line in result.output.splitlines() if ': ' in line)
+    assert lines['session'].startswith('0 escrituras')
+    assert lines['db'].startswith('750 escrituras')
+
+
+def test_login_merges_the_anonymous_cart_in_one_write(app, client, statements):
+    with app.app_context():
+        db.session.add(CartItem(user_id=1, product_id=1, quantity=3))
+        db.session.get(Product, 3).active = False
+        db.session.commit()
+    client.post('/cart/add/1', data={'quantity': 2})
+    client.post('/cart/add/2', data={'quantity': 1})
+    client.post('/cart/add/3', data={'quantity': 1})  # desactivado: no se guarda
+
+    statements.clear()
+    login(client)
+    # Una sola reescritura de las filas del usuario: un DELETE y un INSERT por línea
+    writes = cart_writes(statements)
+    assert [sql for sql, _ in writes if sql.startswith('DELETE')] == ['DELETE FROM cart_item WHERE cart_item.user_id = ?']
+    assert len(writes) == 1 + 2
+    assert saved_cart(app) == {1: 5, 2: 1}
+    with client.session_transaction() as session:
+        assert session['cart']['items'] == {'1': 5, '2': 1}
+
+
+def test_login_with_an_empty_cart_does_not_write(app, client, statements):
+    login(client)
+    assert cart_writes(statements) == []
+
+
+def test_logout_writes_only_a_changed_cart(app, client, statements):
+    login(client)
+    statements.clear()
+    client.get('/auth/logout')
+    assert cart_writes(statements) == []
+
+    login(client)
+    client.post('/cart/add/2', data={'quantity': 4})
+    statements.clear()
+    client.get('/auth/logout')
+    assert cart_writes(statements)
+    assert saved_cart(app) == {2: 4}
+
+
+def test_double_submit_reuses_the_cart_token(app, client):
+    login(client)
+    client.post('/cart/add/1', data={'quantity': 2})
+    client.post('/cart/add/2', data={'quantity': 1})
+    with client.session_transaction() as session:
+        before = dict(session)
+
+    first = client.post('/cart/checkout')
+    # El segundo envío llega con la cookie de antes del primero, como un doble clic
+    with client.session_transaction() as session:
+        session.clear()
+        session.update(before)
+    second = client.post('/cart/checkout')
+
+    assert first.headers['Location'] == second.headers['Location']
+    assert '/cart/confirmation/' in second.headers['Location']
+    with app.app_context():
+        order = Order.query.one()
+        assert order.idempotency_key == before['cart']['token']
+        assert len(order.order_items) == 2
+        assert CartItem.query.count() == 0
+
@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+from models import Invoice, Order
+from tests.conftest import bootstrapped_app, dispose, login
+
+THREADS = 8
+
+
+@pytest.fixture(params=['session', 'db'])
+def cart_app(request, monkeypatch, tmp_path):
+    app = bootstrapped_app(monkeypatch, tmp_path, CART_BACKEND=request.param)
+    yield app
+    dispose(app)
+
+
+def parallel_checkouts(app, cookie, data):
+    """Envía el mismo formulario de pago desde THREADS clientes a la vez."""
+    barrier = threading.Barrier(THREADS)
+    locations = []
+    errors = []
+
+    def submit():
+        client = app.test_client()
+        client.set_cookie('session', cookie)
+        barrier.wait()
+        try:
+            locations.append(client.post('/cart/checkout', data=data).headers.get('Location'))
+        except Exception as exc:  # que el hilo no se trague el error
+            errors.append(exc)
+
+    threads = [threading.Thread(target=submit) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return locations, errors
+
+
+def test_parallel_checkouts_with_one_key_create_one_order(cart_app):
+    client = cart_app.test_client()
+    login(client)
+    client.post('/cart/add/1', data={'quantity': 2})
+    client.post('/cart/add/3', data={'quantity': 1})
+    cookie = client.get_cookie('session').value
+
+    locations, errors = parallel_checkouts(cart_app, cookie, {'idempotency_key': 'doble-envio'})
+
+    assert errors == []
+    with cart_app.app_context():
+        order = Order.query.one()
+        # Todos los envíos acaban en la confirmación del mismo pedido
+        assert locations == [f'/cart/confirmation/{order.id}'] * THREADS
+        assert Invoice.query.filter_by(order_id=order.id).count() == 1
+        assert Invoice.query.count() == 1
+        assert len(order.order_items) == 2
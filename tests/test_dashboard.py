@@ -0,0 +1,58 @@
+import sqlalchemy as sa
+
+from app1 import db
+from models import Category, Order, Product, User
+import sales
+from sales import store_counters
+from tests.conftest import login
+
+
+def actual_counts():
+    count = lambda model: db.session.execute(sa.select(sa.func.count()).select_from(model)).scalar()
+    return {'products': count(Product), 'categories': count(Category),
+            'orders': count(Order), 'users': count(User)}
+
+
+def test_counters_follow_writes(app, client):
+    login(client)
+    client.post('/cart/add/1', data={'quantity': 1})
+    client.post('/cart/checkout')
+    app.test_client().post('/auth/register', data={'username': 'anita', 'email': 'ana@example.com',
+                                                  'password': 'secreto123', 'password2': 'secreto123'})
+    client.post('/admin/categories/add', data={'name': 'Temporada', 'description': ''})
+    client.get('/admin/products/delete/12')
+
+    with app.app_context():
+        sales.counter_cache.clear()  # como si venciera DASHBOARD_COUNTS_TTL
+        assert store_counters() == actual_counts()
+        assert store_counters()['orders'] == 1
+        assert store_counters()['users'] == 2
+
+
+def test_dashboard_counts_once_per_ttl(app, client, statements):
+    login(client)
+    statements.clear()
+    client.get('/admin/')
+    assert len(statements.matching('count(*)')) == 1
+
+    statements.clear()
+    client.get('/admin/')
+    assert not statements.matching('count(*)')
+
+
+def test_dashboard_cost_does_not_grow_with_orders(app, client, statements):
+    login(client)
+    client.post('/cart/add/1', data={'quantity': 1})
+    client.post('/cart/checkout')
+    client.get('/admin/')  # llena la caché de categorías y de totales
+    statements.clear()
+    client.get('/admin/')
+    baseline = len(statements)
+
+    for _ in range(5):
+        client.post('/cart/add/2', data={'quantity': 1})
+        client.post('/cart/checkout')
+    statements.clear()
+    client.get('/admin/')
+    assert len(statements) == baseline
+    assert not statements.matching('count(*)')
@@ -0,0 +1,75 @@
+import csv
+import io
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from app1 import db
+from exports import EXPORT_COLUMNS, export_rows, iter_csv, iter_parquet
+from models import Order, OrderItem
+
+
+@pytest.fixture
+def orders(app):
+    """Dos pedidos: uno de enero con dos líneas (Pan y Pastelería) y uno de febrero (Pasteles)."""
+    with app.app_context():
+        db.session.add_all([
+            Order(user_id=1, total_amount=Decimal('15.48'), status='pending',
+                  created_at=datetime(2026, 1, 10, 23, 30),
+                  order_items=[OrderItem(product_id=1, quantity=2, price=Decimal('5.99')),
+                               OrderItem(product_id=2, quantity=1, price=Decimal('3.50'))]),
+            Order(user_id=1, total_amount=Decimal('75.00'), status='completed',
+                  created_at=datetime(2026, 2, 20, 8, 0),
+                  order_items=[OrderItem(product_id=3, quantity=3, price=Decimal('25.00'))]),
+        ])
+        db.session.commit()
+    return app
+
+
+def export_csv(app, batch_size=1, **filters):
+    with app.app_context():
+        data = b''.join(iter_csv(export_rows(batch_size=batch_size, **filters), batch_size=batch_size))
+    return list(csv.reader(io.StringIO(data.decode('utf-8'))))
+
+
+def test_export_benchmark_leaves_the_database_untouched(app):
+    result = app.test_cli_runner().invoke(args=['orders', 'export-benchmark', '--items', '250'])
+    assert result.exit_code == 0, result.output
+    assert 'streaming:' in result.output and 'pico de memoria' in result.output
+    with app.app_context():
+        assert db.session.query(Order).count() == 0
+        assert db.session.query(OrderItem).count() == 0
+
+
+def test_csv_has_a_header_and_one_row_per_order_line(orders):
+    header, *rows = export_csv(orders)
+    assert header == EXPORT_COLUMNS
+    assert rows == [
+        ['1', '2026-01-10 23:30:00', 'pending', 'admin', '1', 'Pan de Masa Madre', 'Pan', '2', '5.99', '11.98'],
+        ['1', '2026-01-10 23:30:00', 'pending', 'admin', '2', 'Croissant de Chocolate', 'Pastelería', '1', '3.50', '3.50'],
+        ['2', '2026-02-20 08:00:00', 'completed', 'admin', '3', 'Pastel de Vainilla', 'Pasteles', '3', '25.00', '75.00'],
+    ]
+
+
+@pytest.mark.parametrize('filters, expected', [
+    ({'start': date(2026, 1, 11)}, ['3']),
+    ({'end': date(2026, 1, 10)}, ['1', '2']),
+    ({'start': date(2026, 1, 10), 'end': date(2026, 2, 20)}, ['1', '2', '3']),
+    ({'status': 'completed'}, ['3']),
+    ({'category_id': 3}, ['2']),
+    ({'status': 'pending', 'category_id': 2}, []),
+])
+def test_filters_exclude_rows(orders, filters, expected):
+    header, *rows = export_csv(orders, **filters)
+    assert header == EXPORT_COLUMNS
+    assert [row[EXPORT_COLUMNS.index('product_id')] for row in rows] == expected
+
+
+def test_parquet_matches_the_csv(orders):
+    pq = pytest.importorskip('pyarrow.parquet')
+    with orders.app_context():
+        data = b''.join(iter_parquet(export_rows(), batch_size=2))
+    table = pq.read_table(io.BytesIO(data))
+    assert table.column_names == EXPORT_COLUMNS
+    assert table.column('line_total').to_pylist() == [Decimal('11.98'), Decimal('3.50'), Decimal('75.00')]
@@ -0,0 +1,63 @@
+import pytest
+
+from app1 import db
+from models import User
+from tests.conftest import login
+
+STOREFRONT = ['/', '/products/', '/products/category/1', '/cart/', '/orders', '/admin/']
+
+
+def user_queries(statements):
+    # El COUNT(*) de los totales del panel no carga ningún usuario
+    return [sql for sql in statements.matching('FROM user') if 'count(*)' not in sql]
+
+
+@pytest.mark.parametrize('url', STOREFRONT)
+def test_authenticated_request_does_not_load_the_user(client, statements, url):
+    login(client)
+    statements.clear()
+    assert client.get(url).status_code == 200
+    assert user_queries(statements) == []
+
+
+def update_admin(app, **changes):
+    # Como lo haría otra petición o un script: otra sesión, con commit
+    with app.app_context():
+        user = User.query.filter_by(email='admin@bakery.com').one()
+        for name, value in changes.items():
+            setattr(user, name, value)
+        db.session.commit()
+
+
+def test_profile_change_invalidates_the_cached_user(app, client, statements):
+    login(client)
+    assert 'admin' in client.get('/').get_data(as_text=True)
+
+    update_admin(app, username='panadero', is_admin=False)
+    statements.clear()
+    page = client.get('/').get_data(as_text=True)
+    assert len(user_queries(statements)) == 1
+    assert 'panadero' in page
+    # Ya no es administrador: el panel lo rechaza
+    assert client.get('/admin/').status_code != 200
+
+    statements.clear()
+    client.get('/')
+    assert user_queries(statements) == []
+
+
+def test_password_change_invalidates_the_cached_user(app, client, statements):
+    login(client)
+    client.get('/')
+    with app.app_context():
+        user = User.query.filter_by(email='admin@bakery.com').one()
+        user.set_password('nueva-clave')
+        db.session.commit()
+
+    statements.clear()
+    client.get('/')
+    assert len(user_queries(statements)) == 1
+
+    # La clave vieja ya no entra; la nueva sí
+    assert login(app.test_client(), password='admin123').status_code == 200
+    assert login(app.test_client(), password='nueva-clave').status_code == 302
@@ -0,0 +1,80 @@
+import re
+
+import pytest
+from sqlalchemy import text
+
+from app1 import db
+from tests.conftest import login
+
+# Tablas que se leen enteras a propósito: son pequeñas y de tamaño fijo
+FULL_SCAN_OK = {'category', 'alembic_version',
+                # Resultado ya materializado del MATCH de la búsqueda (ver search.py)
+                'product_hits'}
+
+# COUNT(*) sin filtro de los totales del panel: van cacheados (sales.store_counters)
+COUNT_ONLY = re.compile(r'SELECT (\(SELECT count\(\*\) AS count_\d+ \nFROM \S+\) AS \w+(, )?)+')
+
+ENDPOINTS = [
+    '/',
+    '/products/',
+    '/products/?sort=precio',
+    '/products/?category=1',
+    '/products/category/1',
+    '/products/?search=pan',
+    '/products/stock',
+    '/cart/',
+    '/orders',
+    '/cart/confirmation/1',
+    '/admin/',
+    '/admin/products',
+    '/admin/stock',
+]
+
+
+def full_scans(app, statements):
+    """Consultas que recorren una tabla entera, según EXPLAIN QUERY PLAN de SQLite.
+
+    Cuenta como recorrido completo un SCAN sin índice, y un SCAN por un
+    índice que no acota el LIMIT o que además ordena en una tabla temporal
+    (se lee todo para ordenar). Los SEARCH usan el índice para filtrar.
+    """
+    scans = []
+    with app.app_context(), db.engine.connect() as conn:
+        # Copia: los EXPLAIN también pasan por el registro
+        for sql, params in list(statements.statements):
+            if not sql.lstrip().upper().startswith('SELECT') or COUNT_ONLY.fullmatch(sql.strip()):
+                continue
+            plan = [row[-1] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql, params)]
+            sorts = any(step.startswith('USE TEMP B-TREE FOR ORDER BY') for step in plan)
+            for step in plan:
+                match = re.match(r'SCAN (\w+)', step)
+                if not match or match.group(1) in FULL_SCAN_OK or 'VIRTUAL TABLE' in step:
+                    continue
+                if 'INDEX' not in step or sorts or ' LIMIT ' not in sql:
+                    scans.append(f'{step}  <-  {sql}')
+    return scans
+
+
+@pytest.fixture
+def shopper(client):
+    login(client)
+    client.post('/cart/add/1', data={'quantity': 2})
+    client.post('/cart/checkout')
+    client.post('/cart/add/2', data={'quantity': 1})
+    return client
+
+
+@pytest.mark.parametrize('url', ENDPOINTS)
+def test_endpoint_queries_use_indexes(app, shopper, statements, url):
+    statements.clear()
+    assert shopper.get(url).status_code == 200
+    assert full_scans(app, statements) == []
+
+
+def test_missing_index_is_reported(app, shopper, statements):
+    with app.app_context():
+        db.session.execute(text('DROP INDEX ix_order_item_order_id'))
+        db.session.commit()
+    statements.clear()
+    shopper.get('/orders')
+    assert any(scan.startswith('SCAN order_item') for scan in full_scans(app, statements))
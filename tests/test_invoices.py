@@ -0,0 +1,219 @@
+import io
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+import invoices.jobs
+from app1 import db
+from invoices import get_invoice_cache, get_invoice_renderer
+from invoices.jobs import FAILED, PENDING, requeue_stuck_invoices
+from invoices.pdf import InvoiceRenderer
+from invoices.storage import S3InvoiceStorage, content_key, get_invoice_storage
+from models import Invoice
+from tests.conftest import bootstrapped_app, dispose, login
+
+
+def place_order(client):
+    login(client)
+    client.post('/cart/add/1', data={'quantity': 1})
+    location = client.post('/cart/checkout', data={'idempotency_key': 'factura'}).headers['Location']
+    return location
+
+
+def set_render_state(app, status, age=0):
+    """Deja la factura sin PDF y con el render en `status` desde hace `age` segundos."""
+    with app.app_context():
+        invoice = Invoice.query.one()
+        invoice.pdf_file_path = None
+        invoice.render_status = status
+        invoice.render_requested_at = datetime.utcnow() - timedelta(seconds=age)
+        db.session.commit()
+
+
+@pytest.fixture
+def failing_render(monkeypatch):
+    def fail(invoice, storage):
+        raise RuntimeError('sin disco')
+    monkeypatch.setattr(invoices.jobs, 'write_invoice_pdf', fail)
+
+
+def test_rendered_invoice_clears_status(app, client):
+    page = client.get(place_order(client)).get_data(as_text=True)
+    with app.app_context():
+        invoice = Invoice.query.one()
+        assert invoice.pdf_file_path and invoice.render_status is None
+    assert 'Descargar Factura' in page
+
+
+def test_failed_render_stops_polling_and_offers_retry(app, client, failing_render, monkeypatch):
+    confirmation = place_order(client)
+    with app.app_context():
+        assert Invoice.query.one().render_status == FAILED
+
+    page = client.get(confirmation).get_data(as_text=True)
+    assert 'invoice-unavailable' in page and 'Reintentar' in page
+    assert 'invoice-pending' not in page and 'location.replace' not in page
+    response = client.get('/cart/download_invoice/1')
+    assert response.headers['Location'] == confirmation
+
+    monkeypatch.undo()
+    response = client.get('/cart/confirmation/1/retry_invoice')
+    assert response.headers['Location'] == confirmation
+    with app.app_context():
+        invoice = Invoice.query.one()
+        assert invoice.pdf_file_path and invoice.render_status is None
+
+
+def test_polling_stops_after_the_limit(app, client):
+    confirmation = place_order(client)
+    set_render_state(app, PENDING)
+    limit = app.config['INVOICE_POLL_LIMIT']
+
+    page = client.get(confirmation).get_data(as_text=True)
+    assert 'invoice-pending' in page
+    assert f'{confirmation}?poll=1' in page
+
+    page = client.get(f'{confirmation}?poll={limit - 1}').get_data(as_text=True)
+    assert f'{confirmation}?poll={limit}' in page
+
+    page = client.get(f'{confirmation}?poll={limit}').get_data(as_text=True)
+    assert 'invoice-unavailable' in page and 'location.replace' not in page
+
+
+def test_retry_does_not_duplicate_a_render_in_progress(app, client, monkeypatch):
+    place_order(client)
+    set_render_state(app, PENDING)
+    enqueued = []
+    monkeypatch.setattr(invoices.jobs, 'enqueue_invoice', enqueued.append)
+
+    client.get('/cart/confirmation/1/retry_invoice')
+    assert enqueued == []
+
+
+def test_stuck_invoices_are_requeued_on_startup(app, client):
+    place_order(client)
+    stuck = app.config['INVOICE_STUCK_SECONDS']
+
+    set_render_state(app, PENDING, age=stuck // 2)
+    assert requeue_stuck_invoices(app) == 0
+
+    set_render_state(app, FAILED, age=stuck * 2)
+    assert requeue_stuck_invoices(app) == 0
+
+    set_render_state(app, PENDING, age=stuck * 2)
+    assert requeue_stuck_invoices(app) == 1
+    with app.app_context():
+        invoice = Invoice.query.one()
+        assert invoice.pdf_file_path and invoice.render_status is None
+
+
+@pytest.fixture
+def lazy_app(monkeypatch, tmp_path):
+    app = bootstrapped_app(monkeypatch, tmp_path, INVOICE_RENDER_MODE='lazy')
+    yield app
+    dispose(app)
+
+
+def test_eager_mode_does_not_create_the_spill_dir(app, tmp_path):
+    assert get_invoice_cache(app).spill_dir is None
+    assert not os.path.exists(tmp_path / 'invoice-cache')
+
+
+def test_lazy_cache_key_follows_renderer_options(lazy_app, tmp_path):
+    client = lazy_app.test_client()
+    place_order(client)
+    first = client.get('/cart/download_invoice/1').get_data()
+    with lazy_app.app_context():
+        assert Invoice.query.one().pdf_file_path is None
+        old_fingerprint = get_invoice_renderer().fingerprint
+        # Otros textos: la misma factura ya no puede salir de la caché
+        lazy_app.extensions['invoice_renderer'] = InvoiceRenderer(title='Otra Panadería')
+        assert get_invoice_renderer().fingerprint != old_fingerprint
+    second = client.get('/cart/download_invoice/1').get_data()
+
+    assert first != second
+    assert get_invoice_cache(lazy_app).snapshot()['renders'] == 2
+    assert os.path.isdir(tmp_path / 'invoice-cache')
+
+
+def test_renderer_options_recreate_the_same_renderer(app, client):
+    place_order(client)
+    with app.app_context():
+        renderer = get_invoice_renderer()
+        # Así lo recrea cada proceso de `flask invoices rebuild`
+        copy = InvoiceRenderer(**renderer.options)
+        invoice = Invoice.query.one()
+        assert copy.fingerprint == renderer.fingerprint
+        assert copy.render(invoice.order, invoice.invoice_number) == \
+            renderer.render(invoice.order, invoice.invoice_number)
+
+
+def test_migrate_storage_moves_legacy_files_out_of_static(app, client, monkeypatch, tmp_path):
+    client.get(place_order(client))
+    # La raíz de la app en un directorio temporal, para no tocar static/ del repo
+    root = tmp_path / 'app'
+    legacy = root / 'static' / 'invoices' / 'invoice_1.pdf'
+    legacy.parent.mkdir(parents=True)
+    legacy.write_bytes(b'%PDF-1.4 factura antigua')
+    monkeypatch.setattr(app, 'root_path', str(root))
+    with app.app_context():
+        Invoice.query.one().pdf_file_path = 'static/invoices/invoice_1.pdf'
+        db.session.commit()
+
+    # Ya no se lee de static/, que se sirve en público
+    assert client.get('/cart/download_invoice/1').status_code == 404
+
+    result = app.test_cli_runner().invoke(args=['invoices', 'migrate-storage'])
+    assert result.exit_code == 0, result.output
+    assert 'Facturas migradas: 1. Sin archivo: 0.' in result.output
+    assert not legacy.exists()
+    with app.app_context():
+        assert not Invoice.query.one().pdf_file_path.startswith('static/')
+    assert client.get('/cart/download_invoice/1').data == b'%PDF-1.4 factura antigua'
+
+
+def test_s3_storage_with_a_stubbed_client(app, client):
+    botocore_session = pytest.importorskip('botocore.session')
+    from botocore.response import StreamingBody
+    from botocore.stub import Stubber
+
+    s3 = botocore_session.get_session().create_client(
+        's3', region_name='us-east-1', aws_access_key_id='prueba', aws_secret_access_key='prueba')
+    storage = S3InvoiceStorage('facturas', prefix='/pdf/', client=s3)
+    client.get(place_order(client))
+    with app.app_context():
+        key = Invoice.query.one().pdf_file_path
+        with get_invoice_storage().open(key).fileobj as f:
+            data = f.read()
+    assert content_key(data)[0] == key
+    target = {'Bucket': 'facturas', 'Key': f'pdf/{key}'}
+    head = {'ContentLength': len(data), 'LastModified': datetime(2026, 1, 1)}
+
+    with Stubber(s3) as stub:
+        # save: sube solo si el objeto no existe
+        stub.add_client_error('head_object', service_error_code='404', http_status_code=404,
+                              expected_params=target)
+        stub.add_response('put_object', {}, dict(target, Body=data, ContentType='application/pdf',
+                                                 Metadata={'sha256': content_key(data)[1]}))
+        assert storage.save(data) == key
+        stub.add_response('head_object', head, target)
+        assert storage.save(data) == key
+
+        stub.add_response('head_object', head, target)
+        assert storage.exists(key)
+        stub.add_client_error('head_object', service_error_code='404', http_status_code=404,
+                              expected_params={'Bucket': 'facturas', 'Key': 'pdf/00/00/otra.pdf'})
+        assert not storage.exists('00/00/otra.pdf')
+
+        # open, a través de la descarga con Range
+        app.extensions['invoice_storage'] = storage
+        stub.add_response('head_object', head, target)
+        stub.add_response('get_object', {'Body': StreamingBody(io.BytesIO(data), len(data)),
+                                         'ContentLength': len(data)}, target)
+        response = client.get('/cart/download_invoice/1', headers={'Range': 'bytes=0-7'})
+        assert response.status_code == 206
+        assert response.data == data[:8]
+        assert response.headers['Content-Range'] == f'bytes 0-7/{len(data)}'
+        assert response.headers['ETag'] == f'"{content_key(data)[1]}"'
+        stub.assert_no_pending_responses()
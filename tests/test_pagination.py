@@ -0,0 +1,48 @@
+import base64
+import json
+
+import pytest
+
+from pagination import decode_cursor, encode_cursor
+
+
+def token(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+TAMPERED = [
+    'no-es-un-cursor',
+    token({'k': [{'dec': 'x'}, 1], 'd': 'next'}),
+    token({'k': [{'dec': 'NaN'}, 1], 'd': 'next'}),
+    token({'k': ['2024-01-01', 1], 'd': 'next'}),
+    token({'k': [[1, 2], 1], 'd': 'next'}),
+    token({'k': [{'dt': 'mañana'}, 1], 'd': 'next'}),
+    token({'k': [{'dt': '2024-01-01T00:00:00'}, 'uno'], 'd': 'next'}),
+    token({'k': [{'dt': '2024-01-01T00:00:00'}, True], 'd': 'next'}),
+    token({'k': [{'dt': '2024-01-01T00:00:00'}], 'd': 'next'}),
+    token({'k': [{'dt': '2024-01-01T00:00:00'}, 1], 'd': 'sideways'}),
+    token({'k': 7, 'd': 'next'}),
+    token([1, 2]),
+]
+
+
+def test_decode_cursor_rejects_bad_decimals():
+    assert decode_cursor(token({'k': [{'dec': 'x'}], 'd': 'next'})) == (None, 'next')
+
+
+@pytest.mark.parametrize('cursor', TAMPERED)
+@pytest.mark.parametrize('url', ['/products/?cursor=', '/products/?sort=precio&cursor=',
+                                 '/products/category/1?cursor='])
+def test_tampered_cursor_falls_back_to_first_page(client, url, cursor):
+    first_page = client.get(url.split('cursor=')[0])
+    response = client.get(url + cursor)
+    assert response.status_code == 200
+    assert response.text.count('data-stock=') == first_page.text.count('data-stock=')
+
+
+def test_cursor_round_trip(app):
+    from datetime import datetime
+    from decimal import Decimal
+
+    values = [datetime(2024, 5, 1, 12, 30), Decimal('4.75'), 7]
+    assert decode_cursor(encode_cursor(values, 'prev')) == (values, 'prev')
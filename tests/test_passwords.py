@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS
+
+import passwords
+from models import User
+from passwords import PasswordHasher, canonical_method
+from tests.conftest import bootstrapped_app, dispose, login, make_app
+
+
+@pytest.mark.parametrize('method, expected', [
+    ('scrypt', 'scrypt:32768:8:1'),
+    ('scrypt:16384', 'scrypt:16384:8:1'),
+    ('scrypt:16384:4', 'scrypt:16384:4:1'),
+    ('scrypt:16384:8:2', 'scrypt:16384:8:2'),
+    ('pbkdf2', f'pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}'),
+    ('pbkdf2:sha512', f'pbkdf2:sha512:{DEFAULT_PBKDF2_ITERATIONS}'),
+    ('pbkdf2:sha256:0600000', 'pbkdf2:sha256:600000'),
+])
+def test_canonical_method_fills_in_werkzeug_defaults(method, expected):
+    assert canonical_method(method) == expected
+
+
+@pytest.mark.parametrize('method', ['scrypt:1:2:3:4', 'pbkdf2:sha256:1000:1'])
+def test_canonical_method_rejects_extra_parameters(method):
+    with pytest.raises(ValueError):
+        canonical_method(method)
+
+
+@pytest.mark.parametrize('method', ['scrypt:1024', 'pbkdf2', 'pbkdf2:sha256', 'pbkdf2:sha256:1000'])
+def test_fresh_hash_does_not_need_rehash(method):
+    hasher = PasswordHasher(method, concurrency=1)
+    stored = hasher.hash('secreto')
+    assert hasher.verify(stored, 'secreto')
+    assert not hasher.needs_rehash(stored)
+    assert PasswordHasher('pbkdf2:sha256:2000', concurrency=1).needs_rehash(stored)
+
+
+def test_login_rehashes_with_the_configured_method(monkeypatch, tmp_path):
+    # Sembrada con otros parámetros; la app usa ahora los de PASSWORD_HASH_METHOD
+    app = bootstrapped_app(monkeypatch, tmp_path, PASSWORD_HASH_METHOD='pbkdf2:sha256:1000')
+    dispose(app)
+    monkeypatch.setenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:2000')
+    app = make_app()
+    try:
+        login(app.test_client())
+        with app.app_context():
+            stored = User.query.filter_by(email='admin@bakery.com').one().password_hash
+            assert stored.startswith('pbkdf2:sha256:2000$')
+    finally:
+        dispose(app)
+
+
+def test_hasher_caps_concurrent_hashes(monkeypatch):
+    running = []
+    peak = []
+
+    def slow_check(password_hash, password):
+        running.append(1)
+        peak.append(len(running))
+        time.sleep(0.01)
+        running.pop()
+        return True
+
+    monkeypatch.setattr(passwords, 'check_password_hash', slow_check)
+    hasher = PasswordHasher('pbkdf2:sha256:1000', concurrency=2)
+    threads = [threading.Thread(target=hasher.verify, args=('hash', 'secreto')) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(peak) == 8 and max(peak) <= 2
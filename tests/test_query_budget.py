@@ -0,0 +1,72 @@
+import pytest
+
+from tests.conftest import bootstrapped_app, dispose, login
+
+# Sentencias SQL por página, con las cachés frías (primera visita) y
+# calientes. No dependen de cuántos pedidos o líneas tenga el usuario: un
+# N+1 las haría crecer con `lines`.
+BUDGETS = {
+    '/': {'cold': 2, 'warm': 0},
+    '/products/': {'cold': 3, 'warm': 0},
+    '/cart/': {'cold': 1, 'warm': 1},
+    '/orders': {'cold': 3, 'warm': 3},
+    # Pedido 1: el de `lines` líneas
+    '/cart/confirmation/1': {'cold': 2, 'warm': 2},
+}
+
+# POST /cart/checkout con `lines` productos en el carrito. Las lecturas no
+# crecen con `lines`; las escrituras sí: en SQLite el ORM inserta una fila
+# por sentencia y el inventario es un UPDATE condicional por producto.
+CHECKOUT_BUDGET = {'reads': 8, 'writes': 6, 'writes_per_line': 3}
+
+
+def shop(client, lines):
+    """Inicia sesión, hace `lines` pedidos y deja `lines` productos en el carrito.
+
+    El primer pedido lleva los `lines` productos; los demás, uno cada uno.
+    """
+    login(client)
+    for product_id in range(1, lines + 1):
+        client.post(f'/cart/add/{product_id}', data={'quantity': 1})
+    client.post('/cart/checkout', data={'idempotency_key': 'pedido-1'})
+    for product_id in range(2, lines + 1):
+        client.post(f'/cart/add/{product_id}', data={'quantity': 1})
+        client.post('/cart/checkout', data={'idempotency_key': f'pedido-{product_id}'})
+    for product_id in range(1, lines + 1):
+        client.post(f'/cart/add/{product_id}', data={'quantity': 2})
+
+
+@pytest.fixture(params=['session', 'db'])
+def app(request, monkeypatch, tmp_path):
+    # Los dos backends del carrito tienen el mismo presupuesto
+    app = bootstrapped_app(monkeypatch, tmp_path, CART_BACKEND=request.param)
+    yield app
+    dispose(app)
+
+
+@pytest.mark.parametrize('lines', [1, 5])
+@pytest.mark.parametrize('url', sorted(BUDGETS))
+def test_page_stays_within_query_budget(app, client, statements, url, lines):
+    shop(client, lines)
+    budget = BUDGETS[url]
+
+    statements.clear()
+    assert client.get(url).status_code == 200
+    assert len(statements) <= budget['cold'], statements.statements
+
+    statements.clear()
+    client.get(url)
+    assert len(statements) <= budget['warm'], statements.statements
+
+
+@pytest.mark.parametrize('lines', [1, 5])
+def test_checkout_stays_within_query_budget(app, client, statements, lines):
+    shop(client, lines)
+
+    statements.clear()
+    response = client.post('/cart/checkout', data={'idempotency_key': 'presupuesto'})
+    assert '/cart/confirmation/' in response.headers['Location']
+    reads = statements.matching('SELECT')
+    writes = [sql for sql, _ in statements.statements if sql not in reads]
+    assert len(reads) <= CHECKOUT_BUDGET['reads'], reads
+    assert len(writes) <= CHECKOUT_BUDGET['writes'] + CHECKOUT_BUDGET['writes_per_line'] * lines, writes
@@ -0,0 +1,91 @@
+import shutil
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import event
+
+import catalog
+from app1 import db
+from tests.conftest import StatementLog, bootstrapped_app, dispose, login
+
+
+@pytest.fixture
+def replica_app(request, monkeypatch, tmp_path):
+    """App con el primario y una réplica SQLite; la réplica es una copia sin los cambios posteriores."""
+    app = bootstrapped_app(monkeypatch, tmp_path,
+                           DATABASE_REPLICA_URLS=f'sqlite:///{tmp_path / "replica.db"}',
+                           **getattr(request, 'param', {}))
+    dispose(app)
+    shutil.copy(tmp_path / 'bakery.db', tmp_path / 'replica.db')
+    # Un catálogo recién cambiado se lee del primario (ver catalog._cached): aquí lleva días igual
+    catalog.catalog_cache.set('version', ('estable', datetime(2000, 1, 1, tzinfo=timezone.utc)))
+    yield app
+    dispose(app)
+
+
+@pytest.fixture
+def logs(replica_app):
+    """Sentencias de cada engine: {'primary': StatementLog, 'replica': StatementLog}."""
+    with replica_app.app_context():
+        engines = {'primary': db.engine, 'replica': db.engines['replica-0']}
+    logs = {name: StatementLog() for name in engines}
+    listeners = {}
+    for name, engine in engines.items():
+        def record(conn, cursor, statement, parameters, context, executemany, log=logs[name]):
+            log.statements.append((statement, parameters))
+        listeners[name] = record
+        event.listen(engine, 'before_cursor_execute', record)
+    yield logs
+    for name, engine in engines.items():
+        event.remove(engine, 'before_cursor_execute', listeners[name])
+
+
+def clear(logs):
+    for log in logs.values():
+        log.clear()
+
+
+def test_get_reads_from_the_replica(replica_app, logs):
+    client = replica_app.test_client()
+    assert client.get('/products/').status_code == 200
+    assert len(logs['replica']) > 0
+    assert len(logs['primary']) == 0
+
+
+def test_post_reads_from_the_primary(replica_app, logs):
+    client = replica_app.test_client()
+    client.post('/cart/add/1', data={'quantity': 1})
+    assert len(logs['primary']) > 0
+    assert len(logs['replica']) == 0
+
+
+def test_checkout_and_read_after_write_use_the_primary(replica_app, logs):
+    client = replica_app.test_client()
+    login(client)
+    client.post('/cart/add/1', data={'quantity': 1})
+    clear(logs)
+
+    confirmation = client.post('/cart/checkout').headers['Location']
+    assert logs['primary'].matching('INSERT INTO "order"')
+    assert len(logs['replica']) == 0
+
+    # El pedido todavía no está en la réplica: la confirmación lo lee del primario
+    clear(logs)
+    assert client.get(confirmation).status_code == 200
+    assert len(logs['primary']) > 0
+    assert len(logs['replica']) == 0
+
+
+@pytest.mark.parametrize('replica_app', [{'DATABASE_REPLICA_STICKY_SECONDS': '0'}], indirect=True)
+def test_reads_return_to_the_replica_after_the_sticky_window(replica_app, logs):
+    client = replica_app.test_client()
+    login(client)
+    client.post('/cart/add/1', data={'quantity': 1})
+    client.post('/cart/checkout')
+    clear(logs)
+
+    # La réplica se quedó antes del pedido: el historial sale vacío
+    page = client.get('/orders').get_data(as_text=True)
+    assert len(logs['replica']) > 0
+    assert len(logs['primary']) == 0
+    assert 'Aún no tienes pedidos' in page
@@ -0,0 +1,27 @@
+import sqlalchemy as sa
+
+from app1 import db
+from models import Product
+from search import search_products
+
+
+def plan(statement):
+    sql = str(statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    return [row[-1] for row in db.session.execute(sa.text('EXPLAIN QUERY PLAN ' + sql))]
+
+
+def test_search_ignores_case_and_accents(app):
+    with app.app_context():
+        query = search_products(Product.query.filter_by(active=True), 'ECLAIR choco')
+        assert [p.name for p in query] == ['Éclair de Chocolate']
+
+
+def test_search_count_runs_the_match_once(app):
+    with app.app_context():
+        query = search_products(Product.query.filter_by(active=True), 'pan')
+        # El COUNT de paginate() quita el ORDER BY; sin materializar, SQLite
+        # recorría product y repetía el MATCH por cada fila
+        steps = plan(query.order_by(None).statement)
+        assert 'MATERIALIZE product_hits' in steps
+        assert not any(step.startswith('SCAN product') and 'product_hits' not in step
+                       and 'VIRTUAL' not in step for step in steps)
@@ -0,0 +1,44 @@
+import pytest
+
+from app1 import db
+from cart.checkout import CheckoutError, place_order
+from models import CartItem, DailySales, DailyStock, Order, OrderItem
+from stock import restock, today
+
+
+def test_last_unit_is_sold_only_once(app):
+    with app.app_context():
+        restock({1: 1})
+        db.session.commit()
+
+        place_order(1, 'primero', cart_quantities={1: 1, 2: 1})
+        with pytest.raises(CheckoutError, match='quedan 0'):
+            place_order(1, 'segundo', cart_quantities={1: 1, 2: 1})
+
+        # Del segundo pedido no queda nada: ni pedido, ni líneas, ni carrito, ni rollup
+        assert Order.query.one().idempotency_key == 'primero'
+        assert OrderItem.query.count() == 2
+        assert CartItem.query.count() == 0
+        assert {row.product_id: row.orders for row in DailySales.query} == {1: 1, 2: 1}
+        stock = DailyStock.query.one()
+        assert (stock.quantity, stock.sold) == (1, 1)
+
+
+def test_product_without_stock_row_sells_without_limit(app):
+    with app.app_context():
+        restock({1: 5})
+        db.session.commit()
+
+        order = place_order(1, 'sin-limite', cart_quantities={2: 500})
+        assert order.order_items[0].quantity == 500
+        assert [row.product_id for row in DailyStock.query] == [1]
+
+
+def test_restock_adds_to_the_day_row(app):
+    with app.app_context():
+        restock({1: 3, 2: 0})
+        db.session.commit()
+        restock({1: 2, 3: 4})
+        db.session.commit()
+
+        assert {row.product_id: row.quantity for row in DailyStock.query.filter_by(day=today())} == {1: 5, 3: 4}